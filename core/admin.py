@@ -5,8 +5,12 @@ from django_summernote.admin import SummernoteModelAdmin
 
 from .models import (
     User, Course, Module, Lesson, Resource, 
-    Test, TestQuestion, TestSubmission, TestAnswer, Progress, CourseFeature, TeacherCard
+    Test, TestQuestion, TestSubmission, TestAnswer, Progress, CourseFeature, TeacherCard,
+    ModuleProgress, SearchDocument, Job, TestDraft
 )
+from .search import search_documents
+from .jobs import requeue_failed
+from .cloning import clone_course
 
 # Переопределяем админку Пользователя, чтобы было видно роль
 class CustomUserAdmin(UserAdmin):
@@ -51,6 +55,17 @@ class LessonAdmin(SummernoteModelAdmin):
     search_fields = ('title', 'content')
     autocomplete_fields = ('author', 'module') # Удобный поиск
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по HTML содержимого — полнотекстовый индекс (search.py).
+        # search_fields оставляем: без них админка не покажет строку поиска
+        if not search_term:
+            return queryset, False
+        documents = search_documents(
+            search_term, queryset=SearchDocument.objects.filter(kind=SearchDocument.KIND_LESSON), limit=None
+        )
+        lesson_ids = [document.lesson_id for document in documents if document.lesson_id]
+        return queryset.filter(pk__in=lesson_ids), False
+
 admin.site.register(Lesson, LessonAdmin)
 
 
@@ -67,6 +82,12 @@ class CourseAdmin(admin.ModelAdmin):
         fields = ('title',)
         
     inlines = [ModuleInline]
+    actions = ['clone']
+
+    @admin.action(description="Клонировать курс для нового потока (со всеми модулями, уроками и тестами)")
+    def clone(self, request, queryset):
+        copies = [clone_course(course) for course in queryset]
+        self.message_user(request, f"Созданы копии (не опубликованы): {', '.join(c.title for c in copies)}.")
     
 admin.site.register(Course, CourseAdmin)
 
@@ -82,7 +103,7 @@ class TestAdmin(admin.ModelAdmin):
     """
     Кастомная админка для Тестов.
     """
-    list_display = ('title', 'module', 'passing_score', 'created_at')
+    list_display = ('title', 'module', 'passing_score', 'questions_per_attempt', 'created_at')
     list_filter = ('module__course',)
     
     # ЭТА СТРОКА ИСПРАВЛЯЕТ ОШИБКУ:
@@ -107,6 +128,16 @@ class TestQuestionAdmin(admin.ModelAdmin):
     autocomplete_fields = ('test',) # <-- Эта строка теперь будет работать
     ordering = ('test', 'created_at')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту вопроса и названию теста — через полнотекстовый индекс, как у уроков
+        if not search_term:
+            return queryset, False
+        documents = search_documents(
+            search_term, queryset=SearchDocument.objects.filter(kind=SearchDocument.KIND_QUESTION), limit=None
+        )
+        question_ids = [document.question_id for document in documents if document.question_id]
+        return queryset.filter(pk__in=question_ids), False
+
     def get_fieldsets(self, request, obj=None):
         """
         Динамически показываем разные наборы полей 
@@ -183,6 +214,34 @@ admin.site.register(TestAnswer)
 admin.site.register(Progress)
 
 
+@admin.register(ModuleProgress)
+class ModuleProgressAdmin(admin.ModelAdmin):
+    list_display = ('student', 'module', 'completed_lessons', 'total_lessons')
+    list_filter = ('module__course', 'module')
+    raw_id_fields = ('student',)
+
+
+@admin.register(TestDraft)
+class TestDraftAdmin(admin.ModelAdmin):
+    list_display = ('student', 'test', 'updated_at')
+    list_filter = ('test__module__course',)
+    raw_id_fields = ('student',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+    ordering = ('-created_at',)
+    actions = ['requeue']
+
+    @admin.action(description="Повторить задачи с ошибкой (dead letter)")
+    def requeue(self, request, queryset):
+        count = requeue_failed(queryset)
+        self.message_user(request, f"Возвращено в очередь: {count}.")
+
+
 # # --- 1. Новая админка для "Чему вы научитесь" ---
 # @admin.register(CourseFeature)
 # class CourseFeatureAdmin(admin.ModelAdmin):
@@ -0,0 +1,105 @@
+# eduplatform/core/answer_keys.py
+#
+# "Скомпилированный" ключ ответов теста, который хранится в кэше Django.
+# Оценивание берёт отсюда правильные ответы, типы вопросов и баллы,
+# не перечитывая вопросы и не агрегируя max_score в базе.
+# Ключ сбрасывается сигналами (см. signals.py) при изменении вопросов или теста.
+# Ключ живёт сутки, поэтому кэш обязан быть общим для воркеров (проверка core.E001, checks.py).
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Test, TestQuestion, normalize_answer
+
+ANSWER_KEY_TIMEOUT = getattr(settings, 'ANSWER_KEY_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def answer_key_cache_key(test_id):
+    return f'core:answer_key:{test_id}'
+
+
+def question_ids_cache_key(test_id):
+    return f'core:question_ids:{test_id}'
+
+
+def build_answer_key(test_id, passing_score=None):
+    """
+    Собирает ключ ответов одним запросом к вопросам (+1 запрос за passing_score,
+    если он не передан). Все id вопросов — строки.
+    """
+    if passing_score is None:
+        passing_score = Test.objects.values_list('passing_score', flat=True).get(pk=test_id)
+
+    key = {
+        'answers': {},          # id вопроса -> нормализованный правильный ответ ('choice')
+        'types': {},            # id вопроса -> question_type
+        'scores': {},           # id вопроса -> max_score
+        'max_score': 0,         # сумма max_score по всем вопросам
+        'has_open_ended': False,
+        'passing_score': passing_score,
+    }
+    questions = TestQuestion.objects.filter(test_id=test_id).values_list(
+        'id', 'question_type', 'correct_answer', 'max_score'
+    )
+    for question_id, question_type, correct_answer, max_score in questions:
+        question_id = str(question_id)
+        key['types'][question_id] = question_type
+        key['scores'][question_id] = max_score
+        key['max_score'] += max_score
+        if question_type == 'choice':
+            key['answers'][question_id] = normalize_answer(correct_answer)
+        elif question_type == 'open_ended':
+            key['has_open_ended'] = True
+    return key
+
+
+def get_answer_key(test):
+    """
+    Возвращает ключ ответов для теста (объект Test или его id).
+    Если передан объект Test, при промахе кэша не нужен отдельный запрос за passing_score.
+    """
+    test_id = getattr(test, 'pk', test)
+    cache_key = answer_key_cache_key(test_id)
+    key = cache.get(cache_key)
+    if key is None:
+        key = build_answer_key(test_id, passing_score=getattr(test, 'passing_score', None))
+        cache.set(cache_key, key, ANSWER_KEY_TIMEOUT)
+    return key
+
+
+def get_question_ids(test_id):
+    """
+    Множество id вопросов теста (строки) — отдельная маленькая запись кэша для проверок,
+    которым не нужен весь ключ ответов (автосохранение черновика, drafts.py).
+    Тест не найден -> Test.DoesNotExist.
+    """
+    cache_key = question_ids_cache_key(test_id)
+    question_ids = cache.get(cache_key)
+    if question_ids is None:
+        question_ids = frozenset(
+            str(question_id)
+            for question_id in TestQuestion.objects.filter(test_id=test_id).values_list('id', flat=True)
+        )
+        if not question_ids and not Test.objects.filter(pk=test_id).exists():
+            raise Test.DoesNotExist
+        cache.set(cache_key, question_ids, ANSWER_KEY_TIMEOUT)
+    return question_ids
+
+
+def invalidate_answer_key(test_id):
+    cache.delete_many([answer_key_cache_key(test_id), question_ids_cache_key(test_id)])
+
+
+def grade_choice(key, question_id, answer_text):
+    """Балл за ответ на вопрос типа 'choice' по ключу ответов."""
+    question_id = str(question_id)
+    if normalize_answer(answer_text) == key['answers'].get(question_id):
+        return key['scores'][question_id]
+    return 0
+
+
+def final_score(key, total_score):
+    """Итоговый процент и флаг "пройден" для суммы баллов total_score."""
+    max_possible_score = key['max_score']
+    score = (total_score / max_possible_score) * 100 if max_possible_score else 0
+    return score, score >= key['passing_score']
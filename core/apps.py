@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        # Регистрация обработчиков фоновых задач (jobs.py)
+        from . import grading, images  # noqa: F401
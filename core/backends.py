@@ -0,0 +1,97 @@
+# eduplatform/core/backends.py
+#
+# Бэкенд аутентификации с кэшем пользователя. AuthenticationMiddleware на каждый запрос
+# (в том числе на каждый HTMX-фрагмент) загружает request.user — обычный ModelBackend
+# делает для этого SELECT к core_user. Здесь поля пользователя кэшируются на
+# USER_CACHE_TIMEOUT секунд; сохранение или удаление пользователя сбрасывает запись (signals.py).
+#
+# Кэш включается только при общем кэше (CACHE_BACKEND не LocMemCache/DummyCache): сброс
+# записи в памяти одного процесса не виден остальным воркерам, и они до конца таймаута
+# видели бы уже заблокированного пользователя. С локальным кэшем бэкенд работает как ModelBackend.
+#
+# В кэше — только USER_CACHE_FIELDS, без хэша пароля; остальные поля (bio, phone, password)
+# догружаются из базы при обращении. Для сверки сессии (get_session_auth_hash) вместо пароля
+# хранится готовый хэш сессии, поэтому смена пароля по-прежнему разлогинивает другие сессии.
+# Изменения через QuerySet.update() сигналов не вызывают — их ограничивает короткий таймаут.
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Поля, которые нужны request.user в шаблонах, правах и проверке is_active
+USER_CACHE_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email', 'role', 'avatar', 'avatar_variants',
+    'is_active', 'is_staff', 'is_superuser', 'is_teacher_approved', 'last_login', 'date_joined',
+)
+
+
+def user_cache_key(user_id):
+    return f'core:user:{user_id}'
+
+
+def user_cache_timeout():
+    return getattr(settings, 'USER_CACHE_TIMEOUT', 60)
+
+
+def user_cache_enabled():
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def _cached_fields(model):
+    # Model.from_db() ждёт значения в порядке полей модели
+    return [field for field in model._meta.concrete_fields if field.name in USER_CACHE_FIELDS]
+
+
+def _cache_entry(user):
+    return {
+        'values': [field.get_prep_value(getattr(user, field.attname)) for field in _cached_fields(type(user))],
+        'session_auth_hash': user.get_session_auth_hash(),
+    }
+
+
+def _from_cache_entry(entry):
+    User = get_user_model()
+    field_names = [field.attname for field in _cached_fields(User)]
+    user = User.from_db(router.db_for_read(User), field_names, entry['values'])
+    # Пароль не загружен (отложенное поле) — User.get_session_auth_hash() вернёт этот хэш
+    user._session_auth_hash = entry['session_auth_hash']
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        if not user_cache_enabled():
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, _cache_entry(user), user_cache_timeout())
+            return user
+        user = _from_cache_entry(entry)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        if not user_cache_enabled():
+            return await super().aget_user(user_id)
+        key = user_cache_key(user_id)
+        entry = await cache.aget(key)
+        if entry is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await cache.aset(key, _cache_entry(user), user_cache_timeout())
+            return user
+        user = _from_cache_entry(entry)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,210 @@
+# eduplatform/core/benchmarking.py
+#
+# Общие утилиты для бенчмарков: наполнение базы синтетическими данными
+# и замер одного запроса (время, число SQL-запросов, размер ответа).
+# Используется командами benchmark_* — они запускаются на отдельной тестовой базе,
+# рабочие данные не затрагиваются.
+
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Course, Module, Lesson, Test, TestQuestion, TestSubmission, TestAnswer,
+    Progress, ModuleProgress, User, UserSearchTerm,
+)
+from .sanitizer import render_lesson_fields
+
+LESSON_CONTENT = "<p>" + "Текст урока о культуре речи и стилистике. " * 40 + "</p>"
+
+
+@contextmanager
+def benchmark_database(alias='default'):
+    """
+    Создаёт чистую тестовую базу (как при `manage.py test`) на время блока
+    и удаляет её после. Кэш очищается до и после.
+    """
+    connection = connections[alias]
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    # Тестовая SQLite в памяти переживает destroy_test_db в пределах процесса,
+    # поэтому перед каждым размером очищаем таблицы явно
+    call_command('flush', interactive=False, verbosity=0, database=alias)
+    cache.clear()
+    try:
+        yield connection
+    finally:
+        cache.clear()
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=False)
+        teardown_test_environment()
+
+
+def seed(num_lessons, num_students, lessons_per_module=10, questions_per_test=10, batch_size=2000):
+    """
+    Наполняет базу: один курс, модули по `lessons_per_module` уроков, тест в каждом модуле
+    (вопросы 'choice' + один 'open_ended'), учитель всех модулей и `num_students` учеников.
+    Каждый ученик прошёл все уроки первого модуля и отправил одну попытку его теста
+    (на проверке у учителя).
+
+    Возвращает словарь с объектами, которые нужны для замеров.
+    """
+    password = make_password('benchmark')
+    course = Course.objects.create(title="Бенчмарк-курс", published=True)
+
+    num_modules = max(1, -(-num_lessons // lessons_per_module))
+    modules = Module.objects.bulk_create([
+        Module(course=course, title=f"Модуль {i + 1}") for i in range(num_modules)
+    ])
+
+    teacher = User.objects.create(username='bench_teacher', role='teacher', is_teacher_approved=True, password=password)
+    Module.teachers.through.objects.bulk_create([
+        Module.teachers.through(module_id=module.pk, user_id=teacher.pk) for module in modules
+    ])
+
+    lessons = [
+        Lesson(
+            module=modules[i // lessons_per_module],
+            title=f"Урок {i + 1}",
+            content=LESSON_CONTENT,
+            goal_lesson="Цель урока",
+            assignment="<p>Задание</p>",
+            author=teacher,
+        )
+        for i in range(num_lessons)
+    ]
+    # bulk_create не вызывает pre_save — готовый HTML (sanitizer.py) считаем сами
+    for lesson in lessons:
+        render_lesson_fields(lesson)
+    lessons = Lesson.objects.bulk_create(lessons, batch_size=batch_size)
+
+    tests = Test.objects.bulk_create([
+        Test(module=module, title=f"Тест: {module.title}", passing_score=70) for module in modules
+    ])
+
+    questions = []
+    for test in tests:
+        for i in range(questions_per_test - 1):
+            questions.append(TestQuestion(
+                test=test, text=f"Вопрос {i + 1}", question_type='choice',
+                option_a="Вариант А", option_b="Вариант Б", option_c="Вариант В",
+                correct_answer="Вариант А", max_score=1,
+            ))
+        questions.append(TestQuestion(test=test, text="Развернутый ответ", question_type='open_ended', max_score=5))
+    TestQuestion.objects.bulk_create(questions, batch_size=batch_size)
+
+    students = User.objects.bulk_create([
+        User(username=f"student{i:06d}", email=f"student{i:06d}@example.com", role='student', password=password)
+        for i in range(num_students)
+    ], batch_size=batch_size)
+    if students and students[0].pk is None:
+        # Бэкенды без RETURNING: перечитываем id
+        students = list(User.objects.filter(role='student').order_by('username'))
+    # bulk_create не вызывает сигналы — заполняем поисковые термины сами
+    UserSearchTerm.objects.bulk_create((
+        UserSearchTerm(user=user, term=term)
+        for user in [teacher, *students] for term in UserSearchTerm.terms_for(user)
+    ), batch_size=batch_size)
+
+    now = timezone.now()
+    first_module_lessons = [lesson for lesson in lessons if lesson.module_id == modules[0].pk]
+    Progress.objects.bulk_create((
+        Progress(student=student, lesson=lesson, passed=True, completed_at=now)
+        for student in students for lesson in first_module_lessons
+    ), batch_size=batch_size)
+    ModuleProgress.rebuild()
+
+    first_test = tests[0]
+    first_test_questions = [q for q in questions if q.test_id == first_test.pk]
+    submissions = TestSubmission.objects.bulk_create([
+        TestSubmission(test=first_test, student=student) for student in students
+    ], batch_size=batch_size)
+    TestAnswer.objects.bulk_create((
+        TestAnswer(
+            submission=submission, question=question, answer_text="Вариант А",
+            graded=question.question_type == 'choice',
+        )
+        for submission in submissions for question in first_test_questions
+    ), batch_size=batch_size)
+
+    return {
+        'course': course,
+        'teacher': teacher,
+        'student': students[0] if students else None,
+        'module': modules[0],
+        'lesson': first_module_lessons[0] if first_module_lessons else None,
+        'test': first_test,
+        'questions': first_test_questions,
+        'submission': submissions[0] if submissions else None,
+    }
+
+
+def view_scenarios(data):
+    """
+    Типовая нагрузка по основным страницам для данных из seed():
+    список (имя, клиент, метод, путь, данные POST).
+    """
+    student_client = Client()
+    student_client.force_login(data['student'])
+    teacher_client = Client()
+    teacher_client.force_login(data['teacher'])
+    anonymous_client = Client()
+
+    test_answers = {
+        f"answer_{question.id}": "Вариант А" if question.question_type == 'choice' else "Ответ"
+        for question in data['questions']
+    }
+
+    return [
+        ('index', anonymous_client, 'get', reverse('core:index'), None),
+        ('course', student_client, 'get', reverse('core:course'), None),
+        ('new_lesson_detail', student_client, 'get',
+         reverse('core:new_lesson_detail', args=[data['lesson'].id]), None),
+        ('new_test_detail', student_client, 'get',
+         reverse('core:new_test_detail', args=[data['module'].id]), None),
+        ('new_test_submit', student_client, 'post',
+         reverse('core:new_test_submit', args=[data['test'].id]), test_answers),
+        ('profile_student', student_client, 'get', reverse('core:profile'), None),
+        ('profile_teacher', teacher_client, 'get', reverse('core:profile'), None),
+        ('teacher_student_detail', teacher_client, 'get',
+         reverse('core:teacher_student_detail', args=[data['student'].id]), None),
+        ('teacher_grade_submission', teacher_client, 'get',
+         reverse('core:teacher_grade_submission', args=[data['submission'].id]), None),
+    ]
+
+
+def measure(client, method, path, data=None, repeat=5, connection_alias='default'):
+    """
+    Выполняет запрос `repeat` раз после холодного прогона (с очищенным кэшем).
+    Возвращает время (мс), число SQL-запросов (холодный и тёплый прогон) и размер ответа.
+    """
+    connection = connections[connection_alias]
+    call = getattr(client, method.lower())
+
+    cache.clear()
+    with CaptureQueriesContext(connection) as cold:
+        response = call(path, data or {})
+
+    timings = []
+    for _ in range(max(1, repeat)):
+        with CaptureQueriesContext(connection) as warm:
+            started = time.perf_counter()
+            response = call(path, data or {})
+            timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'status': response.status_code,
+        'time_ms_median': round(statistics.median(timings), 3),
+        'time_ms_max': round(max(timings), 3),
+        'queries_cold': len(cold),
+        'queries_warm': len(warm),
+        'bytes': len(response.content),
+    }
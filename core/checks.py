@@ -0,0 +1,43 @@
+# eduplatform/core/checks.py
+#
+# Проверки конфигурации (manage.py check, runserver, migrate).
+#
+# Ключи ответов (answer_keys.py), версии курсов (content_versions.py), навигация (navigation.py)
+# и права учителей (permissions.py) живут в кэше часами и сбрасываются сигналами. Сброс
+# в LocMemCache виден только процессу, который его сделал: остальные воркеры gunicorn/uvicorn
+# до конца таймаута оценивали бы по старому ключу и пускали бы снятого с модуля учителя.
+# Поэтому кэш по умолчанию (и кэш сессий, если сессии в кэше) должен быть общим.
+# Для разработки в один процесс ошибку можно заглушить: SILENCED_SYSTEM_CHECKS = ['core.E001'].
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .backends import LOCAL_CACHE_BACKENDS
+
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def _shared_cache_aliases():
+    aliases = ['default']
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+        aliases.append(settings.SESSION_CACHE_ALIAS)
+    return list(dict.fromkeys(aliases))
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    errors = []
+    for alias in _shared_cache_aliases():
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in LOCAL_CACHE_BACKENDS:
+            errors.append(Error(
+                f"Кэш '{alias}' ({backend}) локален для процесса: сброс ключей ответов, "
+                "версий курсов и прав не дойдёт до других воркеров.",
+                hint="Укажите общий кэш (FileBasedCache, Redis, Memcached) через CACHE_BACKEND/"
+                     "CACHE_LOCATION или SESSION_CACHE_BACKEND/SESSION_CACHE_LOCATION.",
+                id='core.E001',
+            ))
+    return errors
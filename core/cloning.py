@@ -0,0 +1,125 @@
+# eduplatform/core/cloning.py
+#
+# Глубокая копия курса для нового потока: Course -> Module -> Lesson/Resource/Test -> TestQuestion,
+# а также CourseFeature, TeacherCard и преподаватели курса и модулей (M2M).
+# Раньше курс каждый семестр собирали заново в админке по одному объекту.
+#
+# Копирование — фиксированное число запросов, сколько бы ни было уроков и вопросов:
+# по одному SELECT на уровень дерева и по одному bulk_create на уровень (новые UUID задаются
+# в Python, поэтому связи между уровнями известны до вставки). Всё — в одной транзакции.
+#
+# Файлы (видео, PDF, картинки, обложка, фото преподавателей) не копируются: копия ссылается
+# на те же файлы в хранилище, вместе с описанием уже готовых размеров (*_variants, images.py).
+# Это безопасно: файлы не удаляются при удалении объектов, а при замене файла в одной
+# из копий загружается новый файл под новым именем.
+#
+# bulk_create не вызывает сигналы, поэтому готовый HTML уроков (sanitizer.py) копируется
+# как есть, документы поиска пишутся здесь же, а кэш прав учителей (permissions.py) сбрасывается.
+# Кэшировать по новому курсу ещё нечего: ключи версий и ответов — по новым id.
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Course, CourseFeature, Lesson, Module, Resource, TeacherCard, Test, TestQuestion
+from .permissions import invalidate_editable_modules
+from .search import index_new_lessons, index_new_questions
+
+
+def _copy(instance, **overrides):
+    """Несохранённая копия объекта: все поля, кроме первичного ключа (новый UUID — по умолчанию)."""
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+    }
+    values.update(overrides)
+    return type(instance)(**values)
+
+
+def _keep_order(model, objects, created_at):
+    """
+    auto_now_add при bulk_create ставит всем почти одинаковое "сейчас", а порядок модулей
+    и уроков в курсе задаёт created_at — выставляем его заново по порядку оригинала.
+    """
+    for index, obj in enumerate(objects):
+        obj.created_at = created_at + timedelta(microseconds=index)
+    model.objects.bulk_update(objects, ['created_at'])
+
+
+def clone_course(course, title=None, published=False, copy_teachers=True):
+    """
+    Копирует курс со всем содержимым. Возвращает новый курс.
+    title — название копии (по умолчанию "<название> (копия)"); копия не опубликована,
+    пока не передан published=True. copy_teachers=False — без преподавателей курса и модулей.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        modules = list(Module.objects.filter(course=course).order_by('created_at', 'id'))
+        lessons = list(Lesson.objects.filter(module__course=course).order_by('created_at', 'id'))
+        resources = list(Resource.objects.filter(lesson__module__course=course).order_by('created_at', 'id'))
+        tests = list(Test.objects.filter(module__course=course).order_by('created_at', 'id'))
+        questions = list(TestQuestion.objects.filter(test__module__course=course).order_by('created_at', 'id'))
+
+        new_course = _copy(course, title=title or f"{course.title} (копия)", published=published)
+        new_course.save(force_insert=True)
+
+        module_ids, lesson_ids, test_ids = {}, {}, {}
+        new_modules = []
+        for module in modules:
+            new_modules.append(_copy(module, course_id=new_course.pk))
+            module_ids[module.pk] = new_modules[-1].pk
+        Module.objects.bulk_create(new_modules)
+        _keep_order(Module, new_modules, now)
+
+        new_lessons = []
+        for lesson in lessons:
+            new_lessons.append(_copy(lesson, module_id=module_ids[lesson.module_id]))
+            lesson_ids[lesson.pk] = new_lessons[-1].pk
+        Lesson.objects.bulk_create(new_lessons)
+        _keep_order(Lesson, new_lessons, now)
+
+        Resource.objects.bulk_create([
+            _copy(resource, lesson_id=lesson_ids[resource.lesson_id]) for resource in resources
+        ])
+
+        new_tests = []
+        for test in tests:
+            new_tests.append(_copy(test, module_id=module_ids[test.module_id]))
+            test_ids[test.pk] = new_tests[-1].pk
+        Test.objects.bulk_create(new_tests)
+
+        new_questions = [
+            _copy(question, test_id=test_ids[question.test_id], created_at=now + timedelta(microseconds=index))
+            for index, question in enumerate(questions)
+        ]
+        TestQuestion.objects.bulk_create(new_questions)
+
+        CourseFeature.objects.bulk_create([
+            _copy(feature, course_id=new_course.pk) for feature in CourseFeature.objects.filter(course=course)
+        ])
+        TeacherCard.objects.bulk_create([
+            _copy(card, course_id=new_course.pk) for card in TeacherCard.objects.filter(course=course)
+        ])
+
+        teacher_ids = set()
+        if copy_teachers:
+            course_teachers = Course.teachers.through
+            course_teachers.objects.bulk_create([
+                course_teachers(course_id=new_course.pk, user_id=user_id)
+                for user_id in course_teachers.objects.filter(course=course).values_list('user_id', flat=True)
+            ])
+            module_teachers = Module.teachers.through
+            links = list(module_teachers.objects.filter(module__course=course).values_list('module_id', 'user_id'))
+            module_teachers.objects.bulk_create([
+                module_teachers(module_id=module_ids[module_id], user_id=user_id) for module_id, user_id in links
+            ])
+            teacher_ids = {user_id for _, user_id in links}
+
+        index_new_lessons(new_lessons)
+        index_new_questions(new_questions, {test.pk: test.title for test in new_tests})
+
+        # m2m_changed при bulk_create не срабатывает — учителям стали доступны новые модули
+        transaction.on_commit(lambda: invalidate_editable_modules(teacher_ids))
+    return new_course
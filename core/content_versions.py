@@ -0,0 +1,34 @@
+# eduplatform/core/content_versions.py
+#
+# "Версия содержимого" курса — случайная метка в кэше Django.
+# Любое изменение модуля, урока или теста курса (см. signals.py) выдаёт новую метку,
+# поэтому всё, что закэшировано с ключом от версии (например, навигация в course.html),
+# автоматически перестаёт совпадать и пересобирается.
+# Новая метка должна увидеться всеми воркерами — отсюда требование общего кэша (checks.py).
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Сколько живут кэшированные фрагменты, привязанные к версии
+COURSE_OUTLINE_TIMEOUT = getattr(settings, 'COURSE_OUTLINE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def course_version_cache_key(course_id):
+    return f'core:course_version:{course_id}'
+
+
+def get_course_version(course_id):
+    version = cache.get(course_version_cache_key(course_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        # add(), а не set(): если параллельный запрос успел записать версию, берём её
+        if not cache.add(course_version_cache_key(course_id), version, None):
+            version = cache.get(course_version_cache_key(course_id), version)
+    return version
+
+
+def bump_course_version(course_id):
+    if course_id is not None:
+        cache.set(course_version_cache_key(course_id), uuid.uuid4().hex, None)
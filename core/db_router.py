@@ -0,0 +1,144 @@
+# eduplatform/core/db_router.py
+#
+# Чтение с реплики для страниц, которые только показывают данные (index, course,
+# new_lesson_detail, GET профиля). Реплика — алиас 'replica' в DATABASES
+# (задаётся DATABASE_REPLICA_URL, см. settings.py); без него всё идёт в основную базу.
+#
+# На реплику уходят только чтения внутри view с декоратором @use_replica и только для GET/HEAD.
+# Запись всегда в 'default'. Чтобы пользователь видел свои изменения (read-your-writes):
+#   - после первой записи в запросе остальные чтения этого запроса идут в основную базу;
+#   - после POST/PUT/PATCH/DELETE middleware ставит cookie, и следующие REPLICA_PIN_SECONDS
+#     секунд (с запасом на отставание репликации) чтения этого браузера тоже идут в основную.
+# Сессия и request.user загружаются из основной базы до переключения на реплику.
+
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+REPLICA = 'replica'
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Разрешено ли сейчас читать с реплики (выставляет @use_replica)
+_use_replica = ContextVar('use_replica', default=False)
+# Состояние текущего запроса: {'pinned': cookie после записи, 'wrote': была запись в этом запросе}.
+# Словарь изменяется на месте — так флаг записи виден и из потоков sync_to_async (копия контекста)
+_request_state = ContextVar('db_request_state', default=None)
+
+
+def replica_configured():
+    return REPLICA in connections.settings
+
+
+def _replica_allowed():
+    if not _use_replica.get() or not replica_configured():
+        return False
+    state = _request_state.get()
+    return not (state and (state['pinned'] or state['wrote']))
+
+
+def _load_user(request):
+    # request.user ленивый: загружаем его (сессия + пользователь) из основной базы до переключения
+    user = getattr(request, 'user', None)
+    if user is not None:
+        user.is_authenticated
+
+
+def use_replica(view):
+    """
+    Декоратор view: чтения при GET/HEAD идут на реплику (если она настроена).
+    Сессия и пользователь загружаются из основной базы до переключения.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapped(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await view(request, *args, **kwargs)
+            await request.auser()
+            token = _use_replica.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+        return async_wrapped
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        _load_user(request)
+        token = _use_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_allowed():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # get_or_create и select_for_update тоже сюда: дальше в этом запросе читаем основную базу
+        state = _request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, связи между объектами из них допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему реплики меняет репликация, а не migrate
+        return db != REPLICA
+
+
+class PrimaryPinMiddleware:
+    """
+    Закрепляет чтения за основной базой после записи (см. комментарий в начале файла).
+    Поддерживает и sync, и async цепочку — под ASGI не добавляет переход в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(request, response)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(request, response)
+
+    def _start(self, request):
+        return _request_state.set({'pinned': bool(request.COOKIES.get(PIN_COOKIE)), 'wrote': False})
+
+    def _finish(self, request, response):
+        if request.method not in SAFE_METHODS and replica_configured():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
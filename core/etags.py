@@ -0,0 +1,124 @@
+# eduplatform/core/etags.py
+#
+# Условные GET (ETag / If-None-Match) для HTMX-фрагментов урока и теста.
+# Ученик щёлкает по урокам в меню course.html туда-обратно, и каждый щелчок раньше заново
+# рендерил фрагмент целиком. Теперь view отдаёт ETag и Cache-Control: private, no-cache —
+# браузер кладёт фрагмент в свой кэш и при следующем hx-get сам присылает If-None-Match.
+# Если ничего не менялось, ответ — 304 без загрузки урока и без шаблона (для XHR браузер
+# превращает 304 в 200 с телом из кэша, HTMX ничего об этом не знает).
+#
+# ETag собирается из дешёвых значений:
+#   - версии содержимого курса (content_versions.py) — меняется при правке модуля, урока,
+#     теста, вопроса, материала и при готовности размеров картинки урока (см. signals.py, images.py);
+#   - состояния ученика (урок пройден / модуль пройден, время черновика теста — drafts.py);
+#     строку Progress урока создаёт уже lesson_etag (её создание — побочный эффект открытия
+#     урока, и 304 не должен его пропускать), view берёт её готовой из request; prefetch
+#     (navigation.py) строку не создаёт — открытие из кэша браузера всё равно перепроверит ETag;
+#     test_etag так же оставляет в request модуль и флаг "тест открыт" для new_test_detail;
+#   - секрета CSRF: во фрагменте есть {% csrf_token %}, после смены секрета (вход) старая
+#     копия не годится.
+# Версия курса живёт в кэше Django, поэтому кэш должен быть общим для всех воркеров
+# (как и для кэша навигации в course.html).
+
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from .content_versions import get_course_version
+from .models import Lesson, Module, ModuleProgress, Progress, TestDraft
+from .navigation import is_prefetch
+
+
+def make_etag(*parts):
+    # Слабый ETag: тело может отличаться байтами (маска CSRF-токена), но по смыслу то же
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _csrf_secret(request):
+    # Без куки секрет появится только при рендере {% csrf_token %} — уже после расчёта ETag,
+    # и ETag первого ответа не совпал бы со вторым. get_token() заводит секрет сразу.
+    get_token(request)
+    return request.META.get('CSRF_COOKIE', '')
+
+
+def _finish(request, response, etag):
+    if request.method in ('GET', 'HEAD'):
+        response.headers.setdefault('ETag', etag)
+        # private — фрагмент свой у каждого ученика; no-cache — хранить можно, но каждый раз сверять
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def conditional_partial(etag_func):
+    """
+    Декоратор view: etag_func(request, *args, **kwargs) считает ETag (для async-view — корутина).
+    Совпал с If-None-Match — 304 без вызова view. None — ETag нет, view работает как обычно.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapped(request, *args, **kwargs):
+                etag = await etag_func(request, *args, **kwargs) if request.method in ('GET', 'HEAD') else None
+                if etag is None:
+                    return await view(request, *args, **kwargs)
+                response = get_conditional_response(request, etag=etag)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(request, response, etag)
+            return async_wrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            etag = etag_func(request, *args, **kwargs) if request.method in ('GET', 'HEAD') else None
+            if etag is None:
+                return view(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _finish(request, response, etag)
+        return wrapped
+    return decorator
+
+
+async def lesson_etag(request, lesson_id):
+    """
+    ETag фрагмента урока: версия курса + пройден ли урок. Два лёгких запроса.
+    Строка Progress создаётся здесь же (как во view) и сохраняется в request.lesson_progress;
+    для prefetch — только читается (если её нет, в request кладётся несохранённая).
+    """
+    course_id = await Lesson.objects.filter(pk=lesson_id).values_list('module__course_id', flat=True).afirst()
+    if course_id is None:
+        return None
+    user = await request.auser()
+    if is_prefetch(request):
+        progress = await Progress.objects.filter(student=user, lesson_id=lesson_id).afirst()
+        progress = progress or Progress(student=user, lesson_id=lesson_id)
+    else:
+        progress, _ = await Progress.objects.aget_or_create(student=user, lesson_id=lesson_id)
+    request.lesson_progress = progress
+    return make_etag('lesson', lesson_id, get_course_version(course_id), user.pk, progress.passed,
+                     _csrf_secret(request))
+
+
+async def test_etag(request, module_id):
+    """
+    ETag фрагмента теста: версия курса + открыт ли тест + время сохранения черновика.
+    Модуль и флаг "тест открыт" сохраняются в request.test_module / request.test_unlocked.
+    """
+    module = await Module.objects.filter(pk=module_id).afirst()
+    if module is None:
+        return None
+    user = await request.auser()
+    unlocked = await ModuleProgress.ais_module_complete(user, module)
+    request.test_module, request.test_unlocked = module, unlocked
+    # Фрагмент заполнен ответами из черновика — каждое автосохранение меняет ETag
+    draft_saved = await TestDraft.objects.filter(
+        student=user, test__module_id=module_id
+    ).values_list('updated_at', flat=True).afirst()
+    return make_etag('test', module_id, get_course_version(module.course_id), user.pk, unlocked, draft_saved,
+                     _csrf_secret(request))
@@ -0,0 +1,294 @@
+# eduplatform/core/exports.py
+#
+# Потоковая выгрузка попыток тестов, ответов и прогресса в CSV и XLSX.
+# Раньше оценки вытаскивали через списки в админке, которые на больших таблицах не успевали
+# отрисоваться. Здесь строки читаются из базы порциями (QuerySet.iterator(chunk_size=...)),
+# имена учеников и названия тестов/уроков приходят JOIN'ом в том же запросе (values_list),
+# а файл отдаётся по мере формирования — память не растёт с размером выгрузки.
+#
+# Используется во view teacher_export и в команде `python manage.py export_data`.
+
+import csv
+import io
+import uuid
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .models import Progress, TestAnswer, TestSubmission
+
+CHUNK_SIZE = 2000
+# Сколько байт копить перед отдачей очередного куска ответа
+FLUSH_SIZE = 64 * 1024
+
+# Выгрузка -> модель, колонки (заголовок, поле для values_list) и пути для фильтров
+EXPORTS = {
+    'submissions': {
+        'model': TestSubmission,
+        'title': 'Попытки тестов',
+        'columns': (
+            ('ID попытки', 'id'),
+            ('Ученик', 'student__username'),
+            ('Email', 'student__email'),
+            ('Курс', 'test__module__course__title'),
+            ('Модуль', 'test__module__title'),
+            ('Тест', 'test__title'),
+            ('Дата отправки', 'submitted_at'),
+            ('Статус', 'status'),
+            ('Балл (%)', 'score'),
+            ('Пройден', 'passed'),
+        ),
+        'module': 'test__module',
+        'test': 'test',
+        'date': 'submitted_at',
+    },
+    'answers': {
+        'model': TestAnswer,
+        'title': 'Ответы',
+        'columns': (
+            ('ID попытки', 'submission_id'),
+            ('Ученик', 'submission__student__username'),
+            ('Курс', 'submission__test__module__course__title'),
+            ('Модуль', 'submission__test__module__title'),
+            ('Тест', 'submission__test__title'),
+            ('Дата отправки', 'submission__submitted_at'),
+            ('Вопрос', 'question__text'),
+            ('Тип вопроса', 'question__question_type'),
+            ('Ответ', 'answer_text'),
+            ('Балл', 'score'),
+            ('Макс. балл', 'question__max_score'),
+            ('Проверен', 'graded'),
+        ),
+        'module': 'submission__test__module',
+        'test': 'submission__test',
+        'date': 'submission__submitted_at',
+    },
+    'progress': {
+        'model': Progress,
+        'title': 'Прогресс',
+        'columns': (
+            ('Ученик', 'student__username'),
+            ('Email', 'student__email'),
+            ('Курс', 'lesson__module__course__title'),
+            ('Модуль', 'lesson__module__title'),
+            ('Урок', 'lesson__title'),
+            ('Пройдено', 'passed'),
+            ('Дата завершения', 'completed_at'),
+        ),
+        'module': 'lesson__module',
+        # У прогресса нет теста — фильтр по тесту сужает выгрузку до модуля этого теста
+        'test': None,
+        'date': 'completed_at',
+    },
+}
+FORMATS = ('csv', 'xlsx')
+
+
+def export_queryset(kind, course=None, module=None, test=None, date_from=None, date_to=None, modules=None):
+    """
+    Queryset кортежей для выгрузки `kind` с фильтрами.
+    `modules` — ограничение по модулям (queryset id модулей учителя), None — без ограничения.
+    """
+    spec = EXPORTS[kind]
+    module_path = spec['module']
+    queryset = spec['model'].objects.all()
+    if modules is not None:
+        queryset = queryset.filter(**{f'{module_path}_id__in': modules})
+    if course:
+        queryset = queryset.filter(**{f'{module_path}__course_id': course})
+    if module:
+        queryset = queryset.filter(**{f'{module_path}_id': module})
+    if test:
+        if spec['test']:
+            queryset = queryset.filter(**{f"{spec['test']}_id": test})
+        else:
+            queryset = queryset.filter(**{f'{module_path}__tests': test})
+    if date_from:
+        queryset = queryset.filter(**{f"{spec['date']}__date__gte": date_from})
+    if date_to:
+        queryset = queryset.filter(**{f"{spec['date']}__date__lte": date_to})
+    # Порядок по дате и pk — стабильный и идёт по индексам
+    return queryset.order_by(spec['date'], 'pk').values_list(*(field for _, field in spec['columns']))
+
+
+def parse_filters(params):
+    """
+    Фильтры выгрузки из GET-параметров или опций команды: course, module, test (UUID),
+    date_from, date_to (ГГГГ-ММ-ДД). Неверное значение -> ValueError.
+    """
+    filters = {}
+    for name in ('course', 'module', 'test'):
+        value = params.get(name)
+        if value:
+            filters[name] = uuid.UUID(str(value))
+    for name in ('date_from', 'date_to'):
+        value = params.get(name)
+        if value:
+            filters[name] = date.fromisoformat(str(value))
+    return filters
+
+
+def _format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'да' if value else 'нет'
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (int, float)):
+        return value
+    return str(value)
+
+
+# Текст, который Excel/LibreOffice приняли бы за формулу (ответы и имена вводят ученики)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _neutralize_formula(value):
+    """Строку, начинающуюся как формула, экранирует апострофом — таблица покажет её как текст."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_rows(kind, **filters):
+    """Заголовок и строки выгрузки; база читается порциями по CHUNK_SIZE."""
+    yield [header for header, _ in EXPORTS[kind]['columns']]
+    for row in export_queryset(kind, **filters).iterator(chunk_size=CHUNK_SIZE):
+        yield [_format_value(value) for value in row]
+
+
+def stream_csv(rows):
+    """CSV кусками по ~FLUSH_SIZE байт. BOM в начале — чтобы Excel понял UTF-8."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    for row in rows:
+        writer.writerow([_neutralize_formula(value) for value in row])
+        if buffer.tell() >= FLUSH_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+# --- XLSX ---
+# Минимальная книга из одного листа: строки пишутся inline (без sharedStrings), поэтому лист
+# можно сжимать в zip потоком. zipfile умеет писать в поток без seek (data descriptor после файла).
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_FOOTER = '</sheetData></worksheet>'
+
+# Управляющие символы, запрещённые в XML 1.0 (могут попасться в ответах учеников)
+_XML_ILLEGAL = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+class _StreamBuffer:
+    """Файлоподобный объект без seek: zipfile пишет сюда, генератор забирает байты."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = escape(_neutralize_formula(str(value)).translate(_XML_ILLEGAL))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(rows, sheet_name='Лист1'):
+    """XLSX кусками по мере заполнения буфера."""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        # Имя листа в Excel — до 31 символа, без []:*?/\
+        sheet_name = ''.join(ch for ch in sheet_name if ch not in '[]:*?/\\')[:31] or 'Лист1'
+        archive.writestr('xl/workbook.xml', WORKBOOK_XML.format(name=escape(sheet_name, {'"': '&quot;'})))
+        yield buffer.pop()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(SHEET_HEADER.encode('utf-8'))
+            for row in rows:
+                sheet.write(('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>').encode('utf-8'))
+                if buffer.size >= FLUSH_SIZE:
+                    yield buffer.pop()
+            sheet.write(SHEET_FOOTER.encode('utf-8'))
+    yield buffer.pop()
+
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def stream_export(kind, fmt='csv', **filters):
+    """Байты выгрузки `kind` в формате fmt ('csv' или 'xlsx')."""
+    rows = export_rows(kind, **filters)
+    if fmt == 'xlsx':
+        return stream_xlsx(rows, sheet_name=EXPORTS[kind]['title'])
+    return stream_csv(rows)
+
+
+def export_filename(kind, fmt):
+    return f"{kind}-{timezone.localdate():%Y%m%d}.{fmt}"
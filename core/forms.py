@@ -2,28 +2,9 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from .models import User, Lesson, Module, Test, TestQuestion
 from django_summernote.widgets import SummernoteWidget  # <-- 1. ДОБАВЛЕН ЭТОТ ИМПОРТ
-import re
+from .question_import import detect_format
+from django.conf import settings
 
-def clean_summernote_content(html):
-    if not html:
-        return ''
-
-    # 1. Убираем <br> в пустых ячейках таблицы — НО ТОЛЬКО если ячейка РЕАЛЬНО пуста
-    # Было: удаляло <td><br></td> → плохо
-    # Стало: оставляем <br>, если ячейка иначе была бы пустой
-    html = re.sub(r'<(td|th)([^>]*)>\s*<br\s*/?>\s*</\1>', r'<\1\2><br></\1>', html)
-
-    # 2. Убираем полностью пустые теги <p>, <div>, <h1>-<h6>
-    html = re.sub(r'<(p|h[1-6]|div)([^>]*)>\s*</\1>', '', html)
-
-    # 3. Убираем пустые <br> в конце
-    html = html.strip()
-    html = re.sub(r'<br\s*/?>$', '', html, flags=re.IGNORECASE)
-
-    # 4. Убираем class="" у заголовков
-    html = re.sub(r'<(h[1-6]) class="">', r'<\1>', html)
-
-    return html.strip()
 
 class CustomUserCreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
@@ -115,16 +96,19 @@ class TestForm(forms.ModelForm):
     class Meta:
         model = Test
         # --- ДОБАВЛЕНО ПОЛЕ ---
-        fields = ['title', 'description', 'passing_score']
+        fields = ['title', 'description', 'passing_score', 'questions_per_attempt', 'stratify_by_score']
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-input'}),
             'description': forms.Textarea(attrs={'class': 'form-input', 'rows': 4}),
             'passing_score': forms.NumberInput(attrs={'class': 'form-input', 'min': 0, 'max': 100}),
+            'questions_per_attempt': forms.NumberInput(attrs={'class': 'form-input', 'min': 1}),
         }
         labels = {
             'title': 'Название теста',
             'description': 'Описание (инструкция)',
             'passing_score': 'Проходной балл (в %)',
+            'questions_per_attempt': 'Вопросов в попытке (пусто — все)',
+            'stratify_by_score': 'Выбирать вопросы пропорционально баллам',
         }
 # eduplatform/core/forms.py
 # forms.py
@@ -157,4 +141,39 @@ class QuestionForm(forms.ModelForm):
         }
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['correct_answer'].required = False
\ No newline at end of file
+        self.fields['correct_answer'].required = False
+
+
+class QuestionImportForm(forms.Form):
+    """Загрузка файла с вопросами для массового импорта (question_import.py)."""
+    FORMAT_CHOICES = (
+        ('', 'По расширению файла'),
+        ('csv', 'CSV'),
+        ('json', 'JSON / JSON Lines'),
+        ('gift', 'GIFT (Moodle)'),
+    )
+
+    file = forms.FileField(
+        label='Файл с вопросами',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-input', 'accept': '.csv,.json,.jsonl,.gift,.txt'}),
+    )
+    format = forms.ChoiceField(
+        label='Формат', choices=FORMAT_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'form-input'}),
+    )
+    skip_invalid = forms.BooleanField(
+        label='Пропустить строки с ошибками (иначе при любой ошибке ничего не импортируется)', required=False,
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('file')
+        if upload is None:
+            return cleaned_data
+        max_size = getattr(settings, 'QUESTION_IMPORT_MAX_SIZE', 10 * 1024 * 1024)
+        if upload.size > max_size:
+            raise forms.ValidationError(f"Файл больше {max_size // (1024 * 1024)} МБ.")
+        cleaned_data['format'] = cleaned_data.get('format') or detect_format(upload.name)
+        if not cleaned_data['format']:
+            raise forms.ValidationError("Не удалось определить формат по расширению — выберите его.")
+        return cleaned_data
@@ -0,0 +1,30 @@
+# eduplatform/core/grading.py
+#
+# Фоновая автопроверка попыток тестов. При GRADE_IN_BACKGROUND=True new_test_submit только
+# принимает попытку (TestSubmission.enqueue), а auto_grade() выполняет воркер
+# (`python manage.py run_worker --concurrency N`). Страница результата опрашивает
+# submission_status, пока статус 'queued'.
+#
+# Воркер — отдельный процесс: при локальном кэше (LocMemCache) он не видит сброса ключей
+# ответов из веб-процесса (invalidate_answer_key) и оценивал бы по устаревшему ключу.
+# Поэтому в задаче ключ всегда собирается из базы, мимо кэша.
+
+from django.conf import settings
+
+from .jobs import job_handler
+from .models import TestSubmission
+
+JOB_KIND = 'grade_submission'
+
+
+def grade_in_background():
+    return getattr(settings, 'GRADE_IN_BACKGROUND', False)
+
+
+@job_handler(JOB_KIND)
+def grade_submission(payload):
+    submission = TestSubmission.objects.filter(pk=payload['submission_id']).first()
+    # Попытку удалили или её уже оценили (повтор задачи после сбоя воркера) — делать нечего
+    if submission is None or submission.status != TestSubmission.STATUS_QUEUED:
+        return
+    submission.auto_grade(fresh_key=True)
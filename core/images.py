@@ -0,0 +1,157 @@
+# eduplatform/core/images.py
+#
+# Производные размеры загруженных изображений (аватары, обложки курсов, картинки уроков,
+# фото преподавателей): несколько ширин в WebP и JPEG, без EXIF (в т.ч. GPS с камер).
+# Файлы кладутся рядом с оригиналом: avatars/photo.jpg -> avatars/photo__640w.webp.
+#
+# Считаются не в запросе загрузки, а фоновым воркером (jobs.py): сигнал pre_save замечает
+# новый файл и обнуляет <поле>_variants, post_save ставит задачу. Пока производных нет,
+# шаблоны показывают оригинал (тег responsive_image в templatetags/image_tags.py).
+
+import os
+import re
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .content_versions import bump_course_version
+from .jobs import enqueue, job_handler
+from .models import Course, Lesson, TeacherCard, User
+
+JOB_KIND = 'image_derivatives'
+
+# Модель -> поля-изображения. Для каждого поля есть JSONField '<поле>_variants'
+IMAGE_FIELDS = {
+    User: ('avatar',),
+    Course: ('cover_image',),
+    Lesson: ('image_file',),
+    TeacherCard: ('photo',),
+}
+
+FORMATS = (
+    # (расширение, формат Pillow, параметры сохранения)
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+VARIANT_RE = re.compile(r'^(?P<width>\d+)w\.(?P<ext>webp|jpg)$')
+
+
+def derivative_widths():
+    return tuple(sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 1280))))
+
+
+def variants_field(field_name):
+    return f"{field_name}_variants"
+
+
+def derivative_name(name, width, ext):
+    root, _ = os.path.splitext(name)
+    return f"{root}__{width}w.{ext}"
+
+
+def current_variants(field_file):
+    """Описание производных для файла или {} — если их ещё нет или они от прежнего файла."""
+    if not field_file:
+        return {}
+    variants = getattr(field_file.instance, variants_field(field_file.field.name), None) or {}
+    if variants.get('name') != field_file.name:
+        return {}
+    return variants
+
+
+def derivative_file(field_file, variant):
+    """
+    FieldFile производной по строке вида '640w.webp' (для отдачи через защищённый endpoint).
+    None — такой производной нет.
+    """
+    match = VARIANT_RE.match(variant or '')
+    if not match or int(match.group('width')) not in current_variants(field_file).get('widths', ()):
+        return None
+    name = derivative_name(field_file.name, match.group('width'), match.group('ext'))
+    return field_file.field.attr_class(field_file.instance, field_file.field, name)
+
+
+def _encode(image, pil_format, options, icc_profile):
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        # У JPEG нет прозрачности — кладём на белый фон
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    # exif не передаём — метаданные (камера, геопозиция) не попадают в файл.
+    # ICC-профиль оставляем, иначе поплывут цвета у фото с широким охватом.
+    if icc_profile:
+        options = {**options, 'icc_profile': icc_profile}
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def generate_derivatives(field_file):
+    """
+    Создаёт производные для файла и возвращает описание для '<поле>_variants':
+    {'name': исходный файл, 'widths': [ширины производных по возрастанию]}.
+    """
+    storage = field_file.storage
+    widths = derivative_widths()
+    with storage.open(field_file.name, 'rb') as source, Image.open(source) as original:
+        # Для JPEG декодируем сразу в уменьшенном масштабе (1/2, 1/4, 1/8) — в разы быстрее
+        # для многомегабайтных фото; квадрат max×max гарантирует, что после поворота ширины хватит
+        original.draft('RGB', (widths[-1], widths[-1]))
+        icc_profile = original.info.get('icc_profile')
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+        width, height = image.size
+        # Оригинал уже самой крупной ширины — добавляем его собственную ширину,
+        # иначе для широкого слота браузеру достанется только уменьшенная копия
+        targets = [w for w in widths if w < width]
+        if width <= widths[-1]:
+            targets.append(width)
+        for target in targets:
+            resized = image if target == width else image.resize(
+                (target, max(1, round(height * target / width))), Image.LANCZOS
+            )
+            for ext, pil_format, options in FORMATS:
+                name = derivative_name(field_file.name, target, ext)
+                if storage.exists(name):
+                    storage.delete(name)
+                storage.save(name, ContentFile(_encode(resized, pil_format, options, icc_profile)))
+
+    return {'name': field_file.name, 'widths': targets}
+
+
+def enqueue_derivatives(instance, field_name):
+    field_file = getattr(instance, field_name)
+    return enqueue(JOB_KIND, {
+        'model': instance._meta.label_lower,
+        'pk': str(instance.pk),
+        'field': field_name,
+        'name': field_file.name,
+    }, dedupe=True)
+
+
+@job_handler(JOB_KIND)
+def build_derivatives(payload):
+    model = apps.get_model(payload['model'])
+    field_name = payload['field']
+    instance = model.objects.filter(pk=payload['pk']).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    if field_file.name != payload['name']:
+        # Файл успели заменить — новой версией займётся следующая задача
+        return
+    variants = generate_derivatives(field_file)
+    # UPDATE с условием на имя файла: не затираем результат, если файл заменили во время обработки.
+    # save() не вызываем — сигналы (поиск, версии курса) тут не нужны
+    updated = model.objects.filter(pk=instance.pk, **{field_name: payload['name']}).update(
+        **{variants_field(field_name): variants}
+    )
+    if updated and model is Lesson:
+        # ...но фрагмент урока кэшируется браузером по версии курса (etags.py) — в нём srcset
+        bump_course_version(instance.module.course_id)
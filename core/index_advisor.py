@@ -0,0 +1,119 @@
+# eduplatform/core/index_advisor.py
+#
+# Сбор SQL-запросов во время прогона нагрузки и разбор их планов выполнения.
+# SQLite: EXPLAIN QUERY PLAN, PostgreSQL: EXPLAIN (FORMAT JSON).
+# Ищем последовательные сканирования таблиц и сортировки, которые не покрыты индексами.
+
+import json
+import re
+from collections import OrderedDict
+from contextlib import contextmanager
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+# SQLite: "SCAN core_progress" (без индекса) и "USE TEMP B-TREE FOR ORDER BY"
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<table>\w+)(?: AS \w+)?(?P<rest>.*)$')
+SQLITE_SORT = re.compile(r'USE TEMP B-TREE FOR (?P<what>ORDER BY|GROUP BY|DISTINCT|RIGHT PART OF ORDER BY)')
+MAIN_TABLE = re.compile(r'\b(?:FROM|UPDATE)\s+"?(?P<table>\w+)"?', re.IGNORECASE)
+
+
+class QueryRecorder:
+    """Запоминает уникальные SQL (с параметрами первого вызова) и сколько раз они выполнялись."""
+
+    def __init__(self):
+        self.statements = OrderedDict()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith(EXPLAINABLE):
+            entry = self.statements.setdefault(sql, {'sql': sql, 'params': params, 'count': 0})
+            entry['count'] += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def record_queries(connection):
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        yield recorder
+
+
+def explain(connection, sql, params):
+    """
+    Возвращает {'seq_scans': [таблицы], 'sorts': [описания], 'plan': [строки плана]}.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            details = [row[-1] for row in cursor.fetchall()]
+            return _analyze_sqlite(details)
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return _analyze_postgres(plan[0]['Plan'])
+    raise NotImplementedError(f"EXPLAIN для {connection.vendor} не поддерживается")
+
+
+def _analyze_sqlite(details):
+    seq_scans, sorts = [], []
+    for detail in details:
+        scan = SQLITE_SCAN.match(detail)
+        # "SCAN t USING INDEX ..." / "USING COVERING INDEX" — это обход по индексу, а не полный скан
+        if scan and 'INDEX' not in scan.group('rest'):
+            seq_scans.append(scan.group('table'))
+        sort = SQLITE_SORT.search(detail)
+        if sort:
+            sorts.append(sort.group('what'))
+    return {'seq_scans': seq_scans, 'sorts': sorts, 'plan': details}
+
+
+def _analyze_postgres(node, result=None):
+    if result is None:
+        result = {'seq_scans': [], 'sorts': [], 'plan': []}
+    node_type = node.get('Node Type', '')
+    result['plan'].append(f"{node_type} {node.get('Relation Name', '')}".strip())
+    if node_type == 'Seq Scan':
+        result['seq_scans'].append(node.get('Relation Name'))
+    elif node_type in ('Sort', 'Incremental Sort'):
+        result['sorts'].append(', '.join(node.get('Sort Key', [])))
+    for child in node.get('Plans', []):
+        _analyze_postgres(child, result)
+    return result
+
+
+def _main_table(sql):
+    match = MAIN_TABLE.search(sql)
+    return match.group('table') if match else '?'
+
+
+def analyze(connection, recorder):
+    """
+    Разбирает планы всех записанных запросов.
+    Возвращает список проблемных запросов и сводку по таблицам.
+    """
+    findings = []
+    tables = {}
+    for entry in recorder.statements.values():
+        try:
+            plan = explain(connection, entry['sql'], entry['params'])
+        except Exception as exc:  # запрос мог зависеть от уже откатанной транзакции и т.п.
+            findings.append({'sql': entry['sql'], 'count': entry['count'], 'error': str(exc)})
+            continue
+        if not plan['seq_scans'] and not plan['sorts']:
+            continue
+        findings.append({
+            'sql': entry['sql'],
+            'count': entry['count'],
+            'seq_scans': plan['seq_scans'],
+            'sorts': plan['sorts'],
+            'plan': plan['plan'],
+        })
+        for table in plan['seq_scans']:
+            stats = tables.setdefault(table, {'seq_scans': 0, 'sorts': 0})
+            stats['seq_scans'] += entry['count']
+        if plan['sorts']:
+            stats = tables.setdefault(_main_table(entry['sql']), {'seq_scans': 0, 'sorts': 0})
+            stats['sorts'] += entry['count']
+    findings.sort(key=lambda item: item['count'], reverse=True)
+    return findings, tables
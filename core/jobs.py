@@ -0,0 +1,133 @@
+# eduplatform/core/jobs.py
+#
+# Простая очередь фоновых задач на базе данных (модель Job) — без брокера и отдельного сервиса.
+# Задачу ставит enqueue(), выполняет воркер: `python manage.py run_worker`.
+# Обработчики регистрируются декоратором @job_handler('имя') в модулях, которые
+# импортируются при старте приложения (signals.py -> images.py, grading.py и т.д.).
+#
+# Ошибка обработчика -> повтор с экспоненциальной задержкой (JOB_RETRY_DELAY * 2^(попытка-1)),
+# после max_attempts задача остаётся в статусе 'failed' (dead letter) с текстом ошибки.
+# Задачи, зависшие в 'running' дольше JOB_TIMEOUT (воркер упал), возвращаются в очередь.
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def job_handler(kind):
+    """Регистрирует функцию handler(payload) для задач типа kind."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'JOB_RETRY_DELAY', 10)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), 3600))
+
+
+def enqueue(kind, payload=None, dedupe=False, max_attempts=None):
+    """
+    Ставит задачу в очередь. dedupe=True — не создавать дубль, если такая же задача
+    ещё ждёт выполнения (например, повторное сохранение объекта до отработки воркера).
+    """
+    payload = payload or {}
+    if dedupe:
+        existing = Job.objects.filter(kind=kind, payload=payload, status=Job.STATUS_PENDING).first()
+        if existing:
+            return existing
+    if max_attempts is None:
+        max_attempts = getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+    return Job.objects.create(kind=kind, payload=payload, max_attempts=max_attempts)
+
+
+def claim_next():
+    """
+    Забирает одну готовую к выполнению задачу. Захват — условный UPDATE по статусу,
+    поэтому несколько воркеров не возьмут одну задачу дважды (и в SQLite, и в PostgreSQL).
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.STATUS_PENDING, run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        claimed = Job.objects.filter(pk=job_id, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING, started_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """Выполняет задачу и записывает результат. Возвращает True при успехе."""
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"Нет обработчика для задач типа '{job.kind}'")
+        with transaction.atomic():
+            handler(job.payload)
+    except Exception:
+        logger.exception("Задача %s (%s) завершилась ошибкой (попытка %s из %s)",
+                         job.pk, job.kind, job.attempts, job.max_attempts)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.STATUS_PENDING
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+        else:
+            job.status = Job.STATUS_FAILED
+    else:
+        job.status = Job.STATUS_DONE
+        job.last_error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'run_after', 'finished_at'])
+    return job.status == Job.STATUS_DONE
+
+
+def requeue_stale(timeout=None):
+    """
+    Возвращает в очередь задачи, которые слишком долго в 'running' (воркер упал или был убит).
+    Попытка уже засчитана при захвате, поэтому исчерпавшие лимит уходят в 'failed'.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'JOB_TIMEOUT', 300)
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, started_at__lt=now - timedelta(seconds=timeout))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.STATUS_FAILED, finished_at=now, last_error="Превышено время выполнения"
+    )
+    requeued = stale.update(status=Job.STATUS_PENDING, run_after=now)
+    return requeued + failed
+
+
+def requeue_failed(queryset):
+    """Повтор задач из dead letter: счётчик попыток обнуляется."""
+    return queryset.filter(status=Job.STATUS_FAILED).update(
+        status=Job.STATUS_PENDING, attempts=0, run_after=timezone.now(), finished_at=None
+    )
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи, пока они есть (или до limit). Возвращает число выполненных."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
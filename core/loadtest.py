@@ -0,0 +1,192 @@
+# eduplatform/core/loadtest.py
+#
+# Нагрузочный прогон по настоящему HTTP-серверу (gunicorn / uvicorn) для команды
+# `python manage.py benchmark_servers`. В отличие от benchmarking.py (тестовый Client
+# внутри процесса) здесь замеряется весь путь: сокет, сервер, WSGI/ASGI, middleware, view.
+#
+# Клиент — на asyncio без внешних зависимостей: N соединений, каждое шлёт запросы по кругу
+# до конца отведённого времени (keep-alive, если сервер его держит; sync-воркеры gunicorn
+# закрывают соединение после каждого ответа — тогда переподключаемся).
+
+import asyncio
+import importlib.util
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+SERVERS = ('gunicorn', 'uvicorn')
+
+
+def server_command(server, port, workers):
+    """Команда запуска сервера (как в продакшене, см. eduplatform/asgi.py)."""
+    bind = f"127.0.0.1:{port}"
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', 'eduplatform.wsgi:application',
+                '--bind', bind, '--workers', str(workers), '--worker-class', 'sync',
+                '--log-level', 'warning']
+    if server == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', 'eduplatform.asgi:application',
+                '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+                '--loop', 'auto', '--http', 'auto', '--no-access-log', '--log-level', 'warning']
+    raise ValueError(f"Неизвестный сервер: {server}")
+
+
+def server_available(server):
+    return importlib.util.find_spec(server) is not None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """Сервер в дочернем процессе на время блока with."""
+
+    def __init__(self, server, port, workers, env):
+        self.command = server_command(server, port, workers)
+        self.port = port
+        self.env = env
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, env=self.env, cwd=settings.BASE_DIR,
+                                        start_new_session=True)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Сервер завершился при запуске: {' '.join(self.command)}")
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=0.5).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError("Сервер не начал принимать соединения за 30 с")
+
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            # Вся группа процессов: мастер и его воркеры
+            os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+
+
+def build_request(method, path, cookies, headers=None, data=None):
+    body = urlencode(data).encode() if data else b''
+    lines = [
+        f"{method} {path} HTTP/1.1",
+        "Host: 127.0.0.1",
+        "Cookie: " + '; '.join(f"{name}={value}" for name, value in cookies.items()),
+        f"Content-Length: {len(body)}",
+    ]
+    if data is not None:
+        lines.append("Content-Type: application/x-www-form-urlencoded")
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+async def _read_response(reader):
+    """Статус и можно ли переиспользовать соединение. Тело читается и отбрасывается."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)  # данные + \r\n (у последнего куска — только \r\n)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+async def _client(port, requests, deadline, warmup_until, samples):
+    reader = writer = None
+    index = 0
+    while time.perf_counter() < deadline:
+        name, payload = requests[index % len(requests)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(payload)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status, keep_alive = None, False
+        finished = time.perf_counter()
+        if started >= warmup_until:
+            samples.append((name, finished - started, status))
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _summary(samples, seconds):
+    ok = [latency for _, latency, status in samples if status and 200 <= status < 300]
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(ok),
+        'rps': round(len(ok) / seconds, 1),
+        'p50_ms': round(_percentile(ok, 0.50) * 1000, 2) if ok else None,
+        'p99_ms': round(_percentile(ok, 0.99) * 1000, 2) if ok else None,
+    }
+
+
+def run_load(port, requests, duration, concurrency, warmup=1.0):
+    """
+    Гоняет `requests` — список (имя, байты запроса) — по кругу в `concurrency` соединений.
+    Возвращает итог (rps, p50/p99 по ответам 2xx) в целом и по каждому имени.
+    """
+    samples = []
+
+    async def main():
+        start = time.perf_counter()
+        warmup_until = start + warmup
+        deadline = warmup_until + duration
+        await asyncio.gather(*(
+            # Каждый клиент начинает со своего запроса, чтобы смесь была равномерной
+            _client(port, requests[i % len(requests):] + requests[:i % len(requests)],
+                    deadline, warmup_until, samples)
+            for i in range(concurrency)
+        ))
+
+    asyncio.run(main())
+    result = _summary(samples, duration)
+    result['views'] = {
+        name: _summary([sample for sample in samples if sample[0] == name], duration)
+        for name, _ in requests
+    }
+    return result
+
@@ -0,0 +1,115 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+
+from core.benchmarking import benchmark_database, seed, view_scenarios
+from core.index_advisor import analyze, record_queries
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет нагрузку (записанную или синтетическую), собирает все SQL-запросы, "
+        "выполняет для них EXPLAIN (SQLite: EXPLAIN QUERY PLAN, PostgreSQL: EXPLAIN) "
+        "и показывает полные сканирования таблиц и сортировки без индекса. "
+        "Запускайте отдельно для каждой СУБД через --database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workload',
+            help="JSON Lines с запросами: {\"method\": \"GET\", \"path\": \"/course/\", "
+                 "\"username\": \"ivan\", \"data\": {...}}. Запросы выполняются на рабочей базе "
+                 "и откатываются. Без этого параметра используется синтетическая нагрузка "
+                 "на временной тестовой базе.",
+        )
+        parser.add_argument('--database', default='default', help="Алиас базы данных.")
+        parser.add_argument('--lessons', type=int, default=200, help="Размер синтетических данных: уроков.")
+        parser.add_argument('--students', type=int, default=500, help="Размер синтетических данных: учеников.")
+        parser.add_argument('--json', action='store_true', help="Вывести отчёт в JSON.")
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections:
+            raise CommandError(f"Неизвестная база данных: {alias}")
+
+        if options['workload']:
+            report = self.replay_recorded(options['workload'], alias)
+        else:
+            with benchmark_database(alias) as connection:
+                data = seed(options['lessons'], options['students'])
+                with record_queries(connection) as recorder:
+                    for name, client, method, path, payload in view_scenarios(data):
+                        getattr(client, method)(path, payload or {})
+                report = self.build_report(connection, recorder)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            self.print_report(report)
+
+    def replay_recorded(self, path, alias):
+        connection = connections[alias]
+        clients = {}
+        with open(path, encoding='utf-8') as fh, record_queries(connection) as recorder:
+            for line_number, line in enumerate(fh, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as exc:
+                    raise CommandError(f"{path}:{line_number}: некорректный JSON ({exc})")
+
+                username = request.get('username')
+                if username not in clients:
+                    client = Client()
+                    if username:
+                        client.force_login(User.objects.using(alias).get(username=username))
+                    clients[username] = client
+
+                method = request.get('method', 'GET').upper()
+                data = request.get('data') or {}
+                if method not in ('GET', 'POST'):
+                    raise CommandError(f"{path}:{line_number}: поддерживаются только GET и POST")
+
+                # Изменения от POST-запросов нам не нужны — откатываем каждый запрос
+                with transaction.atomic(using=alias):
+                    getattr(clients[username], method.lower())(request['path'], data)
+                    transaction.set_rollback(True, using=alias)
+        return self.build_report(connection, recorder)
+
+    @staticmethod
+    def build_report(connection, recorder):
+        findings, tables = analyze(connection, recorder)
+        return {
+            'database': connection.vendor,
+            'statements': len(recorder.statements),
+            'executions': sum(entry['count'] for entry in recorder.statements.values()),
+            'tables': tables,
+            'findings': findings,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"СУБД: {report['database']}, уникальных запросов: {report['statements']}, "
+            f"выполнений: {report['executions']}"
+        )
+        if not report['findings']:
+            self.stdout.write(self.style.SUCCESS("Полных сканирований и сортировок без индекса не найдено."))
+            return
+
+        self.stdout.write("\nТаблицы (полных сканирований / сортировок без индекса, с учётом повторов):")
+        for table, stats in sorted(report['tables'].items(), key=lambda item: -item[1]['seq_scans']):
+            self.stdout.write(f"  {table}: {stats['seq_scans']} / {stats['sorts']}")
+
+        self.stdout.write("\nЗапросы:")
+        for finding in report['findings']:
+            self.stdout.write(self.style.WARNING(f"\n[x{finding['count']}] {finding['sql']}"))
+            if 'error' in finding:
+                self.stdout.write(f"    EXPLAIN не выполнен: {finding['error']}")
+                continue
+            for line in finding['plan']:
+                self.stdout.write(f"    {line}")
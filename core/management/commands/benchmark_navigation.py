@@ -0,0 +1,126 @@
+import json
+import platform
+import statistics
+import sys
+import time
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.benchmarking import benchmark_database, seed
+from core.models import User
+from core.navigation import course_sequence
+
+MODES = ('cold', 'prefetch')
+
+
+class BrowserCache:
+    """
+    Кэш браузера в миниатюре: тело и ETag по адресу. Повторный запрос идёт с If-None-Match,
+    на 304 отдаётся сохранённое тело (как делает браузер для XHR).
+    """
+
+    def __init__(self, client, enabled):
+        self.client = client
+        self.enabled = enabled
+        self.entries = {}
+
+    def get(self, url):
+        headers = {}
+        if self.enabled and url in self.entries:
+            headers['HTTP_IF_NONE_MATCH'] = self.entries[url]
+        response = self.client.get(url, **headers)
+        if self.enabled and response.status_code == 200 and response.has_header('ETag'):
+            self.entries[url] = response['ETag']
+        return response
+
+    def prefetch(self, response):
+        """Выполняет prefetch-подсказки из заголовка Link (браузер делает это в простое)."""
+        if not self.enabled or not response.has_header('Link'):
+            return 0
+        urls = [part.split(';')[0].strip()[1:-1] for part in response['Link'].split(',')]
+        for url in urls:
+            self.get(url)
+        return len(urls)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер воспринимаемой задержки перехода по курсу: ученик проходит уроки подряд "
+        "(открыть урок -> отметить пройденным -> следующий урок). Режим cold — каждый переход "
+        "полный запрос; prefetch — браузер выполняет подсказки Link (core/navigation.py) и "
+        "перепроверяет фрагмент по ETag. Замеряется только время перехода (клик -> ответ), "
+        "prefetch выполняется вне замера, как в простое браузера. Результат — JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lessons', type=int, default=100)
+        parser.add_argument('--students', type=int, default=100)
+        parser.add_argument('--steps', type=int, default=30, help="Сколько уроков пройти подряд.")
+        parser.add_argument('--output', help="Файл для JSON-результата (по умолчанию stdout).")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            data = seed(options['lessons'], options['students'])
+            steps = [step for step in course_sequence(data['course'].pk) if step['kind'] == 'lesson']
+            steps = steps[:options['steps']]
+            results = {mode: self.walk(mode, steps) for mode in MODES}
+
+        report = {
+            'meta': {
+                'django': django.get_version(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'database': connection.vendor,
+                'lessons': options['lessons'],
+                'students': options['students'],
+                'steps': len(steps),
+            },
+            'modes': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                fh.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Результат записан в {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def walk(self, mode, steps):
+        # Новый ученик на каждый режим: одинаковое состояние прогресса
+        cache.clear()
+        student = User.objects.create(username=f'bench_nav_{mode}', role='student')
+        client = Client()
+        client.force_login(student)
+        browser = BrowserCache(client, enabled=mode == 'prefetch')
+
+        timings, statuses, queries = [], {}, []
+        prefetched = 0
+        for step in steps:
+            url = reverse('core:new_lesson_detail', args=[step['id']])
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = browser.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            queries.append(len(captured))
+            prefetched += browser.prefetch(response)
+
+            completed = client.post(reverse('core:complete_lesson', args=[step['id']]))
+            prefetched += browser.prefetch(completed)
+
+        timings.sort()
+        return {
+            'navigations': len(timings),
+            'time_ms_median': round(statistics.median(timings), 3) if timings else None,
+            'time_ms_p95': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3) if timings else None,
+            'time_ms_mean': round(statistics.fmean(timings), 3) if timings else None,
+            'queries_median': statistics.median(queries) if queries else None,
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            'prefetch_requests': prefetched,
+        }
@@ -0,0 +1,117 @@
+import json
+import platform
+import statistics
+import sys
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.answer_keys import get_answer_key, invalidate_answer_key
+from core.benchmarking import benchmark_database, seed
+from core.models import TestDraft, TestQuestion, TestSubmission
+from core.sampling import draw_questions
+
+
+def _timed(func, repeat, setup=None):
+    """Медиана и p95 времени (мс) и число запросов последнего прогона; setup() — вне замера."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        # Журнал запросов ограничен (9000) и уже заполнен seed() — иначе счётчик всегда 0
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'time_ms_median': round(statistics.median(timings), 3),
+        'time_ms_p95': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'queries': len(captured),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер выборки вопросов из большого банка (sampling.py): ORDER BY RANDOM() против выборки "
+        "в памяти по кэшированному ключу ответов, открытие теста (первое — с выборкой, повторное — "
+        "из черновика) и отправка попытки. Результат — JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=10000, help="Размер банка вопросов.")
+        parser.add_argument('--per-attempt', type=int, default=50, help="Вопросов в попытке.")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help="Файл для JSON-результата (по умолчанию stdout).")
+
+    def handle(self, *args, **options):
+        per_attempt, repeat = options['per_attempt'], options['repeat']
+        with benchmark_database():
+            data = seed(10, 1, questions_per_test=options['questions'])
+            test, student = data['test'], data['student']
+            # Банк с разными баллами — для выборки по баллам (update() без сигналов, ключ сбрасываем сами)
+            question_ids = list(TestQuestion.objects.filter(test=test).values_list('pk', flat=True))
+            TestQuestion.objects.filter(pk__in=question_ids[::3]).update(max_score=2)
+            TestQuestion.objects.filter(pk__in=question_ids[1::5]).update(max_score=3)
+            invalidate_answer_key(test.pk)
+            test.questions_per_attempt = per_attempt
+            test.save()
+            TestSubmission.objects.filter(student=student).delete()
+
+            results = {
+                'answer_key_build': _timed(lambda: (invalidate_answer_key(test.pk), get_answer_key(test)), 5),
+            }
+            key = get_answer_key(test)
+
+            def order_by_random():
+                list(TestQuestion.objects.filter(test=test).order_by('?')[:per_attempt])
+
+            def in_memory(stratify):
+                def run():
+                    drawn = draw_questions(key, per_attempt, stratify)
+                    list(TestQuestion.objects.filter(pk__in=drawn))
+                return run
+
+            results['order_by_random'] = _timed(order_by_random, repeat)
+            results['draw_uniform'] = _timed(in_memory(False), repeat)
+            results['draw_stratified'] = _timed(in_memory(True), repeat)
+
+            client = Client()
+            client.force_login(student)
+            url = reverse('core:new_test_detail', args=[data['module'].id])
+
+            def clear_draft():
+                TestDraft.objects.filter(student=student).delete()
+
+            results['view_first_open'] = _timed(lambda: client.get(url), repeat, setup=clear_draft)
+            results['view_reopen'] = _timed(lambda: client.get(url), repeat)
+            # Перед каждой отправкой ученик открывает тест — попытка оценивается по его выборке
+            results['submit'] = _timed(
+                lambda: TestSubmission.submit(test, student, {}), repeat, setup=lambda: client.get(url)
+            )
+
+        report = {
+            'meta': {
+                'django': django.get_version(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'database': connection.vendor,
+                'questions': options['questions'],
+                'per_attempt': per_attempt,
+                'repeat': repeat,
+            },
+            'results': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                fh.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Результат записан в {options['output']}"))
+        else:
+            self.stdout.write(output)
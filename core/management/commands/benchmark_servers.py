@@ -0,0 +1,119 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from core.benchmarking import benchmark_database, seed
+from core.loadtest import SERVERS, Server, build_request, free_port, run_load, server_available
+
+# Любая строка из 32 символов годится как секрет CSRF: cookie и заголовок должны совпасть
+CSRF_TOKEN = 'b' * 32
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает gunicorn (sync-воркеры, WSGI) и uvicorn (ASGI, async-views) на HTMX-фрагментах "
+        "урока и теста: запросов в секунду, p50 и p99 задержки. Данные — временная база SQLite "
+        "с синтетическими данными (рабочая база не затрагивается). Результат — JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default=','.join(SERVERS),
+                            help="Через запятую: gunicorn,uvicorn (по умолчанию оба).")
+        parser.add_argument('--workers', type=int, default=2, help="Процессов-воркеров у каждого сервера.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Одновременных соединений.")
+        parser.add_argument('--duration', type=float, default=10, help="Секунд замера на сервер (после 1 с прогрева).")
+        parser.add_argument('--lessons', type=int, default=100)
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--output', help="Файл для JSON-результата (по умолчанию stdout).")
+
+    def handle(self, *args, **options):
+        servers = [name.strip() for name in options['servers'].split(',') if name.strip()]
+        for server in servers:
+            if server not in SERVERS:
+                raise CommandError(f"Неизвестный сервер: {server}")
+            if not server_available(server):
+                raise CommandError(f"{server} не установлен: pip install {server}")
+        if connection.vendor != 'sqlite':
+            raise CommandError("Бенчмарк готовит временную базу SQLite — запустите с DATABASE_URL=sqlite:///...")
+
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'benchmark.sqlite3')
+            # Тестовая база — файл, а не память: её должны видеть процессы серверов
+            test_settings = connection.settings_dict['TEST']
+            previous_name = test_settings.get('NAME')
+            test_settings['NAME'] = db_path
+            try:
+                with benchmark_database():
+                    data = seed(options['lessons'], options['students'])
+                    requests = self.build_requests(data)
+                    connection.close()
+                    env = {
+                        **os.environ,
+                        'DJANGO_SETTINGS_MODULE': 'eduplatform.settings',
+                        'DATABASE_URL': f'sqlite:///{db_path}',
+                    }
+                    env.pop('DATABASE_REPLICA_URL', None)
+                    for server in servers:
+                        self.stderr.write(f"{server}: {options['workers']} воркер(а), "
+                                          f"{options['concurrency']} соединений, {options['duration']} с ...")
+                        port = free_port()
+                        with Server(server, port, options['workers'], env):
+                            results[server] = run_load(port, requests, options['duration'], options['concurrency'])
+            finally:
+                test_settings['NAME'] = previous_name
+
+        report = {
+            'meta': {
+                'django': django.get_version(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'workers': options['workers'],
+                'concurrency': options['concurrency'],
+                'duration': options['duration'],
+                'lessons': options['lessons'],
+                'students': options['students'],
+            },
+            'servers': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                fh.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Результат записан в {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        for server, result in results.items():
+            self.stderr.write(f"{server:<10} {result['rps']:>8} запр/с   p50 {result['p50_ms']} мс   "
+                              f"p99 {result['p99_ms']} мс   ошибок {result['errors']}")
+
+    def build_requests(self, data):
+        """Смесь запросов ученика: урок, тест, "урок пройден", отправка теста."""
+        client = Client()
+        client.force_login(data['student'])
+        cookies = {'sessionid': client.cookies['sessionid'].value, 'csrftoken': CSRF_TOKEN}
+        headers = {'HX-Request': 'true', 'X-CSRFToken': CSRF_TOKEN}
+        answers = {
+            f"answer_{question.id}": "Вариант А" if question.question_type == 'choice' else "Ответ"
+            for question in data['questions']
+        }
+        return [
+            ('new_lesson_detail', build_request(
+                'GET', reverse('core:new_lesson_detail', args=[data['lesson'].id]), cookies, headers)),
+            ('new_test_detail', build_request(
+                'GET', reverse('core:new_test_detail', args=[data['module'].id]), cookies, headers)),
+            ('complete_lesson', build_request(
+                'POST', reverse('core:complete_lesson', args=[data['lesson'].id]), cookies, headers, data={})),
+            ('new_test_submit', build_request(
+                'POST', reverse('core:new_test_submit', args=[data['test'].id]), cookies, headers, data=answers)),
+        ]
@@ -0,0 +1,84 @@
+import json
+import platform
+import sys
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmarking import benchmark_database, measure, seed, view_scenarios
+
+
+def _sizes(value):
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise CommandError(f"Ожидался список чисел через запятую, получено: {value!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк основных страниц на синтетических данных разного размера. "
+        "Для каждого размера создаётся отдельная тестовая база. Результат — JSON: "
+        "время, число SQL-запросов и размер ответа по каждой странице, "
+        "плюс список страниц, у которых число запросов растёт вместе с данными."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lessons', type=_sizes, default=[10, 100, 1000],
+                            help="Размеры по числу уроков, через запятую (по умолчанию 10,100,1000).")
+        parser.add_argument('--students', type=_sizes, default=[100, 10000],
+                            help="Размеры по числу учеников, через запятую (по умолчанию 100,10000).")
+        parser.add_argument('--repeat', type=int, default=5, help="Сколько тёплых прогонов на страницу.")
+        parser.add_argument('--output', help="Файл для JSON-результата (по умолчанию stdout).")
+
+    def handle(self, *args, **options):
+        runs = []
+        for num_lessons in options['lessons']:
+            for num_students in options['students']:
+                self.stderr.write(f"Размер: уроков={num_lessons}, учеников={num_students} ...")
+                with benchmark_database():
+                    data = seed(num_lessons, num_students)
+                    runs.append({
+                        'lessons': num_lessons,
+                        'students': num_students,
+                        'views': self.run_views(data, options['repeat']),
+                    })
+
+        report = {
+            'meta': {
+                'django': django.get_version(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+            },
+            'runs': runs,
+            'scaling_views': self.find_scaling_views(runs),
+        }
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                fh.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Результат записан в {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        for name in report['scaling_views']:
+            self.stderr.write(self.style.WARNING(f"Число запросов растёт с объёмом данных: {name}"))
+
+    def run_views(self, data, repeat):
+        results = {}
+        for name, client, method, path, payload in view_scenarios(data):
+            results[name] = measure(client, method, path, payload, repeat=repeat)
+        return results
+
+    @staticmethod
+    def find_scaling_views(runs):
+        """Страницы, у которых число тёплых запросов отличается между размерами данных."""
+        counts = {}
+        for run in runs:
+            for name, result in run['views'].items():
+                counts.setdefault(name, set()).add(result['queries_warm'])
+        return sorted(name for name, values in counts.items() if len(values) > 1)
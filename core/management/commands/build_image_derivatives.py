@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from core.images import IMAGE_FIELDS, build_derivatives, current_variants, enqueue_derivatives
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт производные размеры (WebP/JPEG) для уже загруженных изображений: "
+        "аватаров, обложек курсов, картинок уроков и фото преподавателей."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Пересоздать и те изображения, у которых производные уже есть.",
+        )
+        parser.add_argument(
+            '--sync', action='store_true',
+            help="Обработать сразу в этом процессе, а не ставить задачи воркеру.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field_names in IMAGE_FIELDS.items():
+            for field_name in field_names:
+                queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                for instance in queryset.iterator(chunk_size=500):
+                    field_file = getattr(instance, field_name)
+                    if not options['force'] and current_variants(field_file):
+                        continue
+                    if options['sync']:
+                        try:
+                            build_derivatives({
+                                'model': instance._meta.label_lower, 'pk': str(instance.pk),
+                                'field': field_name, 'name': field_file.name,
+                            })
+                        except Exception as exc:
+                            self.stderr.write(f"{model.__name__} {instance.pk}: {exc}")
+                            continue
+                    else:
+                        enqueue_derivatives(instance, field_name)
+                    total += 1
+
+        if options['sync']:
+            self.stdout.write(self.style.SUCCESS(f"Готово: обработано изображений — {total}."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Поставлено задач: {total}. Запустите `python manage.py run_worker`."
+            ))
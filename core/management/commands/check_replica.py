@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.benchmarking import benchmark_database, seed
+from core.db_router import PIN_COOKIE, REPLICA
+from core.models import Lesson, Progress
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет маршрутизацию чтений на реплику (core/db_router.py) на временной базе: "
+        "реплику изображает второй файл SQLite — снимок основной базы, который после записи "
+        "не обновляется (как отстающая реплика)."
+    )
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError("Проверка копирует базу средствами SQLite — запустите с DATABASE_URL=sqlite:///...")
+
+        previous_replica = connections.settings.get(REPLICA)
+        failures = []
+        with tempfile.TemporaryDirectory() as tmp, benchmark_database():
+            data = seed(20, 5)
+            replica_path = os.path.join(tmp, 'replica.sqlite3')
+            self._snapshot(replica_path)
+            connections.settings[REPLICA] = {
+                **connections['default'].settings_dict,
+                'NAME': replica_path,
+                'TEST': {'MIRROR': None},
+            }
+            try:
+                failures = self._run_checks(data)
+            finally:
+                connections[REPLICA].close()
+                del connections[REPLICA]
+                if previous_replica is None:
+                    del connections.settings[REPLICA]
+                else:
+                    connections.settings[REPLICA] = previous_replica
+
+        if failures:
+            raise CommandError(f"Проверок не пройдено: {len(failures)} ({', '.join(failures)})")
+        self.stdout.write(self.style.SUCCESS("Маршрутизация на реплику работает как ожидается."))
+
+    def _snapshot(self, path):
+        """"Репликация": копия основной (тестовой) базы в файл через sqlite3 backup API."""
+        primary = connections['default']
+        primary.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+    def _request(self, client, method, path):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = getattr(client, method)(path)
+        return response, len(primary), len(replica)
+
+    def _run_checks(self, data):
+        student = Client()
+        student.force_login(data['student'])
+        lesson = Lesson.objects.exclude(module=data['module']).order_by('created_at').first()
+        failures = []
+
+        def check(name, client, method, path, expect_replica):
+            response, primary_count, replica_count = self._request(client, method, path)
+            ok = response.status_code < 400 and (replica_count > 0) == expect_replica
+            where = "реплика" if expect_replica else "основная база"
+            self.stdout.write(
+                f"{'OK    ' if ok else 'ОШИБКА'} {name:<40} ожидается: {where:<14} "
+                f"запросов: основная {primary_count}, реплика {replica_count}"
+            )
+            if not ok:
+                failures.append(name)
+            return response
+
+        check("GET index (аноним)", Client(), 'get', reverse('core:index'), True)
+        check("GET course", student, 'get', reverse('core:course'), True)
+        check("GET new_lesson_detail", student, 'get', reverse('core:new_lesson_detail', args=[lesson.id]), True)
+        check("GET profile", student, 'get', reverse('core:profile'), True)
+
+        response = check("POST complete_lesson", student, 'post', reverse('core:complete_lesson', args=[lesson.id]), False)
+        if PIN_COOKIE not in response.cookies:
+            self.stdout.write("ОШИБКА после POST не выставлен cookie закрепления за основной базой")
+            failures.append("pin cookie")
+
+        # Реплика "отстаёт": снимок сделан до POST, урок там не пройден
+        stale = not Progress.objects.using(REPLICA).filter(student=data['student'], lesson=lesson, passed=True).exists()
+        self.stdout.write(f"{'OK    ' if stale else 'ОШИБКА'} реплика отстаёт (урок там ещё не пройден)")
+        if not stale:
+            failures.append("stale replica")
+
+        check("GET course сразу после записи", student, 'get', reverse('core:course'), False)
+        student.cookies.pop(PIN_COOKIE, None)
+        check("GET course после истечения закрепления", student, 'get', reverse('core:course'), True)
+        return failures
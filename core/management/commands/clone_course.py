@@ -0,0 +1,31 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cloning import clone_course
+from core.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Глубокая копия курса для нового потока (core/cloning.py): модули, уроки, материалы, тесты, "
+        "вопросы, блоки главной и преподаватели. Файлы не копируются — копия ссылается на те же."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('course', help="UUID курса.")
+        parser.add_argument('--title', help="Название копии (по умолчанию '<название> (копия)').")
+        parser.add_argument('--publish', action='store_true', help="Сразу опубликовать копию.")
+        parser.add_argument('--no-teachers', action='store_true', help="Не копировать преподавателей.")
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(pk=uuid.UUID(options['course']))
+        except (ValueError, Course.DoesNotExist):
+            raise CommandError(f"Курс {options['course']} не найден.")
+
+        copy = clone_course(
+            course, title=options['title'], published=options['publish'],
+            copy_teachers=not options['no_teachers'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Готово: «{copy.title}» ({copy.pk})"))
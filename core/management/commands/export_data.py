@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import EXPORTS, FORMATS, parse_filters, stream_export
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка попыток тестов, ответов или прогресса в CSV/XLSX (память не растёт с объёмом)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS), help="Что выгружать.")
+        parser.add_argument('--format', choices=FORMATS, default='csv', dest='fmt')
+        parser.add_argument('--course', help="UUID курса.")
+        parser.add_argument('--module', help="UUID модуля.")
+        parser.add_argument('--test', help="UUID теста.")
+        parser.add_argument('--from', dest='date_from', help="С даты (ГГГГ-ММ-ДД).")
+        parser.add_argument('--to', dest='date_to', help="По дату включительно (ГГГГ-ММ-ДД).")
+        parser.add_argument('--output', '-o', help="Файл для записи. По умолчанию — stdout (только CSV).")
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(options)
+        except ValueError as error:
+            raise CommandError(f"Неверный фильтр: {error}")
+        if options['fmt'] == 'xlsx' and not options['output']:
+            raise CommandError("Для XLSX укажите файл: --output export.xlsx")
+
+        content = stream_export(options['kind'], options['fmt'], **filters)
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in content:
+                    output.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Готово: {options['output']}"))
+        else:
+            for chunk in content:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,55 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Test
+from core.question_import import FORMATS, detect_format, import_questions
+
+
+class Command(BaseCommand):
+    help = (
+        "Массовый импорт вопросов в тест из CSV, JSON или Moodle GIFT (core/question_import.py). "
+        "При ошибках в файле по умолчанию ничего не импортируется."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('test', help="UUID теста.")
+        parser.add_argument('path', help="Файл с вопросами.")
+        parser.add_argument('--format', choices=FORMATS, dest='fmt',
+                            help="Формат файла (по умолчанию — по расширению).")
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help="Импортировать без строк с ошибками.")
+        parser.add_argument('--dry-run', action='store_true', help="Только проверить файл.")
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            test = Test.objects.select_related('module').get(pk=uuid.UUID(options['test']))
+        except (ValueError, Test.DoesNotExist):
+            raise CommandError(f"Тест {options['test']} не найден.")
+        fmt = options['fmt'] or detect_format(options['path'])
+        if not fmt:
+            raise CommandError("Не удалось определить формат по расширению, укажите --format.")
+
+        try:
+            with open(options['path'], 'rb') as upload:
+                result = import_questions(
+                    test, upload, fmt, skip_invalid=options['skip_invalid'],
+                    dry_run=options['dry_run'], chunk_size=options['chunk_size'],
+                )
+        except OSError as error:
+            raise CommandError(f"Не удалось открыть файл: {error}")
+
+        for row_number, messages in result['errors']:
+            self.stderr.write(f"Строка {row_number}: {' '.join(messages)}")
+        if result['error_count'] > len(result['errors']):
+            self.stderr.write(f"... и ещё {result['error_count'] - len(result['errors'])} строк с ошибками.")
+        if result['file_error']:
+            raise CommandError(f"Файл не удалось разобрать: {result['file_error']}")
+
+        summary = (f"Записей: {result['rows']}, без ошибок: {result['valid']}, "
+                   f"с ошибками: {result['error_count']}, добавлено: {result['created']}.")
+        if options['dry_run'] or result['created'] or not result['error_count']:
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            raise CommandError(f"{summary} Ничего не импортировано (см. --skip-invalid).")
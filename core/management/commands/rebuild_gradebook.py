@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Course, ModuleProgress, Module, TestResultSummary
+
+
+class Command(BaseCommand):
+    help = "Пересобирает журнал оценок: сводки по тестам (TestResultSummary) и по модулям (ModuleProgress)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course', action='append', dest='courses', default=None,
+            help="UUID курса (можно указать несколько раз). По умолчанию — все курсы.",
+        )
+
+    def handle(self, *args, **options):
+        courses = options['courses']
+        modules = None
+        if courses:
+            missing = set(courses) - {str(pk) for pk in Course.objects.filter(pk__in=courses).values_list('pk', flat=True)}
+            if missing:
+                self.stderr.write(f"Курсы не найдены: {', '.join(sorted(missing))}")
+            modules = list(Module.objects.filter(course_id__in=courses).values_list('pk', flat=True))
+
+        module_count = ModuleProgress.rebuild(modules=modules)
+        result_count = TestResultSummary.rebuild(courses=courses)
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: сводок по модулям — {module_count}, по тестам — {result_count}."
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Module, ModuleProgress
+
+
+class Command(BaseCommand):
+    help = "Пересобирает сводки прогресса по модулям (ModuleProgress) из таблицы Progress."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--module', action='append', dest='modules', default=None,
+            help="UUID модуля (можно указать несколько раз). По умолчанию — все модули.",
+        )
+
+    def handle(self, *args, **options):
+        modules = options['modules']
+        if modules:
+            missing = set(modules) - {str(pk) for pk in Module.objects.filter(pk__in=modules).values_list('pk', flat=True)}
+            if missing:
+                self.stderr.write(f"Модули не найдены: {', '.join(sorted(missing))}")
+
+        count = ModuleProgress.rebuild(modules=modules)
+        self.stdout.write(self.style.SUCCESS(f"Готово: пересобрано сводок — {count}."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает полнотекстовый индекс уроков и вопросов тестов (SearchDocument). "
+        "Нужен после массовых изменений в обход сигналов (bulk_create, update, загрузка фикстур)."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Готово: проиндексировано документов — {count}."))
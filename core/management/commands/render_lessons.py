@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Lesson
+from core.sanitizer import render_lessons
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает готовый к показу HTML уроков (content_html, assignment_html, video_embed_url). "
+        "По умолчанию — только уроки, у которых исходник изменился (content_hash не совпадает)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Пересчитать все уроки, даже неизменённые.")
+        parser.add_argument(
+            '--module', action='append', dest='modules', default=None,
+            help="UUID модуля (можно указать несколько раз). По умолчанию — все уроки.",
+        )
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        lessons = Lesson.objects.all()
+        if options['modules']:
+            lessons = lessons.filter(module_id__in=options['modules'])
+        updated = render_lessons(lessons, force=options['force'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Готово: обновлено уроков — {updated}."))
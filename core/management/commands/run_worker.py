@@ -0,0 +1,74 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import requeue_stale, run_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер фоновых задач (модель Job): выполняет задачи из очереди, пока не остановят. "
+        "Брокер не нужен — очередь хранится в базе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Выполнить все готовые задачи и выйти (для cron и отладки).",
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=getattr(settings, 'JOB_WORKER_CONCURRENCY', 1),
+            help="Сколько задач выполнять параллельно (потоков). По умолчанию JOB_WORKER_CONCURRENCY.",
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help="Пауза между проверками пустой очереди, секунд (по умолчанию 1).",
+        )
+
+    def handle(self, *args, **options):
+        requeue_stale()
+        if options['once']:
+            count = run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Выполнено задач: {count}."))
+            return
+
+        concurrency = max(1, options['concurrency'])
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self.loop, args=(stop, options['sleep']), name=f"job-worker-{i + 1}", daemon=True)
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Воркер запущен, потоков: {concurrency}. Остановка — Ctrl+C.")
+
+        try:
+            while not stop.wait(60):
+                requeue_stale()
+        except KeyboardInterrupt:
+            self.stdout.write("Останавливаем воркер: дожидаемся текущих задач...")
+            stop.set()
+            for thread in threads:
+                thread.join()
+            self.stdout.write("Воркер остановлен.")
+
+    @staticmethod
+    def loop(stop, sleep):
+        # У каждого потока своё соединение с базой — закрываем его при выходе
+        try:
+            while not stop.is_set():
+                try:
+                    done = run_pending(limit=10)
+                except Exception:
+                    # Например, "database is locked" в SQLite при захвате задачи — пробуем позже
+                    logger.exception("Ошибка при выборке задач из очереди")
+                    done = 0
+                if not done:
+                    stop.wait(sleep)
+        finally:
+            connections.close_all()
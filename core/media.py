@@ -0,0 +1,162 @@
+# eduplatform/core/media.py
+#
+# Отдача защищённых файлов уроков (видео, PDF, изображение) и материалов.
+# Раньше они шли через django.conf.urls.static: файл целиком читался Python'ом,
+# а HTTP Range не поддерживался — перемотка MP4 скачивала видео заново.
+#
+# Режимы (settings.MEDIA_SENDFILE):
+#   ''       — отдаём сами: Range -> 206, файл передаётся через wsgi.file_wrapper
+#              (gunicorn делает os.sendfile ровно на запрошенный диапазон, без копирования в Python);
+#   'nginx'  — X-Accel-Redirect на internal-location (settings.MEDIA_ACCEL_PREFIX), Range обрабатывает nginx;
+#   'apache' — X-Sendfile с абсолютным путём (mod_xsendfile).
+# Проверка доступа в любом режиме выполняется в Django.
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.http import http_date, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def can_view_lesson(user, lesson):
+    """Те же правила, что у страницы урока: любой вошедший пользователь, без входа — только предпросмотр."""
+    return lesson.is_free_preview or user.is_authenticated
+
+
+class RangeFile:
+    """
+    Файл, из которого можно прочитать не больше `length` байт начиная с `start`.
+    fileno() оставлен, чтобы wsgi.file_wrapper мог отдать диапазон через sendfile:
+    gunicorn берёт текущую позицию дескриптора и Content-Length ответа.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range для одного диапазона.
+    Возвращает (start, end) включительно, None — отдать файл целиком
+    (заголовка нет, несколько диапазонов или синтаксис не понят),
+    или False — диапазон вне файла (416).
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    start, end = match.group('start'), match.group('end')
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-500 — последние 500 байт
+        length = int(end)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _validators(stat):
+    etag = quote_etag(f"{int(stat.st_mtime):x}-{stat.st_size:x}")
+    return etag, http_date(stat.st_mtime)
+
+
+def serve_file(request, field_file, as_attachment=False):
+    """Ответ с содержимым FileField (после проверки доступа во view)."""
+    if not field_file:
+        raise Http404("Файл не прикреплён.")
+
+    storage = field_file.storage
+    try:
+        path = storage.path(field_file.name)
+    except NotImplementedError:
+        # Удалённое хранилище (S3 и т.п.) — отдаёт само, по его собственной (подписанной) ссылке
+        return HttpResponseRedirect(field_file.url)
+    if not os.path.isfile(path):
+        raise Http404("Файл не найден.")
+
+    filename = os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    mode = getattr(settings, 'MEDIA_SENDFILE', '')
+
+    if mode in ('nginx', 'apache'):
+        response = HttpResponse(content_type=content_type)
+        if mode == 'nginx':
+            prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(field_file.name)
+        else:
+            response['X-Sendfile'] = path
+        _set_common_headers(response, filename, as_attachment)
+        return response
+
+    stat = os.stat(path)
+    etag, last_modified = _validators(stat)
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        _set_common_headers(response, filename, as_attachment)
+        return response
+
+    byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+
+    # If-Range: диапазон отдаём, только если файл не изменился с прошлой загрузки
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range and if_range not in (etag, last_modified):
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{stat.st_size}"
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    file = open(path, 'rb')
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(file, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+    else:
+        length = stat.st_size
+        response = FileResponse(file, content_type=content_type)
+    response.block_size = CHUNK_SIZE
+    response['Content-Length'] = str(length)
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    _set_common_headers(response, filename, as_attachment)
+    return response
+
+
+def _set_common_headers(response, filename, as_attachment):
+    response['Accept-Ranges'] = 'bytes'
+    # Файлы доступны только после проверки прав — общим кэшам их хранить нельзя
+    response['Cache-Control'] = 'private, max-age=3600'
+    disposition = 'attachment' if as_attachment else 'inline'
+    response['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_module_progress(apps, schema_editor):
+    # Та же логика, что в ModuleProgress.rebuild(): сводки для уже пройденных до миграции уроков,
+    # иначе ученик, прошедший модуль раньше, не увидит тест
+    Module = apps.get_model('core', 'Module')
+    Progress = apps.get_model('core', 'Progress')
+    ModuleProgress = apps.get_model('core', 'ModuleProgress')
+    totals = dict(Module.objects.annotate(n=models.Count('lessons')).values_list('pk', 'n'))
+    completed = (
+        Progress.objects.filter(passed=True)
+        .values('student_id', 'lesson__module_id')
+        .annotate(n=models.Count('id'))
+    )
+    ModuleProgress.objects.bulk_create((
+        ModuleProgress(
+            student_id=row['student_id'],
+            module_id=row['lesson__module_id'],
+            completed_lessons=row['n'],
+            total_lessons=totals[row['lesson__module_id']],
+        )
+        for row in completed
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_lesson_goal_lesson'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModuleProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_lessons', models.PositiveIntegerField(default=0, verbose_name='Пройдено уроков')),
+                ('total_lessons', models.PositiveIntegerField(default=0, verbose_name='Всего уроков')),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_progress', to='core.module', verbose_name='Модуль')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='module_progress', to=settings.AUTH_USER_MODEL, verbose_name='Студент')),
+            ],
+            options={
+                'verbose_name': 'Прогресс по модулю',
+                'verbose_name_plural': 'Прогресс по модулям',
+                'unique_together': {('student', 'module')},
+            },
+        ),
+        migrations.RunPython(fill_module_progress, migrations.RunPython.noop),
+    ]
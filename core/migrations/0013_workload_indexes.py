@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_moduleprogress'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['module', 'created_at'], name='core_lesson_module_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(fields=['course', 'created_at'], name='core_module_course_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progress',
+            index=models.Index(fields=['student', 'passed'], name='core_progress_student_pass_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progress',
+            index=models.Index(fields=['lesson', 'passed'], name='core_progress_lesson_pass_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testquestion',
+            index=models.Index(fields=['test', 'created_at'], name='core_question_test_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testsubmission',
+            index=models.Index(fields=['student', '-submitted_at'], name='core_sub_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testsubmission',
+            index=models.Index(fields=['status', 'submitted_at'], name='core_sub_status_date_idx'),
+        ),
+    ]
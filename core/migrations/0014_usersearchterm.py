@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_search_terms(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    UserSearchTerm = apps.get_model('core', 'UserSearchTerm')
+    rows = []
+    for user in User.objects.only('id', 'username', 'email', 'first_name', 'last_name').iterator(chunk_size=2000):
+        terms = {
+            (getattr(user, field) or '').strip().lower().replace('ё', 'е')[:254]
+            for field in ('username', 'email', 'first_name', 'last_name')
+        }
+        terms.discard('')
+        rows.extend(UserSearchTerm(user_id=user.id, term=term) for term in terms)
+    UserSearchTerm.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_workload_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=254, verbose_name='Термин')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Поисковый термин пользователя',
+                'verbose_name_plural': 'Поисковые термины пользователей',
+                'indexes': [models.Index(fields=['term', 'user'], name='core_usersearch_term_idx')],
+            },
+        ),
+        migrations.RunPython(fill_search_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:39
+
+# Миграция создаёт только таблицу и индекс. Документы для уже существующих уроков и вопросов
+# строит `python manage.py rebuild_search_index` (core/search.py): основы слов считает текущий
+# russian_stemmer, а миграция не должна зависеть от кода приложения, который потом меняется.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = 'core_searchdocument_fts'
+
+SQLITE_FORWARD = [
+    # external content: сам текст хранится в core_searchdocument, FTS5 держит только индекс
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"stems, content='core_searchdocument', content_rowid='id', tokenize='unicode61 remove_diacritics 0')",
+    f"""CREATE TRIGGER core_searchdocument_ai AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, stems) VALUES (new.id, new.stems);
+    END""",
+    f"""CREATE TRIGGER core_searchdocument_ad AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, stems) VALUES ('delete', old.id, old.stems);
+    END""",
+    f"""CREATE TRIGGER core_searchdocument_au AFTER UPDATE ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, stems) VALUES ('delete', old.id, old.stems);
+        INSERT INTO {FTS_TABLE}(rowid, stems) VALUES (new.id, new.stems);
+    END""",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS core_searchdocument_ai",
+    "DROP TRIGGER IF EXISTS core_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS core_searchdocument_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_FORWARD = [
+    """ALTER TABLE core_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(body, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX core_searchdoc_vector_idx ON core_searchdocument USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_searchdoc_vector_idx",
+    "ALTER TABLE core_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_usersearchterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('lesson', 'Занятие'), ('question', 'Вопрос теста')], max_length=10, verbose_name='Тип')),
+                ('title', models.CharField(max_length=255, verbose_name='Заголовок')),
+                ('body', models.TextField(blank=True, verbose_name='Текст')),
+                ('stems', models.TextField(blank=True, verbose_name='Основы слов')),
+                ('lesson', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='core.lesson', verbose_name='Занятие')),
+                ('question', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='core.testquestion', verbose_name='Вопрос')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковые документы',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
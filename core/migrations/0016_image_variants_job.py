@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='cover_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Размеры обложки'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='image_file_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Размеры изображения'),
+        ),
+        migrations.AddField(
+            model_name='teachercard',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Размеры фотографии'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Размеры аватара'),
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=100, verbose_name='Тип задачи')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнена'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Не раньше')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начата')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'indexes': [models.Index(fields=['status', 'run_after'], name='core_job_status_run_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_image_variants_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='max_attempts',
+            field=models.PositiveIntegerField(default=5, verbose_name='Максимум попыток'),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнена'), ('failed', 'Ошибка (попытки исчерпаны)')], default='pending', max_length=10, verbose_name='Статус'),
+        ),
+        migrations.AlterField(
+            model_name='testsubmission',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Оценивается'), ('pending', 'На проверке'), ('graded', 'Проверено')], default='pending', max_length=10, verbose_name='Статус проверки'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+def mark_graded_answers(apps, schema_editor):
+    # Уже оценённые ответы: все ответы проверенных попыток и 'choice' в попытках на проверке
+    TestAnswer = apps.get_model('core', 'TestAnswer')
+    TestAnswer.objects.filter(submission__status='graded').update(graded=True)
+    TestAnswer.objects.filter(
+        submission__status='pending', question__question_type='choice'
+    ).update(graded=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_grading_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testanswer',
+            name='graded',
+            field=models.BooleanField(default=False, verbose_name='Проверен'),
+        ),
+        migrations.AddIndex(
+            model_name='testanswer',
+            index=models.Index(fields=['question', 'graded'], name='core_answer_question_gr_idx'),
+        ),
+        migrations.RunPython(mark_graded_answers, migrations.RunPython.noop),
+    ]
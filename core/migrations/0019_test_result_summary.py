@@ -0,0 +1,72 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_test_results(apps, schema_editor):
+    # То же, что TestResultSummary.rebuild(), на исторических моделях
+    TestSubmission = apps.get_model('core', 'TestSubmission')
+    TestResultSummary = apps.get_model('core', 'TestResultSummary')
+    graded = models.Q(status='graded')
+    latest_score = (
+        TestSubmission.objects.filter(
+            student_id=models.OuterRef('student_id'), test_id=models.OuterRef('test_id'), status='graded'
+        ).order_by('-submitted_at').values('score')[:1]
+    )
+    rows = (
+        TestSubmission.objects.values('student_id', 'test_id', 'test__module__course_id')
+        .annotate(
+            attempts=models.Count('id'),
+            pending_attempts=models.Count('id', filter=~graded),
+            best_score=models.Max('score', filter=graded),
+            passed_count=models.Count('id', filter=graded & models.Q(passed=True)),
+            latest_score=models.Subquery(latest_score),
+        )
+        .order_by()
+    )
+    TestResultSummary.objects.bulk_create((
+        TestResultSummary(
+            student_id=row['student_id'],
+            test_id=row['test_id'],
+            course_id=row['test__module__course_id'],
+            attempts=row['attempts'],
+            pending_attempts=row['pending_attempts'],
+            best_score=row['best_score'],
+            latest_score=row['latest_score'],
+            passed=row['passed_count'] > 0,
+        )
+        for row in rows
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_grading_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestResultSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('pending_attempts', models.PositiveIntegerField(default=0, verbose_name='Ждут проверки')),
+                ('best_score', models.FloatField(blank=True, null=True, verbose_name='Лучший балл (%)')),
+                ('latest_score', models.FloatField(blank=True, null=True, verbose_name='Последний балл (%)')),
+                ('passed', models.BooleanField(default=False, verbose_name='Пройден')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.course', verbose_name='Курс')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_results', to=settings.AUTH_USER_MODEL, verbose_name='Студент')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_results', to='core.test', verbose_name='Тест')),
+            ],
+            options={
+                'verbose_name': 'Результат по тесту',
+                'verbose_name_plural': 'Результаты по тестам',
+                'indexes': [models.Index(fields=['course', 'student'], name='core_result_course_stud_idx')],
+                'unique_together': {('student', 'test')},
+            },
+        ),
+        migrations.RunPython(fill_test_results, migrations.RunPython.noop),
+    ]
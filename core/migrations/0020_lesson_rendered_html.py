@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+def render_existing_lessons(apps, schema_editor):
+    # Функции очистки не зависят от модели — годятся и для исторической
+    from core.sanitizer import render_lessons
+
+    render_lessons(apps.get_model('core', 'Lesson').objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_test_result_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='assignment_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Задание (для показа)'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Хэш содержимого'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Содержание (для показа)'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='video_embed_url',
+            field=models.URLField(blank=True, editable=False, max_length=300, verbose_name='URL встраивания видео'),
+        ),
+        migrations.RunPython(render_existing_lessons, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_lesson_rendered_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(blank=True, default=dict, verbose_name='Ответы')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Сохранён')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_drafts', to=settings.AUTH_USER_MODEL, verbose_name='Студент')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drafts', to='core.test', verbose_name='Тест')),
+            ],
+            options={
+                'verbose_name': 'Черновик теста',
+                'verbose_name_plural': 'Черновики тестов',
+                'unique_together': {('student', 'test')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:16
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_test_draft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='questions_per_attempt',
+            field=models.PositiveIntegerField(blank=True, help_text='Сколько случайных вопросов получает ученик. Пусто — все вопросы теста.', null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Вопросов в попытке'),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='stratify_by_score',
+            field=models.BooleanField(default=False, help_text='Брать вопросы с каждым баллом в той же доле, что и в банке вопросов.', verbose_name='Выборка по баллам'),
+        ),
+        migrations.AddField(
+            model_name='testdraft',
+            name='question_ids',
+            field=models.JSONField(blank=True, null=True, verbose_name='Вопросы попытки'),
+        ),
+        migrations.AddField(
+            model_name='testsubmission',
+            name='question_ids',
+            field=models.JSONField(blank=True, null=True, verbose_name='Вопросы попытки'),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, NullIf
+from django.db.models.lookups import GreaterThanOrEqual
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
 from django.utils.translation import gettext_lazy as _
@@ -6,6 +8,11 @@ from django.utils import timezone # <-- Убедитесь, что этот им
 import uuid
 import re
 
+def normalize_answer(text):
+    """Приводит ответ к виду для сравнения: без пробелов по краям и в нижнем регистре."""
+    return (text or "").strip().lower()
+
+
 class User(AbstractUser):
     ROLE_CHOICES = (
         ('student', 'Ученик'),
@@ -14,6 +21,7 @@ class User(AbstractUser):
     )
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='student', verbose_name=_("Роль"))
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True, verbose_name=_("Аватар"))
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name=_("Размеры аватара"))
     bio = models.TextField(blank=True, verbose_name=_("О себе"))
     phone = models.CharField(max_length=20, blank=True, verbose_name=_("Телефон"))
     is_teacher_approved = models.BooleanField(default=False, verbose_name=_("Учитель подтверждён"))
@@ -39,11 +47,18 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def get_session_auth_hash(self):
+        # Пользователь из кэша (backends.py) загружен без пароля — хэш сессии посчитан заранее
+        if 'password' in self.get_deferred_fields() and hasattr(self, '_session_auth_hash'):
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+
 class Course(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=200, default="Культура речи и стилистика", verbose_name=_("Название курса"))
     description = models.TextField(blank=True, verbose_name=_("Описание"))
     cover_image = models.ImageField(upload_to='course_covers/', blank=True, null=True, verbose_name=_("Обложка"))
+    cover_image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name=_("Размеры обложки"))
     published = models.BooleanField(default=False, verbose_name=_("Опубликован"))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Дата создания"))
     
@@ -81,6 +96,9 @@ class Module(models.Model):
         verbose_name = _("Модуль")
         verbose_name_plural = _("Модули")
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['course', 'created_at'], name='core_module_course_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.course.title} - {self.title}"
@@ -102,6 +120,7 @@ class Lesson(models.Model):
         upload_to='lesson_images/', blank=True, null=True, 
         verbose_name=_("Изображение (JPG, PNG)")
     )
+    image_file_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name=_("Размеры изображения"))
     pdf_file = models.FileField(
         upload_to='lesson_pdfs/', blank=True, null=True, 
         verbose_name=_("PDF-файл")
@@ -120,10 +139,19 @@ class Lesson(models.Model):
         verbose_name=_("Автор урока")
     )
 
+    # Готовый к показу HTML (core/sanitizer.py): считается при сохранении, шаблон выводит как есть
+    content_html = models.TextField(blank=True, editable=False, verbose_name=_("Содержание (для показа)"))
+    assignment_html = models.TextField(blank=True, editable=False, verbose_name=_("Задание (для показа)"))
+    video_embed_url = models.URLField(max_length=300, blank=True, editable=False, verbose_name=_("URL встраивания видео"))
+    content_hash = models.CharField(max_length=64, blank=True, editable=False, verbose_name=_("Хэш содержимого"))
+
     class Meta:
         verbose_name = _("Занятие")
         verbose_name_plural = _("Занятия")
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['module', 'created_at'], name='core_lesson_module_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.module.title} - {self.title}"
@@ -153,6 +181,18 @@ class Test(models.Model):
         validators=[MinValueValidator(0)], 
         verbose_name=_("Проходной балл (в %)")
     )
+    # Случайная выборка вопросов из банка на каждую попытку (sampling.py). Пусто — все вопросы
+    questions_per_attempt = models.PositiveIntegerField(
+        null=True, blank=True,
+        validators=[MinValueValidator(1)],
+        verbose_name=_("Вопросов в попытке"),
+        help_text=_("Сколько случайных вопросов получает ученик. Пусто — все вопросы теста."),
+    )
+    stratify_by_score = models.BooleanField(
+        default=False,
+        verbose_name=_("Выборка по баллам"),
+        help_text=_("Брать вопросы с каждым баллом в той же доле, что и в банке вопросов."),
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Дата создания"))
 
     class Meta:
@@ -164,7 +204,15 @@ class Test(models.Model):
         
     def get_max_score(self):
         # <--- НОВЫЙ МЕТОД: Поможет нам быстро посчитать макс. балл за тест
-        return self.questions.all().aggregate(models.Sum('max_score'))['max_score__sum'] or 0
+        # Берётся из кэшированного ключа ответов (см. answer_keys.py)
+        # Это максимум по всему банку; для попытки с выборкой — TestSubmission.get_max_score()
+        from .answer_keys import get_answer_key
+
+        return get_answer_key(self)['max_score']
+
+    @property
+    def samples_questions(self):
+        return bool(self.questions_per_attempt)
 
 
 class TestQuestion(models.Model):
@@ -209,6 +257,9 @@ class TestQuestion(models.Model):
     class Meta:
         verbose_name = _("Вопрос теста")
         verbose_name_plural = _("Вопросы теста")
+        indexes = [
+            models.Index(fields=['test', 'created_at'], name='core_question_test_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:50]
@@ -216,9 +267,11 @@ class TestQuestion(models.Model):
 
 class TestSubmission(models.Model):
     # <--- НОВОЕ: Статусы проверки
+    STATUS_QUEUED = 'queued'    # принята, ждёт автопроверки фоновым воркером
     STATUS_PENDING = 'pending'
     STATUS_GRADED = 'graded'
     STATUS_CHOICES = (
+        (STATUS_QUEUED, 'Оценивается'),
         (STATUS_PENDING, 'На проверке'),
         (STATUS_GRADED, 'Проверено'),
     )
@@ -237,71 +290,238 @@ class TestSubmission(models.Model):
         default=STATUS_PENDING,
         verbose_name="Статус проверки"
     )
+    # Вопросы, выпавшие в этой попытке (sampling.py); None — все вопросы теста
+    question_ids = models.JSONField(null=True, blank=True, verbose_name="Вопросы попытки")
 
     class Meta:
         verbose_name = _("Попытка теста")
         verbose_name_plural = _("Попытки тестов")
+        indexes = [
+            # Попытки ученика, новые сверху (teacher_student_detail, профиль)
+            models.Index(fields=['student', '-submitted_at'], name='core_sub_student_date_idx'),
+            # Работы на проверке (status='pending') в порядке поступления
+            models.Index(fields=['status', 'submitted_at'], name='core_sub_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.test.title}"
 
+    @classmethod
+    def submit(cls, test, student, answers):
+        """
+        Создаёт попытку и сразу оценивает её в памяти.
+        `answers` — словарь {id вопроса (str): текст ответа}.
+        Вопросы, правильные ответы и баллы берутся из кэшированного ключа ответов теста.
+
+        Результат тот же, что и у auto_grade(), но вместо записи на каждый ответ:
+        одна вставка попытки (с уже посчитанными баллом, статусом и passed)
+        и один bulk_create для всех ответов в одной транзакции.
+        Ответы, которых нет в `answers`, берутся из черновика (TestDraft.take).
+        Если тест выдаёт случайную выборку вопросов (sampling.py), оценивается только она.
+        """
+        from .answer_keys import get_answer_key, grade_choice, final_score
+        from .sampling import attempt_key
+
+        submission = cls(test=test, student=student)
+        answer_objects = []
+        total_score = 0
+
+        with transaction.atomic():
+            # Черновик автосохранения (drafts.py) + ответы формы; черновик удаляется
+            answers, question_ids = TestDraft.take(test, student, answers)
+            submission.question_ids, key = attempt_key(test, get_answer_key(test), question_ids)
+
+            for question_id, question_type in key['types'].items():
+                answer = TestAnswer(
+                    submission=submission,
+                    question_id=question_id,
+                    answer_text=answers.get(question_id, '')
+                )
+                if question_type == 'choice':
+                    answer.graded = True
+                    answer.score = grade_choice(key, question_id, answer.answer_text)
+                total_score += answer.score
+                answer_objects.append(answer)
+
+            if key['has_open_ended']:
+                submission.status = cls.STATUS_PENDING
+            else:
+                submission.status = cls.STATUS_GRADED
+                submission.score, submission.passed = final_score(key, total_score)
+
+            submission.save(force_insert=True)
+            TestAnswer.objects.bulk_create(answer_objects)
+
+        return submission
+
+    @classmethod
+    def enqueue(cls, test, student, answers):
+        """
+        Принимает попытку без оценивания: попытка, ответы (один bulk_create) и задача
+        для воркера пишутся одной транзакцией. Оценивает auto_grade() в фоне (jobs.py, grading.py).
+        """
+        from .answer_keys import get_answer_key
+        from .jobs import enqueue
+        from .grading import JOB_KIND
+        from .sampling import attempt_key
+
+        submission = cls(test=test, student=student, status=cls.STATUS_QUEUED)
+        with transaction.atomic():
+            answers, question_ids = TestDraft.take(test, student, answers)
+            # Список вопросов (вся выборка попытки) — из кэшированного ключа ответов, без запроса к базе
+            submission.question_ids, key = attempt_key(test, get_answer_key(test), question_ids)
+            question_ids = key['types'].keys()
+            submission.save(force_insert=True)
+            TestAnswer.objects.bulk_create([
+                TestAnswer(
+                    submission=submission,
+                    question_id=question_id,
+                    answer_text=answers.get(question_id, ''),
+                )
+                for question_id in question_ids
+            ])
+            enqueue(JOB_KIND, {'submission_id': str(submission.pk)})
+        return submission
+
+    def get_answer_key(self, fresh=False):
+        """
+        Ключ ответов теста этой попытки (без загрузки Test, если его нет на объекте).
+        Для попытки со случайной выборкой — ключ только по выпавшим вопросам.
+        fresh=True — собрать ключ из базы, минуя кэш.
+        """
+        from .answer_keys import build_answer_key, get_answer_key
+        from .sampling import subset_key
+
+        test = self.test if TestSubmission.test.is_cached(self) else self.test_id
+        if fresh:
+            key = build_answer_key(self.test_id, passing_score=getattr(test, 'passing_score', None))
+        else:
+            key = get_answer_key(test)
+        if self.question_ids is not None:
+            key = subset_key(key, self.question_ids)
+        return key
+
+    def get_max_score(self):
+        """Максимальный балл этой попытки (по выпавшим вопросам)."""
+        return self.get_answer_key()['max_score']
+
     # <--- 1. ПЕРЕИМЕНОВАННЫЙ И ИЗМЕНЕННЫЙ МЕТОД (бывший calculate_score)
-    def auto_grade(self):
+    def auto_grade(self, fresh_key=False):
         """
         Автоматически оценивает ответы типа 'choice' 
         и обновляет статус попытки.
+        fresh_key=True — ключ ответов из базы, а не из кэша (фоновый воркер, см. grading.py).
         """
-        has_open_ended_questions = False
-        
-        for answer in self.answers.all().select_related('question'):
-            question = answer.question
-            
-            if question.question_type == 'choice':
-                student_text = (answer.answer_text or "").strip().lower()
-                correct_text = (question.correct_answer or "").strip().lower()
-                
-                if student_text == correct_text:
-                    answer.score = question.max_score
-                else:
-                    answer.score = 0
-                answer.save() # <-- Сохраняем балл в самом ответе
-            
-            elif question.question_type == 'open_ended':
-                has_open_ended_questions = True
-        
+        from .answer_keys import grade_choice
+
+        key = self.get_answer_key(fresh=fresh_key)
+        graded_answers = []
+        total_score = 0
+
+        for answer in self.answers.only('id', 'submission_id', 'question_id', 'answer_text', 'score', 'graded'):
+            if key['types'].get(str(answer.question_id)) == 'choice':
+                answer.score = grade_choice(key, answer.question_id, answer.answer_text)
+                answer.graded = True
+                graded_answers.append(answer)
+            total_score += answer.score
+
+        # Баллы всех ответов сохраняем одним запросом
+        TestAnswer.objects.bulk_update(graded_answers, ['score', 'graded'])
+
         # Если были вопросы с ручной проверкой, ставим "На проверке"
-        if has_open_ended_questions:
+        if key['has_open_ended']:
             self.status = self.STATUS_PENDING
+            self.save()
         else:
             # Если все вопросы были 'choice', можно сразу считать итог
-            self.status = self.STATUS_GRADED
-            self.update_final_score() # <-- Сразу вызываем расчет итога
-
-        self.save()
+            self.update_final_score(total_score=total_score, key=key) # <-- Сразу вызываем расчет итога
 
     # <--- 2. НОВЫЙ МЕТОД: Расчет итогового балла
-    def update_final_score(self):
+    def update_final_score(self, total_score=None, key=None):
         """
         Считает итоговый балл (в %) на основе баллов из TestAnswer.
         Вызывается либо после auto_grade (если нет ручных), 
         либо учителем после ручной проверки.
+        Если сумма баллов уже известна, её можно передать в total_score,
+        а уже полученный ключ ответов — в key.
         """
-        
-        # Суммируем все баллы, которые стоят в ответах (TestAnswer)
-        total_score = self.answers.all().aggregate(
-            models.Sum('score')
-        )['score__sum'] or 0
-        
-        # Получаем макс. возможный балл за тест
-        max_possible_score = self.test.get_max_score()
+        from .answer_keys import final_score
+
+        if total_score is None:
+            # Суммируем все баллы, которые стоят в ответах (TestAnswer)
+            total_score = self.answers.all().aggregate(
+                models.Sum('score')
+            )['score__sum'] or 0
 
-        self.score = (total_score / max_possible_score) * 100 if max_possible_score else 0
-        self.passed = self.score >= self.test.passing_score
+        # Макс. балл и проходной балл берем из ключа ответов (кэш)
+        self.score, self.passed = final_score(key or self.get_answer_key(), total_score)
         self.status = self.STATUS_GRADED # <--- Ставим статус "Проверено"
         self.save()
         
         return self.score
 
+    @classmethod
+    def finalize_graded(cls, test, submission_ids):
+        """
+        Пересчёт итогов сразу для многих попыток одного теста (проверка "по вопросу"):
+        один UPDATE вместо update_final_score() на каждую попытку.
+        Закрываются только попытки 'pending', в которых не осталось непроверенных ответов.
+        Возвращает число проверенных попыток.
+        """
+        from .answer_keys import get_answer_key
+
+        key = get_answer_key(test)
+        total = Coalesce(
+            models.Subquery(
+                TestAnswer.objects.filter(submission=models.OuterRef('pk'))
+                .values('submission')
+                .annotate(total=models.Sum('score'))
+                .values('total')
+            ),
+            0,
+        )
+        # Максимум попытки: по всему тесту или, для случайной выборки (question_ids),
+        # сумма max_score выпавших вопросов — ответы есть ровно на них
+        max_score = models.Case(
+            models.When(question_ids__isnull=True, then=models.Value(key['max_score'])),
+            default=Coalesce(
+                models.Subquery(
+                    TestAnswer.objects.filter(submission=models.OuterRef('pk'))
+                    .values('submission')
+                    .annotate(total=models.Sum('question__max_score'))
+                    .values('total')
+                ),
+                0,
+            ),
+            output_field=models.IntegerField(),
+        )
+        # Тот же порядок операций, что в answer_keys.final_score — без расхождений в округлении;
+        # максимум 0 -> NULL -> балл 0
+        score = Coalesce(
+            models.ExpressionWrapper(
+                total * 1.0 / NullIf(max_score, 0) * 100, output_field=models.FloatField()
+            ),
+            models.Value(0.0),
+        )
+        ungraded = TestAnswer.objects.filter(submission=models.OuterRef('pk'), graded=False)
+
+        test_id = getattr(test, 'pk', test)
+        with transaction.atomic():
+            graded = cls.objects.filter(
+                pk__in=submission_ids, test_id=test_id, status=cls.STATUS_PENDING
+            ).filter(~models.Exists(ungraded)).update(
+                score=score,
+                passed=models.Case(
+                    models.When(GreaterThanOrEqual(score, key['passing_score']), then=True),
+                    default=False,
+                ),
+                status=cls.STATUS_GRADED,
+            )
+            # update() не вызывает сигналы — обновляем журнал оценок сами
+            if graded:
+                student_ids = cls.objects.filter(pk__in=submission_ids).values_list('student_id', flat=True)
+                TestResultSummary.refresh((student_id, test_id) for student_id in student_ids)
+        return graded
 
 class TestAnswer(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -311,10 +531,16 @@ class TestAnswer(models.Model):
     
     # <--- НОВОЕ ПОЛЕ: Сюда пишется балл за этот конкретный ответ
     score = models.PositiveIntegerField(default=0, verbose_name="Балл за ответ")
+    # Балл выставлен (автоматически для 'choice' или учителем для 'open_ended')
+    graded = models.BooleanField(default=False, verbose_name="Проверен")
 
     class Meta:
         verbose_name = _("Ответ на вопрос теста")
         verbose_name_plural = _("Ответы на вопросы теста")
+        indexes = [
+            # Непроверенные ответы на вопрос (проверка "по вопросу")
+            models.Index(fields=['question', 'graded'], name='core_answer_question_gr_idx'),
+        ]
 
     def __str__(self):
         return self.answer_text[:50]
@@ -330,11 +556,468 @@ class Progress(models.Model):
         verbose_name = _("Прогресс")
         verbose_name_plural = _("Прогресс")
         unique_together = ['student', 'lesson']
+        indexes = [
+            models.Index(fields=['student', 'passed'], name='core_progress_student_pass_idx'),
+            models.Index(fields=['lesson', 'passed'], name='core_progress_lesson_pass_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.lesson.title}"
 
 
+class ModuleProgress(models.Model):
+    """
+    Сводка прогресса ученика по модулю: сколько уроков пройдено и сколько их всего.
+    Обновляется инкрементально (complete_lesson, создание/удаление уроков),
+    чтобы проверка доступа к тесту была одним запросом по индексу.
+    Изменения Progress в обход complete_lesson (админка, save(), queryset.delete())
+    пересчитывают затронутые пары сигналами (refresh).
+    Полностью пересобирается командой `rebuild_module_progress`.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="module_progress", verbose_name=_("Студент"))
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name="student_progress", verbose_name=_("Модуль"))
+    completed_lessons = models.PositiveIntegerField(default=0, verbose_name=_("Пройдено уроков"))
+    total_lessons = models.PositiveIntegerField(default=0, verbose_name=_("Всего уроков"))
+
+    class Meta:
+        verbose_name = _("Прогресс по модулю")
+        verbose_name_plural = _("Прогресс по модулям")
+        unique_together = ['student', 'module']
+
+    def __str__(self):
+        return f"{self.student_id} - {self.module_id}: {self.completed_lessons}/{self.total_lessons}"
+
+    @property
+    def is_complete(self):
+        return self.completed_lessons >= self.total_lessons
+
+    @classmethod
+    def is_module_complete(cls, student, module):
+        """
+        Пройдены ли все уроки модуля. Один запрос по уникальному индексу (student, module).
+        Если сводки нет (ученик ещё ничего не прошёл), модуль считается пройденным,
+        только если в нём нет уроков.
+        """
+        summary = cls.objects.filter(student=student, module=module).only(
+            'completed_lessons', 'total_lessons'
+        ).first()
+        if summary is None:
+            return not Lesson.objects.filter(module=module).exists()
+        return summary.is_complete
+
+    @classmethod
+    async def ais_module_complete(cls, student, module):
+        """Асинхронная версия is_module_complete() для async-views (ASGI)."""
+        summary = await cls.objects.filter(student=student, module=module).only(
+            'completed_lessons', 'total_lessons'
+        ).afirst()
+        if summary is None:
+            return not await Lesson.objects.filter(module=module).aexists()
+        return summary.is_complete
+
+    @classmethod
+    def record_completion(cls, student, lesson):
+        """
+        Увеличивает счётчик пройденных уроков модуля на 1.
+        Вызывается ровно один раз, когда Progress переходит в passed=True.
+        """
+        updated = cls.objects.filter(student=student, module_id=lesson.module_id).update(
+            completed_lessons=models.F('completed_lessons') + 1
+        )
+        if not updated:
+            summary, created = cls.objects.get_or_create(
+                student=student,
+                module_id=lesson.module_id,
+                defaults={
+                    'completed_lessons': 1,
+                    'total_lessons': Lesson.objects.filter(module_id=lesson.module_id).count(),
+                }
+            )
+            if not created:
+                # Параллельный запрос успел создать строку раньше нас
+                cls.objects.filter(pk=summary.pk).update(
+                    completed_lessons=models.F('completed_lessons') + 1
+                )
+
+    @classmethod
+    async def arecord_completion(cls, student, lesson):
+        """Асинхронная версия record_completion() — те же запросы через async ORM."""
+        updated = await cls.objects.filter(student=student, module_id=lesson.module_id).aupdate(
+            completed_lessons=models.F('completed_lessons') + 1
+        )
+        if not updated:
+            summary, created = await cls.objects.aget_or_create(
+                student=student,
+                module_id=lesson.module_id,
+                defaults={
+                    'completed_lessons': 1,
+                    'total_lessons': await Lesson.objects.filter(module_id=lesson.module_id).acount(),
+                }
+            )
+            if not created:
+                await cls.objects.filter(pk=summary.pk).aupdate(
+                    completed_lessons=models.F('completed_lessons') + 1
+                )
+
+    @classmethod
+    def refresh(cls, pairs):
+        """
+        Пересчитывает сводки для пар (student_id, module_id) из таблицы Progress:
+        два агрегирующих запроса + один upsert (+ обнуление сводок без пройденных уроков).
+        """
+        pairs = {(str(student_id), str(module_id)) for student_id, module_id in pairs}
+        if not pairs:
+            return 0
+        student_ids = {student_id for student_id, _ in pairs}
+        module_ids = {module_id for _, module_id in pairs}
+        completed = {
+            (str(row['student_id']), str(row['lesson__module_id'])): row['n']
+            for row in Progress.objects.filter(
+                passed=True, student_id__in=student_ids, lesson__module_id__in=module_ids
+            ).values('student_id', 'lesson__module_id').annotate(n=models.Count('id')).order_by()
+        }
+        totals = {
+            str(module_id): n
+            for module_id, n in Lesson.objects.filter(module_id__in=module_ids)
+            .values('module_id').annotate(n=models.Count('id')).order_by().values_list('module_id', 'n')
+        }
+        rows = [
+            cls(student_id=student_id, module_id=module_id, completed_lessons=n, total_lessons=totals[module_id])
+            for (student_id, module_id), n in completed.items()
+            if (student_id, module_id) in pairs
+        ]
+
+        with transaction.atomic():
+            missing = pairs - set(completed)
+            if missing:
+                stale = models.Q()
+                for student_id, module_id in missing:
+                    stale |= models.Q(student_id=student_id, module_id=module_id)
+                cls.objects.filter(stale).update(completed_lessons=0)
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['student', 'module'],
+                update_fields=['completed_lessons', 'total_lessons'],
+            )
+        return len(rows)
+
+    @classmethod
+    def rebuild(cls, modules=None):
+        """
+        Пересчитывает сводки из таблицы Progress. `modules` — queryset/список модулей
+        (по умолчанию все). Возвращает количество созданных строк.
+        """
+        module_qs = Module.objects.all()
+        if modules is not None:
+            module_qs = module_qs.filter(pk__in=[getattr(m, 'pk', m) for m in modules])
+
+        totals = dict(
+            module_qs.annotate(n=models.Count('lessons')).values_list('pk', 'n')
+        )
+        completed = (
+            Progress.objects.filter(passed=True, lesson__module_id__in=list(totals))
+            .values('student_id', 'lesson__module_id')
+            .annotate(n=models.Count('id'))
+        )
+        rows = [
+            cls(
+                student_id=row['student_id'],
+                module_id=row['lesson__module_id'],
+                completed_lessons=row['n'],
+                total_lessons=totals[row['lesson__module_id']],
+            )
+            for row in completed
+        ]
+
+        with transaction.atomic():
+            cls.objects.filter(module_id__in=list(totals)).delete()
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+class TestResultSummary(models.Model):
+    """
+    Сводка попыток ученика по тесту для журнала оценок (teacher_gradebook):
+    число попыток, лучший и последний итоговый балл, пройден ли тест.
+    Пересчитывается для затронутых пар (ученик, тест) при сохранении/удалении попытки
+    (сигналы) и после массовой проверки (finalize_graded). Уроки журнал берёт из ModuleProgress.
+    Полностью пересобирается командой `rebuild_gradebook`.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="test_results", verbose_name=_("Студент"))
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name="student_results", verbose_name=_("Тест"))
+    # Копия test.module.course_id — журнал курса выбирается по индексу без JOIN'ов
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="+", verbose_name=_("Курс"))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Попыток"))
+    pending_attempts = models.PositiveIntegerField(default=0, verbose_name=_("Ждут проверки"))
+    best_score = models.FloatField(null=True, blank=True, verbose_name=_("Лучший балл (%)"))
+    latest_score = models.FloatField(null=True, blank=True, verbose_name=_("Последний балл (%)"))
+    passed = models.BooleanField(default=False, verbose_name=_("Пройден"))
+
+    class Meta:
+        verbose_name = _("Результат по тесту")
+        verbose_name_plural = _("Результаты по тестам")
+        unique_together = ['student', 'test']
+        indexes = [
+            models.Index(fields=['course', 'student'], name='core_result_course_stud_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.test_id}: {self.best_score}"
+
+    @classmethod
+    def _aggregate(cls, submissions):
+        """Строки сводки из queryset попыток: один GROUP BY по (ученик, тест)."""
+        graded = models.Q(status=TestSubmission.STATUS_GRADED)
+        latest_score = (
+            TestSubmission.objects.filter(
+                student_id=models.OuterRef('student_id'),
+                test_id=models.OuterRef('test_id'),
+                status=TestSubmission.STATUS_GRADED,
+            )
+            .order_by('-submitted_at')
+            .values('score')[:1]
+        )
+        rows = (
+            submissions.values('student_id', 'test_id', 'test__module__course_id')
+            .annotate(
+                attempts=models.Count('id'),
+                pending_attempts=models.Count('id', filter=~graded),
+                best_score=models.Max('score', filter=graded),
+                passed_count=models.Count('id', filter=graded & models.Q(passed=True)),
+                latest_score=models.Subquery(latest_score),
+            )
+            .order_by()
+        )
+        return [
+            cls(
+                student_id=row['student_id'],
+                test_id=row['test_id'],
+                course_id=row['test__module__course_id'],
+                attempts=row['attempts'],
+                pending_attempts=row['pending_attempts'],
+                best_score=row['best_score'],
+                latest_score=row['latest_score'],
+                passed=row['passed_count'] > 0,
+            )
+            for row in rows
+        ]
+
+    @classmethod
+    def refresh(cls, pairs):
+        """
+        Пересчитывает сводки для пар (student_id, test_id) из их попыток:
+        один агрегирующий запрос + один upsert (+ удаление сводок без попыток).
+        """
+        pairs = {(str(student_id), str(test_id)) for student_id, test_id in pairs}
+        if not pairs:
+            return 0
+        student_ids = {student_id for student_id, _ in pairs}
+        test_ids = {test_id for _, test_id in pairs}
+        rows = [
+            row for row in cls._aggregate(
+                TestSubmission.objects.filter(student_id__in=student_ids, test_id__in=test_ids)
+            )
+            if (str(row.student_id), str(row.test_id)) in pairs
+        ]
+        found = {(str(row.student_id), str(row.test_id)) for row in rows}
+
+        with transaction.atomic():
+            missing = pairs - found
+            if missing:
+                stale = models.Q()
+                for student_id, test_id in missing:
+                    stale |= models.Q(student_id=student_id, test_id=test_id)
+                cls.objects.filter(stale).delete()
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['student', 'test'],
+                update_fields=['course', 'attempts', 'pending_attempts', 'best_score', 'latest_score', 'passed'],
+            )
+        return len(rows)
+
+    @classmethod
+    def rebuild(cls, courses=None):
+        """
+        Пересчитывает сводки из таблицы TestSubmission. `courses` — queryset/список курсов
+        (по умолчанию все). Возвращает количество созданных строк.
+        """
+        submissions = TestSubmission.objects.all()
+        summaries = cls.objects.all()
+        if courses is not None:
+            course_ids = [getattr(c, 'pk', c) for c in courses]
+            submissions = submissions.filter(test__module__course_id__in=course_ids)
+            summaries = summaries.filter(course_id__in=course_ids)
+        rows = cls._aggregate(submissions)
+
+        with transaction.atomic():
+            summaries.delete()
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+def normalize_search_term(text):
+    """Нормализация для префиксного поиска: нижний регистр, 'ё' -> 'е', без пробелов по краям."""
+    return (text or "").strip().lower().replace('ё', 'е')
+
+
+class TestDraft(models.Model):
+    """
+    Черновик ответов ученика на тест — автосохранение во время прохождения (drafts.py).
+    Одна строка на пару (ученик, тест): answers — {id вопроса: текст ответа}. Каждый ответ
+    дописывается в JSON одним UPDATE без предварительного чтения.
+    При отправке теста черновик превращается в ответы попытки и удаляется (take()).
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="test_drafts", verbose_name=_("Студент"))
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name="drafts", verbose_name=_("Тест"))
+    answers = models.JSONField(default=dict, blank=True, verbose_name=_("Ответы"))
+    # Случайная выборка вопросов, выданная ученику (sampling.py); None — все вопросы теста
+    question_ids = models.JSONField(null=True, blank=True, verbose_name=_("Вопросы попытки"))
+    # Не auto_now: черновик обновляется через update(), время выставляется явно
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name=_("Сохранён"))
+
+    class Meta:
+        verbose_name = _("Черновик теста")
+        verbose_name_plural = _("Черновики тестов")
+        unique_together = ['student', 'test']
+
+    def __str__(self):
+        return f"{self.student_id} - {self.test_id}"
+
+    @classmethod
+    def take(cls, test, student, answers):
+        """
+        Ответы для попытки: черновик, поверх него — пришедшие с формой, и выданные вопросы
+        (None, если выборки не было). Черновик удаляется.
+        Вызывается внутри транзакции создания попытки.
+        """
+        drafts = cls.objects.filter(student=student, test=test)
+        draft = drafts.values_list('answers', 'question_ids').first()
+        if draft is None:
+            return answers, None
+        drafts.delete()
+        draft_answers, question_ids = draft
+        return {**draft_answers, **answers}, question_ids
+
+
+class UserSearchTerm(models.Model):
+    """
+    Префиксный индекс для поиска учеников: по строке на каждое поле
+    (логин, email, имя, фамилия) в нормализованном виде.
+    Поиск идёт диапазоном term >= q AND term < q + '\uffff' — такой запрос использует
+    обычный B-tree индекс и в SQLite, и в PostgreSQL, в том числе для кириллицы
+    (в отличие от LOWER(...) LIKE 'q%', который в SQLite не понимает кириллицу).
+    Обновляется сигналом при сохранении пользователя.
+    """
+    SOURCE_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="search_terms", verbose_name=_("Пользователь"))
+    term = models.CharField(max_length=254, verbose_name=_("Термин"))
+
+    class Meta:
+        verbose_name = _("Поисковый термин пользователя")
+        verbose_name_plural = _("Поисковые термины пользователей")
+        indexes = [
+            models.Index(fields=['term', 'user'], name='core_usersearch_term_idx'),
+        ]
+
+    def __str__(self):
+        return self.term
+
+    @classmethod
+    def terms_for(cls, user):
+        terms = {normalize_search_term(getattr(user, field))[:254] for field in cls.SOURCE_FIELDS}
+        terms.discard('')
+        return terms
+
+    @classmethod
+    def refresh_for(cls, user):
+        with transaction.atomic():
+            cls.objects.filter(user=user).delete()
+            cls.objects.bulk_create([cls(user=user, term=term) for term in cls.terms_for(user)])
+
+    @classmethod
+    def matching_user_ids(cls, query):
+        """Подзапрос id пользователей, у которых какое-то поле начинается с query."""
+        prefix = normalize_search_term(query)
+        return cls.objects.filter(term__gte=prefix, term__lt=prefix + '\uffff').values('user_id')
+
+
+class SearchDocument(models.Model):
+    """
+    Документ полнотекстового поиска: урок или вопрос теста в виде простого текста (HTML вырезан).
+    Индекс над этой таблицей создаёт миграция 0015: FTS5 в SQLite, tsvector + GIN в PostgreSQL.
+    Заполняется сигналами (см. search.py), удаляется каскадом вместе с уроком/вопросом.
+    """
+    KIND_LESSON = 'lesson'
+    KIND_QUESTION = 'question'
+    KIND_CHOICES = (
+        (KIND_LESSON, _('Занятие')),
+        (KIND_QUESTION, _('Вопрос теста')),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name=_("Тип"))
+    lesson = models.OneToOneField(
+        Lesson, on_delete=models.CASCADE, null=True, blank=True,
+        related_name="search_document", verbose_name=_("Занятие")
+    )
+    question = models.OneToOneField(
+        TestQuestion, on_delete=models.CASCADE, null=True, blank=True,
+        related_name="search_document", verbose_name=_("Вопрос")
+    )
+    title = models.CharField(max_length=255, verbose_name=_("Заголовок"))
+    body = models.TextField(blank=True, verbose_name=_("Текст"))
+    # Основы слов заголовка и текста — по ним ищет FTS5 (в SQLite нет русского стемминга)
+    stems = models.TextField(blank=True, verbose_name=_("Основы слов"))
+
+    class Meta:
+        verbose_name = _("Поисковый документ")
+        verbose_name_plural = _("Поисковые документы")
+
+    def __str__(self):
+        return self.title
+
+
+class Job(models.Model):
+    """
+    Фоновая задача в очереди на базе данных (см. jobs.py, команда run_worker).
+    kind — имя зарегистрированного обработчика, payload — его аргументы (JSON).
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'    # dead letter: попытки исчерпаны, ждёт разбора (повтор — действием в админке)
+    STATUS_CHOICES = (
+        (STATUS_PENDING, _('В очереди')),
+        (STATUS_RUNNING, _('Выполняется')),
+        (STATUS_DONE, _('Выполнена')),
+        (STATUS_FAILED, _('Ошибка (попытки исчерпаны)')),
+    )
+
+    kind = models.CharField(max_length=100, verbose_name=_("Тип задачи"))
+    payload = models.JSONField(default=dict, blank=True, verbose_name=_("Параметры"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name=_("Статус"))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Попыток"))
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name=_("Максимум попыток"))
+    last_error = models.TextField(blank=True, verbose_name=_("Последняя ошибка"))
+    run_after = models.DateTimeField(default=timezone.now, verbose_name=_("Не раньше"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Создана"))
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Начата"))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Завершена"))
+
+    class Meta:
+        verbose_name = _("Фоновая задача")
+        verbose_name_plural = _("Фоновые задачи")
+        indexes = [
+            # Выборка воркером: status = 'pending' AND run_after <= now ORDER BY run_after
+            models.Index(fields=['status', 'run_after'], name='core_job_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.get_status_display()})"
+
+
 class CourseFeature(models.Model):
     """
     Модель для описания "Чему вы научитесь" на главной странице.
@@ -363,6 +1046,7 @@ class TeacherCard(models.Model):
     name = models.CharField(max_length=200, verbose_name=_("Имя преподавателя"))
     description = models.CharField(max_length=255, verbose_name=_("Описание (напр. 'д.ф.н., профессор')"))
     photo = models.ImageField(upload_to='teacher_cards/', blank=False, null=False, verbose_name=_("Фотография"))
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name=_("Размеры фотографии"))
     order = models.PositiveIntegerField(default=0, verbose_name=_("Порядок"))
 
     class Meta:
@@ -0,0 +1,135 @@
+# eduplatform/core/navigation.py
+#
+# Порядок прохождения курса и подсказки браузеру, что открыть заранее.
+# Курс проходят строго по порядку: урок -> "Отметить как пройденное" -> следующий урок
+# (после последнего урока модуля — тест). Когда отдаётся фрагмент урока, мы уже знаем, что
+# ученик откроет дальше, поэтому в ответ добавляются:
+#   - кнопки "Следующий урок" / "Перейти к тесту" во фрагменте;
+#   - <link rel="prefetch"> во фрагменте — браузер заранее скачивает следующий фрагмент
+#     и картинку следующего урока. Запрос prefetch (is_prefetch) ничего не пишет в базу:
+#     строку прогресса и выборку вопросов теста создаёт только настоящее открытие;
+#   - те же ссылки в заголовке Link. Сами gunicorn/uvicorn 103 Early Hints не отправляют,
+#     но прокси/CDN с поддержкой Early Hints берут ссылки именно из заголовка Link.
+# Когда ученик нажимает "Следующий урок", фрагмент уже в кэше браузера: он перепроверяется
+# по ETag (etags.py) и приходит 304 без рендера.
+#
+# Последовательность уроков и тестов курса кэшируется с ключом от версии курса
+# (content_versions.py) — любое изменение содержимого курса её обновляет. При LocMemCache
+# остальные воркеры продолжали бы отдавать старую последовательность, см. checks.py.
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from .content_versions import COURSE_OUTLINE_TIMEOUT, get_course_version
+from .images import current_variants
+from .models import Lesson, Module, Test
+
+
+def is_prefetch(request):
+    """Запрос браузера по <link rel=prefetch> / заголовку Link, а не открытие ученика."""
+    purpose = request.headers.get('Sec-Purpose') or request.headers.get('Purpose') or request.headers.get('X-Moz') or ''
+    return 'prefetch' in purpose.lower()
+
+
+def _sequence_key(course_id):
+    return f'core:course_sequence:{course_id}:{get_course_version(course_id)}'
+
+
+def _lessons_queryset(course_id):
+    # Порядок как в меню course.html: модули и уроки по дате создания
+    return (
+        Lesson.objects.filter(module__course_id=course_id)
+        .order_by('module__created_at', 'module_id', 'created_at')
+        .only('id', 'module_id', 'image_file', 'image_file_variants')
+    )
+
+
+def _image_variant(lesson):
+    """Что браузер, скорее всего, загрузит из srcset: самую крупную WebP-производную (или оригинал)."""
+    if not lesson.image_file:
+        return None
+    variants = current_variants(lesson.image_file)
+    return f"{variants['widths'][-1]}w.webp" if variants else ''
+
+
+def _build_sequence(lessons, test_modules):
+    """
+    Шаги курса по порядку: {'kind': 'lesson'|'test', 'id': урок или модуль теста,
+    'module': id модуля, 'image': вариант картинки урока для prefetch}.
+    """
+    steps = []
+    for index, lesson in enumerate(lessons):
+        steps.append({'kind': 'lesson', 'id': lesson.pk, 'module': lesson.module_id, 'image': _image_variant(lesson)})
+        last_in_module = index + 1 == len(lessons) or lessons[index + 1].module_id != lesson.module_id
+        if last_in_module and lesson.module_id in test_modules:
+            steps.append({'kind': 'test', 'id': lesson.module_id, 'module': lesson.module_id, 'image': None})
+    return steps
+
+
+def course_sequence(course_id):
+    key = _sequence_key(course_id)
+    steps = cache.get(key)
+    if steps is None:
+        lessons = list(_lessons_queryset(course_id))
+        test_modules = set(Test.objects.filter(module__course_id=course_id).values_list('module_id', flat=True))
+        steps = _build_sequence(lessons, test_modules)
+        cache.set(key, steps, COURSE_OUTLINE_TIMEOUT)
+    return steps
+
+
+async def acourse_sequence(course_id):
+    """Асинхронная версия course_sequence() для async-views."""
+    key = _sequence_key(course_id)
+    steps = await cache.aget(key)
+    if steps is None:
+        lessons = [lesson async for lesson in _lessons_queryset(course_id)]
+        test_modules = {
+            module_id async for module_id in
+            Test.objects.filter(module__course_id=course_id).values_list('module_id', flat=True)
+        }
+        steps = _build_sequence(lessons, test_modules)
+        await cache.aset(key, steps, COURSE_OUTLINE_TIMEOUT)
+    return steps
+
+
+def next_steps(steps, lesson_id):
+    """
+    Что открыть после урока: {'next_lesson': шаг следующего урока или None,
+    'module_test': шаг теста модуля, если урок последний в модуле, иначе None}.
+    """
+    position = next((index for index, step in enumerate(steps)
+                     if step['kind'] == 'lesson' and step['id'] == lesson_id), None)
+    result = {'next_lesson': None, 'module_test': None}
+    if position is None:
+        return result
+    for step in steps[position + 1:]:
+        if step['kind'] == 'test':
+            if step['module'] == steps[position]['module']:
+                result['module_test'] = step
+            continue
+        result['next_lesson'] = step
+        break
+    return result
+
+
+def step_url(step):
+    if step['kind'] == 'test':
+        return reverse('core:new_test_detail', args=[step['id']])
+    return reverse('core:new_lesson_detail', args=[step['id']])
+
+
+def prefetch_urls(navigation):
+    """Адреса для prefetch: фрагмент следующего шага и картинка следующего урока."""
+    urls = []
+    upcoming = navigation['module_test'] or navigation['next_lesson']
+    if upcoming:
+        urls.append(step_url(upcoming))
+    lesson = navigation['next_lesson']
+    if lesson and lesson['image'] is not None:
+        image_url = reverse('core:lesson_media', args=[lesson['id'], 'image'])
+        urls.append(f"{image_url}?variant={lesson['image']}" if lesson['image'] else image_url)
+    return urls
+
+
+def link_header(urls):
+    return ', '.join(f'<{url}>; rel=prefetch' for url in urls)
@@ -0,0 +1,85 @@
+# eduplatform/core/permissions.py
+#
+# Права учителя на редактирование: учитель правит то, что лежит в модулях, где он в Module.teachers.
+# Раньше каждая teacher_*-view проверяла `request.user not in X.module.teachers.all()` — это
+# загрузка модуля (часто лениво), всего списка учителей и создание объектов User на каждый запрос.
+#
+# Здесь множество id редактируемых модулей получается одним запросом и кэшируется
+# (в кэше Django на PERMISSION_CACHE_TIMEOUT секунд и на объекте пользователя до конца запроса).
+# Изменение Module.teachers (m2m_changed, см. signals.py) сбрасывает кэш затронутых учителей;
+# чтобы снятый с модуля учитель потерял доступ во всех воркерах, кэш должен быть общим (checks.py).
+#
+# can_edit(user, obj) сам находит модуль объекта по пути из MODULE_PATHS: если промежуточные
+# объекты загружены (select_related) — без запросов, иначе одним values_list без их загрузки.
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Lesson, Module, Resource, Test, TestAnswer, TestQuestion, TestSubmission
+
+# Путь от объекта до его модуля
+MODULE_PATHS = {
+    Module: '',
+    Lesson: 'module',
+    Test: 'module',
+    Resource: 'lesson__module',
+    TestQuestion: 'test__module',
+    TestSubmission: 'test__module',
+    TestAnswer: 'submission__test__module',
+}
+
+
+def _cache_key(user_id):
+    return f'core:editable_modules:{user_id}'
+
+
+def editable_module_ids(user):
+    """Множество id модулей (UUID), которые пользователь может редактировать."""
+    if not user.is_authenticated:
+        return frozenset()
+    module_ids = getattr(user, '_editable_module_ids', None)
+    if module_ids is None:
+        module_ids = cache.get(_cache_key(user.pk))
+        if module_ids is None:
+            module_ids = frozenset(Module.objects.filter(teachers=user).values_list('pk', flat=True))
+            cache.set(_cache_key(user.pk), module_ids, getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 300))
+        user._editable_module_ids = module_ids
+    return module_ids
+
+
+def invalidate_editable_modules(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def can_edit_module(user, module_id):
+    """module_id — UUID или строка (например, из GET-параметра); неверное значение -> False."""
+    try:
+        module_id = module_id if isinstance(module_id, uuid.UUID) else uuid.UUID(str(module_id))
+    except ValueError:
+        return False
+    return module_id in editable_module_ids(user)
+
+
+def module_id_of(obj):
+    """id модуля объекта по пути из MODULE_PATHS, не загружая промежуточные объекты."""
+    path = MODULE_PATHS[type(obj)]
+    if not path:
+        return obj.pk
+    names = path.split('__')
+    for index, name in enumerate(names[:-1]):
+        if not obj._meta.get_field(name).is_cached(obj):
+            # Дальше по пути объекты не загружены — один запрос за id модуля
+            rest = '__'.join(names[index:])
+            return type(obj).objects.filter(pk=obj.pk).values_list(f'{rest}_id', flat=True).first()
+        obj = getattr(obj, name)
+        if obj is None:
+            return None
+    return getattr(obj, f'{names[-1]}_id')
+
+
+def can_edit(user, obj):
+    """Может ли пользователь редактировать объект (модуль, урок, тест, вопрос, попытку...)."""
+    module_id = module_id_of(obj)
+    return module_id is not None and module_id in editable_module_ids(user)
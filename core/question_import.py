@@ -0,0 +1,336 @@
+# eduplatform/core/question_import.py
+#
+# Массовый импорт вопросов теста из файла: CSV, JSON и Moodle GIFT.
+# Через QuestionForm вопросы добавляются по одному (каждый — POST, редирект и перерисовка
+# всей страницы теста), а банк на тысячи вопросов (sampling.py) так не набрать.
+#
+# Файл читается потоком: CSV — csv.reader по строкам, JSON — объекты по одному
+# (JSONDecoder.raw_decode по кускам файла; массив объектов или JSON Lines),
+# GIFT — блоками между пустыми строками. Каждая запись проверяется (clean_row) и копится
+# в пачку, пачки пишутся bulk_create внутри одной транзакции. Ошибки собираются по номеру
+# строки (для JSON — по номеру элемента). Если в файле есть ошибки, по умолчанию
+# транзакция откатывается и не импортируется ничего (skip_invalid=True — импорт без них).
+#
+# bulk_create не вызывает сигналы, поэтому всё, что делают сигналы TestQuestion, делается
+# здесь: документы поиска пишутся той же пачкой, а ключ ответов (answer_keys.py) и версия
+# курса (content_versions.py) сбрасываются после коммита.
+#
+# Используется во view teacher_question_import и в команде `python manage.py import_questions`.
+
+import csv
+import io
+import json
+import re
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .answer_keys import invalidate_answer_key
+from .content_versions import bump_course_version
+from .models import TestQuestion, normalize_answer
+from .search import index_new_questions
+
+FORMATS = ('csv', 'json', 'gift')
+EXTENSIONS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.gift': 'gift', '.txt': 'gift'}
+CHUNK_SIZE = 500
+READ_SIZE = 64 * 1024
+# Сколько ошибок показывать (считаются все)
+MAX_REPORTED_ERRORS = 100
+
+OPTION_LETTERS = 'abcde'
+OPTION_FIELDS = tuple(f'option_{letter}' for letter in OPTION_LETTERS)
+OPTION_MAX_LENGTH = TestQuestion._meta.get_field('option_a').max_length
+QUESTION_TYPES = dict(TestQuestion.QUESTION_TYPE_CHOICES)
+
+# Варианты для вопроса GIFT "верно/неверно" ({T} / {F})
+TRUE_FALSE_OPTIONS = ('Верно', 'Неверно')
+
+
+def detect_format(filename):
+    """Формат по расширению файла или None."""
+    for extension, fmt in EXTENSIONS.items():
+        if (filename or '').lower().endswith(extension):
+            return fmt
+    return None
+
+
+# --- Проверка записи ---
+
+def clean_row(data):
+    """
+    Запись файла -> (поля TestQuestion, список ошибок). Значения могут быть не строками (JSON).
+    Правильный ответ 'choice' должен совпадать с одним из вариантов (без учёта регистра и
+    пробелов по краям, как при оценивании) или быть буквой варианта: a–e.
+    """
+    if not isinstance(data, dict):
+        return None, ["Запись должна быть объектом с полями вопроса."]
+
+    def value(name):
+        raw = data.get(name)
+        return '' if raw is None else str(raw).strip()
+
+    errors = []
+    text = value('text')
+    if not text:
+        errors.append("Пустой текст вопроса (text).")
+
+    options = {field: value(field) for field in OPTION_FIELDS}
+    for field, option in options.items():
+        if len(option) > OPTION_MAX_LENGTH:
+            errors.append(f"{field}: длиннее {OPTION_MAX_LENGTH} символов.")
+
+    question_type = value('question_type').lower() or ('choice' if any(options.values()) else 'open_ended')
+    if question_type not in QUESTION_TYPES:
+        errors.append(f"Неизвестный тип вопроса «{question_type}» (допустимо: {', '.join(QUESTION_TYPES)}).")
+
+    max_score = value('max_score') or '1'
+    try:
+        max_score = int(max_score)
+        if max_score < 1:
+            raise ValueError
+    except ValueError:
+        errors.append(f"max_score должен быть целым числом не меньше 1, получено «{max_score}».")
+
+    correct_answer = value('correct_answer')
+    if question_type == 'choice':
+        filled = {field: option for field, option in options.items() if option}
+        if len(filled) < 2:
+            errors.append("Для вопроса с выбором нужно минимум два варианта (option_a–option_e).")
+        matches = [option for option in filled.values() if normalize_answer(option) == normalize_answer(correct_answer)]
+        letter_field = f'option_{correct_answer.lower()}'
+        if matches:
+            correct_answer = matches[0]
+        elif len(correct_answer) == 1 and letter_field in filled:
+            correct_answer = filled[letter_field]
+        elif not correct_answer:
+            errors.append("Не указан правильный ответ (correct_answer).")
+        else:
+            errors.append(f"Правильный ответ «{correct_answer}» не совпадает ни с одним из вариантов.")
+    else:
+        # У развёрнутого ответа нет вариантов и автоматической проверки
+        options = dict.fromkeys(OPTION_FIELDS, '')
+        correct_answer = ''
+
+    if errors:
+        return None, errors
+    return {
+        'text': text,
+        'question_type': question_type,
+        **{field: option or None for field, option in options.items()},
+        'correct_answer': correct_answer or None,
+        'max_score': max_score,
+    }, []
+
+
+# --- Разбор форматов: генераторы (номер строки/элемента, запись) ---
+
+def _iter_csv(stream):
+    """CSV с заголовком: text, question_type, option_a..option_e, correct_answer, max_score."""
+    header_line = stream.readline()
+    # Разделитель: Excel в русской локали сохраняет CSV через ';'
+    delimiter = ';' if header_line.count(';') > header_line.count(',') else ','
+    header = [name.strip().lower() for name in next(csv.reader([header_line], delimiter=delimiter), [])]
+    if 'text' not in header:
+        raise ValueError("В первой строке CSV нет колонки text (нужен заголовок с именами полей).")
+    reader = csv.reader(stream, delimiter=delimiter)
+    # Номер строки в файле, с которой начинается запись (заголовок — строка 1;
+    # запись может занимать несколько строк, если в кавычках есть переводы строк)
+    lines_read = 0
+    for row in reader:
+        number, lines_read = lines_read + 2, reader.line_num
+        if not any(cell.strip() for cell in row):
+            continue
+        yield number, dict(zip(header, row))
+
+
+_JSON_SEPARATORS = re.compile(r'[\s,\[\]]*')
+
+
+def _iter_json(stream):
+    """Массив объектов или JSON Lines; объекты декодируются по одному, файл читается кусками."""
+    decoder = json.JSONDecoder()
+    buffer, position, number = '', 0, 0
+    while True:
+        position = _JSON_SEPARATORS.match(buffer, position).end()
+        if position == len(buffer):
+            chunk = stream.read(READ_SIZE)
+            if not chunk:
+                return
+            buffer, position = chunk, 0
+            continue
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as error:
+            # Объект не дочитан — добавляем следующий кусок; файл кончился — ошибка в JSON
+            chunk = stream.read(READ_SIZE)
+            if not chunk:
+                raise ValueError(f"Неверный JSON в элементе {number + 1}: {error.msg}.")
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        number += 1
+        yield number, item
+
+
+# Экранированные символы GIFT заменяются на символы из области для частного использования,
+# чтобы разбор не спотыкался о \= \~ \# \{ \} \:, и возвращаются в готовом тексте
+_GIFT_ESCAPES = {f'\\{char}': chr(0xE000 + index) for index, char in enumerate('~=#{}:')}
+_GIFT_UNESCAPE = {placeholder: escaped[1] for escaped, placeholder in _GIFT_ESCAPES.items()}
+_GIFT_ANSWER = re.compile(r'([=~])([^=~]*)')
+_GIFT_WEIGHT = re.compile(r'^%(-?\d+(?:\.\d+)?)%')
+
+
+def _gift_text(value, feedback=False):
+    if feedback:
+        value = value.split('#', 1)[0]   # отзыв к варианту (после #) не нужен
+    for placeholder, char in _GIFT_UNESCAPE.items():
+        value = value.replace(placeholder, char)
+    return value.replace('\\n', '\n').strip()
+
+
+def parse_gift_question(block):
+    """
+    Один вопрос GIFT -> запись для clean_row(). Поддерживаются: выбор из вариантов (=верный ~неверный,
+    веса %100%), "верно/неверно" ({T}/{F}) и эссе ({}). Короткий ответ, соответствия и числовые —
+    ValueError: в модели для них нет типа вопроса.
+    """
+    for escaped, placeholder in _GIFT_ESCAPES.items():
+        block = block.replace(escaped, placeholder)
+    block = re.sub(r'^::.*?::', '', block.strip(), flags=re.S).strip()        # заголовок ::Название::
+    block = re.sub(r'^\[(html|moodle|plain|markdown)\]', '', block).strip()   # формат текста
+
+    start, end = block.find('{'), block.rfind('}')
+    if start == -1 or end < start:
+        raise ValueError("Нет блока ответов {...}.")
+    before, body, after = block[:start].strip(), block[start + 1:end].strip(), block[end + 1:].strip()
+    # "Пропущенное слово": ответы посередине текста
+    text = _gift_text(f"{before} _____ {after}" if after else before)
+
+    if not body:
+        return {'text': text, 'question_type': 'open_ended'}
+    if body.upper() in ('T', 'TRUE', 'F', 'FALSE'):
+        correct = TRUE_FALSE_OPTIONS[0] if body.upper().startswith('T') else TRUE_FALSE_OPTIONS[1]
+        return {'text': text, 'question_type': 'choice', 'option_a': TRUE_FALSE_OPTIONS[0],
+                'option_b': TRUE_FALSE_OPTIONS[1], 'correct_answer': correct}
+    if body.startswith('#'):
+        raise ValueError("Числовые вопросы GIFT не поддерживаются.")
+
+    answers = _GIFT_ANSWER.findall(body)
+    if any('->' in answer for _, answer in answers):
+        raise ValueError("Вопросы на соответствие GIFT не поддерживаются.")
+    if not any(kind == '~' for kind, _ in answers):
+        raise ValueError("Вопросы с коротким ответом GIFT не поддерживаются (нужны варианты ~).")
+    if len(answers) > len(OPTION_FIELDS):
+        raise ValueError(f"Больше {len(OPTION_FIELDS)} вариантов ответа.")
+
+    row = {'text': text, 'question_type': 'choice'}
+    correct = []
+    for field, (kind, answer) in zip(OPTION_FIELDS, answers):
+        weight = _GIFT_WEIGHT.match(answer.strip())
+        if weight:
+            answer = answer.strip()[weight.end():]
+        row[field] = _gift_text(answer, feedback=True)
+        if kind == '=' or (weight and float(weight.group(1)) == 100):
+            correct.append(row[field])
+    if len(correct) != 1:
+        raise ValueError("Нужен ровно один правильный вариант (=).")
+    row['correct_answer'] = correct[0]
+    return row
+
+
+def _iter_gift(stream):
+    """Вопросы GIFT разделены пустыми строками; // — комментарии, $CATEGORY пропускается."""
+    block, start = [], None
+    for number, line in enumerate(stream, 1):
+        stripped = line.strip()
+        if stripped.startswith('//'):
+            continue
+        if stripped:
+            start = start or number
+            block.append(line.rstrip('\r\n'))
+            continue
+        if block:
+            yield from _gift_block(start, block)
+        block, start = [], None
+    if block:
+        yield from _gift_block(start, block)
+
+
+def _gift_block(start, lines):
+    text = '\n'.join(lines)
+    if text.lstrip().startswith('$CATEGORY'):
+        return
+    try:
+        yield start, parse_gift_question(text)
+    except ValueError as error:
+        yield start, error
+
+
+PARSERS = {'csv': _iter_csv, 'json': _iter_json, 'gift': _iter_gift}
+
+
+# --- Импорт ---
+
+def _text_stream(upload):
+    """Текстовый поток поверх загруженного файла (UploadedFile или открытый бинарный файл)."""
+    if isinstance(upload, io.TextIOBase):
+        return upload
+    upload.seek(0)
+    # utf-8-sig — Excel пишет BOM в начало CSV
+    return io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+
+
+def import_questions(test, upload, fmt, skip_invalid=False, dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Импортирует вопросы из файла в тест. Возвращает словарь:
+    rows — записей в файле, valid — прошли проверку, created — добавлено вопросов,
+    errors — [(строка, [сообщения])] (первые MAX_REPORTED_ERRORS), error_count — всего ошибочных
+    записей, file_error — файл не удалось разобрать (тогда не импортируется ничего).
+    dry_run — только проверка: транзакция откатывается.
+    """
+    result = {'rows': 0, 'valid': 0, 'created': 0, 'errors': [], 'error_count': 0, 'file_error': None}
+    # Вопросы сохраняют порядок файла: created_at растёт на микросекунду
+    created_at = timezone.now()
+    batch = []
+
+    def flush():
+        TestQuestion.objects.bulk_create(batch)
+        index_new_questions(batch, {test.pk: test.title})
+        result['created'] += len(batch)
+        batch.clear()
+
+    with transaction.atomic():
+        try:
+            for row_number, data in PARSERS[fmt](_text_stream(upload)):
+                result['rows'] += 1
+                if isinstance(data, ValueError):
+                    fields, errors = None, [str(data)]
+                else:
+                    fields, errors = clean_row(data)
+                if errors:
+                    result['error_count'] += 1
+                    if len(result['errors']) < MAX_REPORTED_ERRORS:
+                        result['errors'].append((row_number, errors))
+                    continue
+                result['valid'] += 1
+                batch.append(TestQuestion(
+                    test=test, created_at=created_at + timedelta(microseconds=result['rows']), **fields
+                ))
+                if len(batch) >= chunk_size:
+                    flush()
+            if batch:
+                flush()
+        except (ValueError, UnicodeDecodeError, csv.Error) as error:
+            if isinstance(error, UnicodeDecodeError):
+                error = "Файл должен быть в кодировке UTF-8."
+            result['file_error'] = str(error)
+
+        if dry_run or result['file_error'] or (result['error_count'] and not skip_invalid):
+            transaction.set_rollback(True)
+            result['created'] = 0
+
+    if result['created']:
+        # Сигналы bulk_create не вызывает: ключ ответов и версия курса — после коммита
+        course_id = test.module.course_id
+        transaction.on_commit(lambda: (invalidate_answer_key(test.pk), bump_course_version(course_id)))
+    return result
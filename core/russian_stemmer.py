@@ -0,0 +1,151 @@
+# eduplatform/core/russian_stemmer.py
+#
+# Стеммер русского языка по алгоритму Snowball (Портер для русского):
+# https://snowballstem.org/algorithms/russian/stemmer.html
+# Нужен для полнотекстового поиска на SQLite: FTS5 не умеет русскую морфологию,
+# поэтому основы слов считаем в Python и при индексации, и при поиске.
+# В PostgreSQL ту же работу делает to_tsvector('russian', ...).
+
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')                 # после 'а' или 'я'
+PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+
+ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому',
+    'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+    'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')                 # после 'а' или 'я'
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+
+REFLEXIVE = ('ся', 'сь')
+
+VERB_1 = (                                                  # после 'а' или 'я'
+    'ете', 'йте', 'ешь', 'нно',
+    'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть',
+    'й', 'л', 'н',
+)
+VERB_2 = (
+    'ейте', 'уйте',
+    'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют',
+    'ены', 'ить', 'ыть', 'ишь',
+    'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую',
+    'ю',
+)
+
+NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях',
+    'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом',
+    'ах', 'ях', 'ию', 'ью', 'ия', 'ья',
+    'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+)
+
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+CYRILLIC_RE = re.compile(r'[а-я]')
+
+
+def _regions(word):
+    """Возвращает начала областей RV и R2 (индексы в слове)."""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    r2 = next_region(r1)
+    return rv, r2
+
+
+def _remove(word, start, endings, after_a=False):
+    """
+    Убирает самое длинное из окончаний, целиком лежащее в области [start:].
+    after_a=True — окончание должно идти после 'а' или 'я' (сама буква остаётся).
+    Возвращает (новое слово, удалось ли).
+    """
+    for ending in sorted(endings, key=len, reverse=True):
+        if not word.endswith(ending):
+            continue
+        cut = len(word) - len(ending)
+        if cut < start:
+            continue
+        if after_a and (cut - 1 < start or word[cut - 1] not in 'ая'):
+            continue
+        return word[:cut], True
+    return word, False
+
+
+def _remove_grouped(word, start, group_1, group_2):
+    """Окончания группы 1 требуют 'а'/'я' перед собой; из всех совпадений берём самое длинное."""
+    candidates = []
+    for ending in group_1:
+        cut = len(word) - len(ending)
+        if word.endswith(ending) and cut - 1 >= start and word[cut - 1] in 'ая':
+            candidates.append(ending)
+    for ending in group_2:
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            candidates.append(ending)
+    if not candidates:
+        return word, False
+    return word[:len(word) - len(max(candidates, key=len))], True
+
+
+# Словарь текстов небольшой, а слова повторяются: при индексации пачкой (rebuild_index,
+# импорт вопросов) большинство основ берётся из кэша
+@lru_cache(maxsize=50000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC_RE.search(word):
+        return word
+    rv, r2 = _regions(word)
+
+    # Шаг 1
+    word, done = _remove_grouped(word, rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if not done:
+        word, _ = _remove(word, rv, REFLEXIVE)
+        word, done = _remove(word, rv, ADJECTIVE)
+        if done:
+            word, _ = _remove_grouped(word, rv, PARTICIPLE_1, PARTICIPLE_2)
+        else:
+            word, done = _remove_grouped(word, rv, VERB_1, VERB_2)
+            if not done:
+                word, _ = _remove(word, rv, NOUN)
+
+    # Шаг 2
+    word, _ = _remove(word, rv, ('и',))
+
+    # Шаг 3
+    word, _ = _remove(word, r2, DERIVATIONAL)
+
+    # Шаг 4
+    if word.endswith('нн') and len(word) - 1 > rv:
+        word = word[:-1]
+    else:
+        word, done = _remove(word, rv, SUPERLATIVE)
+        if done and word.endswith('нн') and len(word) - 1 > rv:
+            word = word[:-1]
+        elif not done:
+            word, _ = _remove(word, rv, ('ь',))
+    return word
+
+
+def tokenize(text):
+    return [token.lower().replace('ё', 'е') for token in WORD_RE.findall(text or '')]
+
+
+def stem_text(text):
+    """Текст -> строка основ через пробел (для индекса FTS5)."""
+    return ' '.join(stem(token) for token in tokenize(text))
@@ -0,0 +1,123 @@
+# eduplatform/core/sampling.py
+#
+# Случайная выборка вопросов из банка теста: у теста может быть тысячи вопросов, а ученик
+# получает Test.questions_per_attempt случайных (свой набор на каждую попытку), при
+# Test.stratify_by_score — в тех же долях по баллу вопроса, что и в банке.
+#
+# Выборка делается в памяти по кэшированному ключу ответов (answer_keys.py): в нём уже есть
+# id и баллы всех вопросов, поэтому ни ORDER BY RANDOM() (сортировка всего банка на каждый
+# показ теста), ни чтения банка из базы не нужно. Из базы загружаются только выпавшие вопросы.
+#
+# Выпавшие id хранятся в черновике попытки (TestDraft.question_ids) — при повторном открытии
+# теста ученик видит тот же набор, — а при отправке переходят в TestSubmission.question_ids.
+# Оценивание и максимальный балл попытки считаются только по ним (subset_key()).
+
+import random
+
+from django.db import IntegrityError, transaction
+
+from .answer_keys import get_answer_key
+from .models import TestDraft
+
+_random = random.SystemRandom()
+
+
+def _allocate(strata, count):
+    """
+    Сколько вопросов взять из каждой группы: пропорционально размеру группы,
+    остаток — группам с наибольшей дробной частью (метод наибольшего остатка).
+    """
+    total = sum(len(ids) for ids in strata.values())
+    quotas = {score: count * len(ids) / total for score, ids in strata.items()}
+    allocation = {score: int(quota) for score, quota in quotas.items()}
+    remainder = count - sum(allocation.values())
+    for score in sorted(quotas, key=lambda score: quotas[score] - allocation[score], reverse=True)[:remainder]:
+        allocation[score] += 1
+    return allocation
+
+
+def draw_questions(key, count, stratify=False, rng=_random):
+    """
+    Случайные `count` id вопросов (строки) из ключа ответов, в случайном порядке.
+    stratify=True — доли вопросов с каждым max_score как в банке.
+    """
+    question_ids = list(key['types'])
+    count = min(count, len(question_ids))
+    if not stratify:
+        return rng.sample(question_ids, count)
+
+    strata = {}
+    for question_id in question_ids:
+        strata.setdefault(key['scores'][question_id], []).append(question_id)
+    drawn = []
+    for score, size in _allocate(strata, count).items():
+        drawn.extend(rng.sample(strata[score], size))
+    rng.shuffle(drawn)
+    return drawn
+
+
+def subset_key(key, question_ids):
+    """Ключ ответов (как в answer_keys.py), ограниченный вопросами попытки. Удалённые вопросы пропускаются."""
+    types = {question_id: key['types'][question_id] for question_id in question_ids if question_id in key['types']}
+    scores = {question_id: key['scores'][question_id] for question_id in types}
+    return {
+        'answers': {question_id: key['answers'][question_id] for question_id in types if question_id in key['answers']},
+        'types': types,
+        'scores': scores,
+        'max_score': sum(scores.values()),
+        'has_open_ended': 'open_ended' in types.values(),
+        'passing_score': key['passing_score'],
+    }
+
+
+def _valid(key, question_ids):
+    """Выпавшие вопросы без удалённых из банка после выборки."""
+    return [question_id for question_id in question_ids or () if question_id in key['types']]
+
+
+def attempt_key(test, key, question_ids):
+    """
+    Вопросы и ключ ответов для новой попытки: (question_ids, key).
+    question_ids — выборка из черновика; если её нет (тест не открывали), вопросы
+    вытягиваются сейчас. Для теста без выборки — (None, полный ключ).
+    """
+    if not test.samples_questions:
+        return None, key
+    question_ids = _valid(key, question_ids) or draw_questions(
+        key, test.questions_per_attempt, test.stratify_by_score
+    )
+    return question_ids, subset_key(key, question_ids)
+
+
+def drawn_questions(test, student):
+    """Выборка, уже сохранённая в черновике, без вытягивания новой (None — её ещё нет)."""
+    return TestDraft.objects.filter(student=student, test=test).values_list('question_ids', flat=True).first()
+
+
+def attempt_questions(test, student):
+    """
+    Id вопросов, которые ученик видит в текущей попытке (None — все вопросы теста).
+    Выборка вытягивается при первом открытии теста и сохраняется в черновике.
+    """
+    if not test.samples_questions:
+        return None
+    drafts = TestDraft.objects.filter(student=student, test=test)
+    stored = drafts.values_list('question_ids', flat=True).first()
+    if stored:
+        # Ключ ответов (сотни КБ на большом банке) здесь не нужен: удалённые после выборки
+        # вопросы просто не загрузятся из базы, а при отправке их отбросит attempt_key()
+        return stored
+
+    key = get_answer_key(test)
+    question_ids = draw_questions(key, test.questions_per_attempt, test.stratify_by_score)
+    # Черновик мог уже появиться (автосохранение) — дописываем выборку только в пустое поле,
+    # чтобы параллельный запрос из второй вкладки не заменил уже выданный набор
+    if drafts.filter(question_ids__isnull=True).update(question_ids=question_ids):
+        return question_ids
+    try:
+        with transaction.atomic():
+            TestDraft.objects.create(student=student, test=test, question_ids=question_ids)
+        return question_ids
+    except IntegrityError:
+        # Черновик с выборкой создал параллельный запрос — показываем его набор
+        return _valid(key, drafts.values_list('question_ids', flat=True).first()) or question_ids
@@ -0,0 +1,348 @@
+# eduplatform/core/sanitizer.py
+#
+# Очистка HTML из Summernote и подготовка урока к показу.
+# Раньше content/assignment уроков выводились как есть (|safe) на каждом открытии урока,
+# а video_url подставлялся прямо в src iframe. Теперь при сохранении урока (сигнал в signals.py)
+# HTML один раз очищается по белому списку тегов/атрибутов, нормализуется
+# (clean_summernote_content), картинкам и iframe добавляется loading="lazy", а ссылка на
+# YouTube/Vimeo превращается в адрес для встраивания. Результат лежит в полях
+# content_html / assignment_html / video_embed_url, шаблон выводит их без обработки.
+#
+# content_hash — sha256 от исходных полей и RENDER_VERSION: пока исходник не менялся,
+# повторное сохранение урока ничего не пересчитывает. Поменяли правила очистки — увеличьте
+# RENDER_VERSION и запустите `python manage.py render_lessons`.
+
+import hashlib
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, urlsplit
+
+RENDER_VERSION = 1
+
+# Исходные поля урока, из которых строится показ
+SOURCE_FIELDS = ('content', 'assignment', 'video_url')
+RENDERED_FIELDS = ('content_html', 'assignment_html', 'video_embed_url', 'content_hash')
+
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'caption', 'code', 'col', 'colgroup', 'div', 'em', 'font',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'iframe', 'img', 'li', 'ol', 'p', 'pre',
+    's', 'small', 'span', 'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot',
+    'th', 'thead', 'tr', 'u', 'ul',
+}
+VOID_TAGS = {'br', 'col', 'hr', 'img'}
+# Эти теги выбрасываются вместе с содержимым
+DROP_CONTENT_TAGS = {'script', 'style', 'noscript', 'template', 'object', 'embed', 'textarea', 'select', 'title'}
+
+GLOBAL_ATTRS = {'class', 'style', 'title', 'align', 'dir', 'lang'}
+TAG_ATTRS = {
+    'a': {'href', 'target', 'name'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'iframe': {'src', 'width', 'height', 'allow', 'allowfullscreen', 'frameborder'},
+    'table': {'border', 'cellpadding', 'cellspacing', 'width'},
+    'td': {'colspan', 'rowspan', 'width', 'valign'},
+    'th': {'colspan', 'rowspan', 'width', 'valign'},
+    'col': {'span', 'width'},
+    'colgroup': {'span', 'width'},
+    'font': {'color', 'face', 'size'},
+    'ol': {'start', 'type'},
+    'li': {'value'},
+}
+URL_ATTRS = {'href', 'src'}
+LINK_SCHEMES = {'http', 'https', 'mailto', 'tel'}
+IMAGE_SCHEMES = {'http', 'https'}
+# Summernote по умолчанию вставляет картинки как data:image/...;base64
+DATA_IMAGE_RE = re.compile(r'^data:image/(png|jpe?g|gif|webp);base64,', re.IGNORECASE)
+# Встраивать можно только видео с этих хостов (кнопка "Видео" в Summernote вставляет такие iframe)
+EMBED_HOSTS = {
+    'www.youtube.com', 'youtube.com', 'www.youtube-nocookie.com', 'youtube-nocookie.com',
+    'player.vimeo.com',
+}
+UNSAFE_STYLE_RE = re.compile(r'expression|javascript|vbscript|url\s*\(|@import|behavior|-moz-binding', re.IGNORECASE)
+
+
+def clean_summernote_content(html):
+    if not html:
+        return ''
+
+    # 1. Убираем <br> в пустых ячейках таблицы — НО ТОЛЬКО если ячейка РЕАЛЬНО пуста
+    # Было: удаляло <td><br></td> → плохо
+    # Стало: оставляем <br>, если ячейка иначе была бы пустой
+    html = re.sub(r'<(td|th)([^>]*)>\s*<br\s*/?>\s*</\1>', r'<\1\2><br></\1>', html)
+
+    # 2. Убираем полностью пустые теги <p>, <div>, <h1>-<h6>
+    html = re.sub(r'<(p|h[1-6]|div)([^>]*)>\s*</\1>', '', html)
+
+    # 3. Убираем пустые <br> в конце
+    html = html.strip()
+    html = re.sub(r'<br\s*/?>$', '', html, flags=re.IGNORECASE)
+
+    # 4. Убираем class="" у заголовков
+    html = re.sub(r'<(h[1-6]) class="">', r'<\1>', html)
+
+    return html.strip()
+
+
+def _url_scheme(value):
+    # Браузеры игнорируют пробелы и управляющие символы внутри схемы ("java\tscript:"),
+    # поэтому схему ищем в строке без них. Схема — только до первого '/', '?' или '#'
+    match = re.match(r'^([a-zA-Z][a-zA-Z0-9+.-]*):', re.sub(r'[\x00-\x20\x7f]+', '', value))
+    return match.group(1).lower() if match else None
+
+
+def _safe_url(tag, value):
+    url = (value or '').strip()
+    if not url:
+        return None
+    if tag == 'iframe':
+        return _embed_src(url)
+    scheme = _url_scheme(url)
+    if scheme is None:
+        return url
+    if tag == 'img':
+        if scheme in IMAGE_SCHEMES or DATA_IMAGE_RE.match(url.replace(' ', '')):
+            return url
+        return None
+    return url if scheme in LINK_SCHEMES else None
+
+
+def _embed_src(url):
+    if url.startswith('//'):
+        url = 'https:' + url
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or (parts.hostname or '') not in EMBED_HOSTS:
+        return None
+    return 'https://' + url.split('://', 1)[1]
+
+
+class _Sanitizer(HTMLParser):
+    """Пересобирает HTML только из разрешённых тегов и атрибутов, закрывая незакрытые теги."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open_tags = []
+        # Выбрасываемый вместе с содержимым тег и глубина вложенности таких же тегов
+        self.skip_tag = None
+        self.skip_depth = 0
+
+    def _skip(self, tag):
+        self.skip_tag = tag
+        self.skip_depth = 1
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_tag:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
+            return
+        if tag in DROP_CONTENT_TAGS:
+            self._skip(tag)
+            return
+        if tag not in ALLOWED_TAGS:
+            # Неизвестный тег убираем, текст внутри оставляем
+            return
+
+        cleaned = self._clean_attrs(tag, attrs)
+        if cleaned is None:
+            # iframe с чужого сайта — целиком; картинка без (безопасного) src — просто убираем
+            if tag not in VOID_TAGS:
+                self._skip(tag)
+            return
+        self.out.append(f"<{tag}{''.join(cleaned)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.skip_tag:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+                if not self.skip_depth:
+                    self.skip_tag = None
+            return
+        if tag not in self.open_tags:
+            return
+        # Закрываем и вложенные теги, которые автор забыл закрыть
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.out.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.skip_tag:
+            self.out.append(escape(data, quote=False))
+
+    # Комментарии, <!DOCTYPE> и <?...?> не нужны
+    def handle_comment(self, data):
+        pass
+
+    def handle_decl(self, decl):
+        pass
+
+    def handle_pi(self, data):
+        pass
+
+    def _clean_attrs(self, tag, attrs):
+        allowed = GLOBAL_ATTRS | TAG_ATTRS.get(tag, set())
+        result = {}
+        for name, value in attrs:
+            if name not in allowed or name in result:
+                continue
+            if name in URL_ATTRS:
+                value = _safe_url(tag, value)
+                if value is None:
+                    continue
+            elif name == 'style' and value and UNSAFE_STYLE_RE.search(value):
+                continue
+            elif value is not None and not value.strip() and name != 'alt':
+                # class="", style="" и т.п.
+                continue
+            result[name] = value
+
+        if tag == 'iframe':
+            if 'src' not in result:
+                return None
+            result['loading'] = 'lazy'
+        elif tag == 'img':
+            if 'src' not in result:
+                return None
+            result.setdefault('alt', '')
+            result['loading'] = 'lazy'
+            result['decoding'] = 'async'
+        elif tag == 'a' and result.get('target') == '_blank':
+            result['rel'] = 'noopener noreferrer'
+
+        return [
+            f' {name}' if value is None else f' {name}="{escape(value, quote=True)}"'
+            for name, value in result.items()
+        ]
+
+    def result(self):
+        self.close()
+        while self.open_tags:
+            self.out.append(f"</{self.open_tags.pop()}>")
+        return ''.join(self.out)
+
+
+def sanitize_html(html):
+    """HTML из редактора -> безопасный и нормализованный HTML для вывода через |safe."""
+    if not html:
+        return ''
+    parser = _Sanitizer()
+    parser.feed(html)
+    return clean_summernote_content(parser.result())
+
+
+YOUTUBE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'youtube-nocookie.com', 'www.youtube-nocookie.com'}
+VIMEO_HOSTS = {'vimeo.com', 'www.vimeo.com', 'player.vimeo.com'}
+
+
+def _start_seconds(value):
+    # t=90, t=90s, t=1m30s, t=1h2m3s
+    match = re.fullmatch(r'(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?', value or '')
+    if not match or not any(match.groups()):
+        return 0
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def video_embed_url(url):
+    """
+    Ссылка на видео YouTube/Vimeo (страница, короткая ссылка, shorts, embed) -> адрес для iframe.
+    Для остальных ссылок — '' (шаблон покажет обычную ссылку вместо встраивания).
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+    if url.startswith('//'):
+        url = 'https:' + url
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+        return ''
+    host = (parts.hostname or '').lower()
+    path = [segment for segment in parts.path.split('/') if segment]
+    query = parse_qs(parts.query)
+
+    if host in YOUTUBE_HOSTS or host == 'youtu.be':
+        if host == 'youtu.be':
+            video_id = path[0] if path else ''
+        elif path[:1] == ['watch']:
+            video_id = query.get('v', [''])[0]
+        elif len(path) >= 2 and path[0] in ('embed', 'shorts', 'live', 'v'):
+            video_id = path[1]
+        else:
+            video_id = ''
+        if not YOUTUBE_ID_RE.match(video_id):
+            return ''
+        start = _start_seconds(query.get('t', query.get('start', ['']))[0])
+        return f"https://www.youtube.com/embed/{video_id}" + (f"?start={start}" if start else '')
+
+    if host in VIMEO_HOSTS:
+        # vimeo.com/123, vimeo.com/123/<hash> (ссылка на закрытое видео),
+        # vimeo.com/channels/<имя>/123, player.vimeo.com/video/123
+        numbers = [index for index, segment in enumerate(path) if segment.isdigit()]
+        if not numbers:
+            return ''
+        video_id = path[numbers[0]]
+        private_hash = query.get('h', [''])[0]
+        if not private_hash and len(path) > numbers[0] + 1 and re.fullmatch(r'[0-9a-f]+', path[numbers[0] + 1]):
+            private_hash = path[numbers[0] + 1]
+        return f"https://player.vimeo.com/video/{video_id}" + (f"?h={private_hash}" if private_hash else '')
+
+    return ''
+
+
+def lesson_content_hash(content, assignment, video_url):
+    source = '\x00'.join((str(RENDER_VERSION), content or '', assignment or '', video_url or ''))
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def render_lesson(content, assignment, video_url):
+    """Поля показа урока (RENDERED_FIELDS) по исходным полям."""
+    return {
+        'content_html': sanitize_html(content),
+        'assignment_html': sanitize_html(assignment),
+        'video_embed_url': video_embed_url(video_url),
+        'content_hash': lesson_content_hash(content, assignment, video_url),
+    }
+
+
+def render_lesson_fields(lesson, force=False):
+    """
+    Пересчитывает поля показа у объекта урока (без сохранения).
+    Возвращает False, если исходник не менялся и пересчёт не нужен.
+    """
+    content_hash = lesson_content_hash(lesson.content, lesson.assignment, lesson.video_url)
+    if not force and lesson.content_hash == content_hash:
+        return False
+    for name, value in render_lesson(lesson.content, lesson.assignment, lesson.video_url).items():
+        setattr(lesson, name, value)
+    return True
+
+
+def render_lessons(queryset, force=False, batch_size=200):
+    """
+    Пересчитывает поля показа у уроков из queryset (бэкфилл; подходит и для исторической
+    модели в миграции). Сохраняет через bulk_update — сигналы и поиск не трогаются.
+    Возвращает число обновлённых уроков.
+    """
+    fields = ('pk',) + SOURCE_FIELDS + RENDERED_FIELDS
+    changed = []
+    updated = 0
+    for lesson in queryset.only(*fields).order_by('pk').iterator(chunk_size=batch_size):
+        if render_lesson_fields(lesson, force=force):
+            changed.append(lesson)
+        if len(changed) >= batch_size:
+            queryset.model.objects.bulk_update(changed, RENDERED_FIELDS)
+            updated += len(changed)
+            changed = []
+    if changed:
+        queryset.model.objects.bulk_update(changed, RENDERED_FIELDS)
+        updated += len(changed)
+    return updated
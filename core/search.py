@@ -0,0 +1,173 @@
+# eduplatform/core/search.py
+#
+# Полнотекстовый поиск по урокам (название, содержание, цель, задание) и вопросам тестов.
+# Документы лежат в SearchDocument уже без HTML. Сам индекс зависит от базы:
+#   SQLite     — виртуальная таблица FTS5 над столбцом `stems` (основы слов из russian_stemmer),
+#                синхронизируется триггерами (миграция 0015);
+#   PostgreSQL — генерируемый столбец tsvector ('russian') с GIN-индексом, стемминг делает сама база.
+# Остальные базы — запасной вариант через LIKE по основам.
+# Документы обновляются сигналами при сохранении урока/вопроса/теста, удаляются каскадом.
+# Миграция 0015 индекс не заполняет: после неё (и после смены стеммера) существующие уроки
+# и вопросы индексируются командой `python manage.py rebuild_search_index`.
+
+import html
+import re
+
+from django.db import connection
+from django.utils.html import strip_tags
+
+from .models import Lesson, SearchDocument, TestQuestion
+from .russian_stemmer import WORD_RE, stem, stem_text, tokenize
+
+FTS_TABLE = 'core_searchdocument_fts'
+MAX_MATCHES = 1000   # сколько лучших совпадений берём из индекса до фильтрации в ORM
+SNIPPET_CHARS = 160
+
+
+def html_to_text(value):
+    """HTML из Summernote -> простой текст: без тегов и сущностей, пробелы схлопнуты."""
+    text = html.unescape(strip_tags(value or ''))
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _document_fields(title, body):
+    return {'title': title[:255], 'body': body, 'stems': stem_text(f"{title} {body}")}
+
+
+def _lesson_body(lesson):
+    return ' '.join(filter(None, (
+        html_to_text(lesson.goal_lesson),
+        html_to_text(lesson.content),
+        html_to_text(lesson.assignment),
+    )))
+
+
+def index_lesson(lesson):
+    SearchDocument.objects.update_or_create(
+        lesson=lesson,
+        defaults={'kind': SearchDocument.KIND_LESSON, **_document_fields(lesson.title, _lesson_body(lesson))},
+    )
+
+
+def index_question(question, test_title=None):
+    if test_title is None:
+        test_title = question.test.title
+    SearchDocument.objects.update_or_create(
+        question=question,
+        defaults={
+            'kind': SearchDocument.KIND_QUESTION,
+            **_document_fields(test_title, html_to_text(question.text)),
+        },
+    )
+
+
+def index_new_lessons(lessons, batch_size=500):
+    """Документы для только что созданных уроков одним bulk_create (клонирование курса — без сигналов)."""
+    SearchDocument.objects.bulk_create([
+        SearchDocument(
+            kind=SearchDocument.KIND_LESSON, lesson_id=lesson.pk,
+            **_document_fields(lesson.title, _lesson_body(lesson)),
+        )
+        for lesson in lessons
+    ], batch_size=batch_size)
+
+
+def index_new_questions(questions, test_titles, batch_size=500):
+    """
+    Документы для только что созданных вопросов одним bulk_create (импорт, клонирование — без сигналов).
+    test_titles — {id теста: название}.
+    """
+    SearchDocument.objects.bulk_create([
+        SearchDocument(
+            kind=SearchDocument.KIND_QUESTION, question_id=question.pk,
+            **_document_fields(test_titles[question.test_id], html_to_text(question.text)),
+        )
+        for question in questions
+    ], batch_size=batch_size)
+
+
+def index_test_questions(test):
+    """Название теста входит в документы его вопросов — переиндексируем их при изменении теста."""
+    for question in test.questions.only('id', 'text'):
+        index_question(question, test_title=test.title)
+
+
+def rebuild_index(batch_size=500):
+    """Полная перестройка индекса. Возвращает число документов."""
+    SearchDocument.objects.all().delete()
+    documents = []
+    for lesson in Lesson.objects.only('id', 'title', 'content', 'goal_lesson', 'assignment').iterator(chunk_size=batch_size):
+        documents.append(SearchDocument(
+            kind=SearchDocument.KIND_LESSON, lesson_id=lesson.id,
+            **_document_fields(lesson.title, _lesson_body(lesson)),
+        ))
+    questions = TestQuestion.objects.select_related('test').only('id', 'text', 'test__title')
+    for question in questions.iterator(chunk_size=batch_size):
+        documents.append(SearchDocument(
+            kind=SearchDocument.KIND_QUESTION, question_id=question.id,
+            **_document_fields(question.test.title, html_to_text(question.text)),
+        ))
+    SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+    return len(documents)
+
+
+def _ranked_ids(query):
+    """Список (id документа, ранг) — лучшие совпадения первыми."""
+    words = tokenize(query)
+    if not words:
+        return []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # Каждое слово — префикс основы, все слова обязательны (неявный AND в FTS5)
+            match = ' '.join(f'"{stem(word)}"*' for word in words)
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s ORDER BY bm25({FTS_TABLE}) LIMIT %s",
+                [match, MAX_MATCHES],
+            )
+            return cursor.fetchall()
+        if connection.vendor == 'postgresql':
+            # Слова берутся из \w+, поэтому в синтаксис to_tsquery ничего лишнего не попадёт
+            tsquery = ' & '.join(f"{word}:*" for word in words)
+            cursor.execute(
+                "SELECT id, ts_rank(search_vector, query) AS rank "
+                "FROM core_searchdocument, to_tsquery('russian', %s) AS query "
+                "WHERE search_vector @@ query ORDER BY rank DESC LIMIT %s",
+                [tsquery, MAX_MATCHES],
+            )
+            return cursor.fetchall()
+    queryset = SearchDocument.objects.all()
+    for word in words:
+        queryset = queryset.filter(stems__contains=stem(word))
+    return [(pk, 0) for pk in queryset.values_list('id', flat=True)[:MAX_MATCHES]]
+
+
+def search_documents(query, queryset=None, limit=20):
+    """
+    Документы, подходящие под запрос, в порядке релевантности.
+    queryset — дополнительные ограничения (например, только уроки).
+    """
+    ranked = _ranked_ids(query)
+    if not ranked:
+        return []
+    order = {pk: position for position, (pk, _) in enumerate(ranked)}
+    if queryset is None:
+        queryset = SearchDocument.objects.all()
+    documents = list(queryset.filter(pk__in=order.keys()).select_related('question__test'))
+    documents.sort(key=lambda document: order[document.pk])
+    return documents[:limit] if limit else documents
+
+
+def snippet(document, query, length=SNIPPET_CHARS):
+    """Фрагмент текста вокруг первого слова, совпавшего с запросом."""
+    stems = [stem(word) for word in tokenize(query)]
+    body = document.body
+    start = 0
+    for match in WORD_RE.finditer(body):
+        if any(stem(match.group()).startswith(s) for s in stems):
+            start = max(0, match.start() - length // 3)
+            break
+    fragment = body[start:start + length]
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + length < len(body) else ''
+    return f"{prefix}{fragment}{suffix}"
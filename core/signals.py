@@ -0,0 +1,368 @@
+# eduplatform/core/signals.py
+#
+# Сигналы, которые поддерживают денормализованные данные в актуальном состоянии.
+# Подключаются в CoreConfig.ready().
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .answer_keys import invalidate_answer_key
+from .backends import invalidate_cached_user
+from .content_versions import bump_course_version
+from .models import (
+    Lesson, Module, ModuleProgress, Progress, Resource, Test, TestQuestion, TestResultSummary, TestSubmission,
+    User, UserSearchTerm,
+)
+from .sanitizer import RENDERED_FIELDS, SOURCE_FIELDS, render_lesson_fields
+from .permissions import invalidate_editable_modules
+from .search import index_lesson, index_question, index_test_questions
+from .images import IMAGE_FIELDS, enqueue_derivatives, variants_field
+
+
+# --- СВОДКИ ПРОГРЕССА ПО МОДУЛЯМ (ModuleProgress) ---
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_module(sender, instance, raw=False, **kwargs):
+    # Запоминаем старый модуль, чтобы заметить перенос урока в другой модуль
+    if raw or instance._state.adding:
+        instance._previous_module_id = None
+        return
+    instance._previous_module_id = (
+        Lesson.objects.filter(pk=instance.pk).values_list('module_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Lesson)
+def adjust_module_totals_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        ModuleProgress.objects.filter(module_id=instance.module_id).update(
+            total_lessons=F('total_lessons') + 1
+        )
+        return
+
+    previous_module_id = getattr(instance, '_previous_module_id', None)
+    if previous_module_id and previous_module_id != instance.module_id:
+        ModuleProgress.rebuild(modules=[previous_module_id, instance.module_id])
+
+
+@receiver(pre_delete, sender=Lesson)
+def adjust_module_totals_on_delete(sender, instance, **kwargs):
+    # pre_delete: строки Progress этого урока ещё не удалены каскадом
+    passed_students = Progress.objects.filter(
+        lesson_id=instance.pk, passed=True
+    ).values('student_id')
+
+    ModuleProgress.objects.filter(
+        module_id=instance.module_id, student_id__in=passed_students
+    ).update(completed_lessons=F('completed_lessons') - 1)
+
+    ModuleProgress.objects.filter(module_id=instance.module_id).update(
+        total_lessons=F('total_lessons') - 1
+    )
+
+
+# complete_lesson меняет Progress через update() и сам вызывает record_completion — сигналов нет.
+# Остальные изменения (админка, save(), queryset.delete(), каскады) пересчитывают затронутые
+# пары (ученик, модуль) через ModuleProgress.refresh. Массовое удаление — внутри
+# deferred_module_progress_refresh(), тогда пересчёт один на весь блок.
+
+_deferred_progress_pairs = ContextVar('deferred_progress_pairs', default=None)
+
+
+@contextmanager
+def deferred_module_progress_refresh():
+    """Сводки по модулям для Progress, изменённых внутри блока, пересчитываются один раз в конце."""
+    if _deferred_progress_pairs.get() is not None:
+        yield
+        return
+    pairs = set()
+    token = _deferred_progress_pairs.set(pairs)
+    try:
+        yield
+    finally:
+        _deferred_progress_pairs.reset(token)
+    ModuleProgress.refresh(pairs)
+
+
+def _refresh_module_progress(pairs):
+    deferred = _deferred_progress_pairs.get()
+    if deferred is not None:
+        deferred.update(pairs)
+    else:
+        ModuleProgress.refresh(pairs)
+
+
+def _module_id_for_lesson(lesson_id):
+    return Lesson.objects.filter(pk=lesson_id).values_list('module_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Progress)
+def remember_progress_state(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._previous_progress = None
+        return
+    instance._previous_progress = Progress.objects.filter(pk=instance.pk).values_list(
+        'student_id', 'lesson_id', 'lesson__module_id', 'passed'
+    ).first()
+
+
+@receiver(post_save, sender=Progress)
+def refresh_module_progress_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_progress', None)
+    if created or previous is None:
+        # Новая строка без отметки (aget_or_create во views) сводку не меняет
+        if instance.passed:
+            _refresh_module_progress({(instance.student_id, _module_id_for_lesson(instance.lesson_id))})
+        return
+    student_id, lesson_id, module_id, passed = previous
+    if (student_id, lesson_id, passed) == (instance.student_id, instance.lesson_id, instance.passed):
+        return
+    current_module_id = module_id if lesson_id == instance.lesson_id else _module_id_for_lesson(instance.lesson_id)
+    _refresh_module_progress({(student_id, module_id), (instance.student_id, current_module_id)})
+
+
+@receiver(post_delete, sender=Progress)
+def refresh_module_progress_on_delete(sender, instance, **kwargs):
+    if not instance.passed:
+        return
+    # При удалении урока каскадом строка урока ещё на месте (Progress удаляется раньше)
+    module_id = _module_id_for_lesson(instance.lesson_id)
+    if module_id is not None:
+        _refresh_module_progress({(instance.student_id, module_id)})
+
+
+# --- ГОТОВЫЙ HTML УРОКА (sanitizer.py) ---
+
+@receiver(pre_save, sender=Lesson)
+def render_lesson_html(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Пересчёт только если изменились content/assignment/video_url (сверяем content_hash)
+    instance._rendered_changed = False
+    if raw or (update_fields is not None and not set(update_fields) & set(SOURCE_FIELDS)):
+        return
+    instance._rendered_changed = render_lesson_fields(instance)
+
+
+@receiver(post_save, sender=Lesson)
+def save_rendered_lesson_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    # save(update_fields=['content']) не запишет пересчитанные поля — дописываем их сами
+    if raw or update_fields is None or not getattr(instance, '_rendered_changed', False):
+        return
+    if not set(RENDERED_FIELDS) <= set(update_fields):
+        Lesson.objects.filter(pk=instance.pk).update(
+            **{name: getattr(instance, name) for name in RENDERED_FIELDS}
+        )
+
+
+# --- КЛЮЧ ОТВЕТОВ ТЕСТА (answer_keys.py) ---
+
+@receiver(post_save, sender=TestQuestion)
+@receiver(post_delete, sender=TestQuestion)
+def reset_answer_key_on_question_change(sender, instance, **kwargs):
+    invalidate_answer_key(instance.test_id)
+
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+def reset_answer_key_on_test_change(sender, instance, **kwargs):
+    # В ключе хранится passing_score, поэтому сбрасываем его при любом сохранении теста
+    invalidate_answer_key(instance.pk)
+
+
+# --- ВЕРСИЯ СОДЕРЖИМОГО КУРСА (content_versions.py) ---
+
+def _course_id_for_module(module_id):
+    return Module.objects.filter(pk=module_id).values_list('course_id', flat=True).first()
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def bump_version_on_module_change(sender, instance, **kwargs):
+    bump_course_version(instance.course_id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+def bump_version_on_module_content_change(sender, instance, **kwargs):
+    bump_course_version(_course_id_for_module(instance.module_id))
+
+    # Урок перенесли в модуль другого курса — старый курс тоже изменился
+    previous_module_id = getattr(instance, '_previous_module_id', None)
+    if previous_module_id and previous_module_id != instance.module_id:
+        bump_course_version(_course_id_for_module(previous_module_id))
+
+
+# Вопросы теста и материалы урока видны во фрагментах теста/урока, которые браузер
+# кэширует по версии курса (etags.py)
+
+@receiver(post_save, sender=TestQuestion)
+@receiver(post_delete, sender=TestQuestion)
+def bump_version_on_question_change(sender, instance, **kwargs):
+    bump_course_version(
+        Test.objects.filter(pk=instance.test_id).values_list('module__course_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+def bump_version_on_resource_change(sender, instance, **kwargs):
+    if instance.lesson_id:
+        bump_course_version(
+            Lesson.objects.filter(pk=instance.lesson_id).values_list('module__course_id', flat=True).first()
+        )
+
+
+# --- ЖУРНАЛ ОЦЕНОК (TestResultSummary) ---
+# Уроки журнал берёт из ModuleProgress (см. выше), здесь — сводки по тестам.
+# Массовая проверка (TestSubmission.finalize_graded) идёт через update() и обновляет сводки сама.
+# Массовое удаление попыток — внутри deferred_summary_refresh(): пары копятся и пересчитываются
+# одним TestResultSummary.refresh(pairs) вместо пересчёта на каждую удалённую попытку.
+# Одиночная попытка пересчитывается после коммита (on_commit): запросы сводки не удлиняют
+# транзакцию отправки теста (TestSubmission.submit), которая держит блокировку на запись.
+
+_deferred_summary_pairs = ContextVar('deferred_summary_pairs', default=None)
+
+
+@contextmanager
+def deferred_summary_refresh():
+    """Сводки по попыткам, сохранённым или удалённым внутри блока, пересчитываются один раз в конце."""
+    if _deferred_summary_pairs.get() is not None:
+        yield
+        return
+    pairs = set()
+    token = _deferred_summary_pairs.set(pairs)
+    try:
+        yield
+    finally:
+        _deferred_summary_pairs.reset(token)
+    TestResultSummary.refresh(pairs)
+
+
+@receiver(post_save, sender=TestSubmission)
+@receiver(post_delete, sender=TestSubmission)
+def refresh_test_result_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pairs = _deferred_summary_pairs.get()
+    if pairs is not None:
+        pairs.add((instance.student_id, instance.test_id))
+    else:
+        pair = (instance.student_id, instance.test_id)
+        transaction.on_commit(lambda: TestResultSummary.refresh([pair]))
+
+
+@receiver(post_save, sender=Test)
+def move_test_results(sender, instance, created, raw=False, **kwargs):
+    # Тест перенесли в модуль другого курса — журнал старого курса его больше не показывает
+    if raw or created:
+        return
+    course_id = _course_id_for_module(instance.module_id)
+    TestResultSummary.objects.filter(test=instance).exclude(course_id=course_id).update(course_id=course_id)
+
+
+@receiver(post_save, sender=Module)
+def move_module_test_results(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    TestResultSummary.objects.filter(test__module=instance).exclude(
+        course_id=instance.course_id
+    ).update(course_id=instance.course_id)
+
+
+# --- КЭШ ПОЛЬЗОВАТЕЛЯ ДЛЯ request.user (backends.py) ---
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_cached_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+# --- ПРАВА УЧИТЕЛЕЙ НА МОДУЛИ (permissions.py) ---
+
+@receiver(m2m_changed, sender=Module.teachers.through)
+def reset_editable_modules(sender, instance, action, reverse, pk_set, **kwargs):
+    # clear() не передаёт pk_set — учителей берём до очистки (pre_clear)
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # user.taught_modules.add(...)
+        invalidate_editable_modules([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_editable_modules(instance.teachers.values_list('pk', flat=True))
+    else:
+        invalidate_editable_modules(pk_set)
+
+
+# --- ПРЕФИКСНЫЙ ПОИСК УЧЕНИКОВ (UserSearchTerm) ---
+
+@receiver(post_save, sender=User)
+def refresh_user_search_terms(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Например, вход в систему сохраняет только last_login — термины не меняются
+    if raw or (update_fields and not set(update_fields) & set(UserSearchTerm.SOURCE_FIELDS)):
+        return
+    UserSearchTerm.refresh_for(instance)
+
+
+# --- ПОЛНОТЕКСТОВЫЙ ПОИСК (search.py) ---
+# Удалять документы не нужно: SearchDocument удаляется каскадом вместе с уроком/вопросом
+
+@receiver(post_save, sender=Lesson)
+def index_lesson_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_lesson(instance)
+
+
+@receiver(post_save, sender=TestQuestion)
+def index_question_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_question(instance)
+
+
+@receiver(post_save, sender=Test)
+def index_test_questions_on_save(sender, instance, created, raw=False, **kwargs):
+    # Название теста входит в документы вопросов; у нового теста вопросов ещё нет
+    if not raw and not created:
+        index_test_questions(instance)
+
+
+# --- ПРОИЗВОДНЫЕ ИЗОБРАЖЕНИЙ (images.py) ---
+
+def detect_new_images(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Новый загруженный файл ещё не сохранён в хранилище (_committed=False) — это видно
+    # без запроса к базе. Старые размеры сбрасываем сразу, чтобы шаблон показал оригинал
+    instance._pending_image_fields = []
+    if raw:
+        return
+    for field_name in IMAGE_FIELDS[sender]:
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        field_file = getattr(instance, field_name)
+        variants = getattr(instance, variants_field(field_name)) or {}
+        uploaded = bool(field_file) and not field_file._committed
+        # Файл убрали или подменили именем (не загрузкой) — размеры от старого файла не годятся
+        stale = bool(variants) and variants.get('name') != field_file.name
+        if uploaded or stale:
+            setattr(instance, variants_field(field_name), {})
+            if field_file:
+                instance._pending_image_fields.append(field_name)
+
+
+def schedule_image_derivatives(sender, instance, raw=False, **kwargs):
+    for field_name in getattr(instance, '_pending_image_fields', ()):
+        enqueue_derivatives(instance, field_name)
+    instance._pending_image_fields = []
+
+
+for image_model in IMAGE_FIELDS:
+    pre_save.connect(detect_new_images, sender=image_model, dispatch_uid=f'detect_new_images_{image_model.__name__}')
+    post_save.connect(schedule_image_derivatives, sender=image_model, dispatch_uid=f'schedule_image_derivatives_{image_model.__name__}')
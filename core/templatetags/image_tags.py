@@ -0,0 +1,46 @@
+from django import template
+
+from ..images import FORMATS, current_variants, derivative_name
+
+register = template.Library()
+
+
+@register.inclusion_tag('core/partials/_responsive_image.html')
+def responsive_image(field_file, alt='', sizes='100vw', css_class='', base_url=''):
+    """
+    <picture> с srcset из производных (WebP + JPEG), а пока их нет — просто оригинал.
+    base_url — адрес оригинала, если файл отдаётся через защищённый endpoint
+    (тогда производные запрашиваются как base_url?variant=640w.webp).
+
+        {% load image_tags %}
+        {% responsive_image card.photo alt=card.name sizes="(max-width: 768px) 100vw, 320px" %}
+    """
+    context = {'alt': alt, 'sizes': sizes, 'css_class': css_class, 'src': '', 'sources': [], 'fallback_srcset': ''}
+    if not field_file:
+        return context
+
+    context['src'] = base_url or field_file.url
+    variants = current_variants(field_file)
+    if not variants:
+        return context
+
+    srcsets = {}
+    for ext, _, _ in FORMATS:
+        candidates = []
+        for width in variants['widths']:
+            if base_url:
+                url = f"{base_url}?variant={width}w.{ext}"
+            else:
+                url = field_file.storage.url(derivative_name(field_file.name, width, ext))
+            candidates.append(f"{url} {width}w")
+        srcsets[ext] = ', '.join(candidates)
+
+    context['sources'] = [{'type': 'image/webp', 'srcset': srcsets['webp']}]
+    context['fallback_srcset'] = srcsets['jpg']
+    # Самая крупная JPEG-производная вместо оригинала — для браузеров без srcset
+    largest = variants['widths'][-1]
+    context['src'] = (
+        f"{base_url}?variant={largest}w.jpg" if base_url
+        else field_file.storage.url(derivative_name(field_file.name, largest, 'jpg'))
+    )
+    return context
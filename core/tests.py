@@ -1,3 +1,423 @@
-    from django.test import TestCase
+import importlib
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, clear_url_caches, resolve, reverse
+
+from .backends import CachedModelBackend
+from .checks import check_shared_cache
+from .db_router import PIN_COOKIE, REPLICA, PrimaryPinMiddleware, ReplicaRouter, use_replica
+from .grading import grade_submission
+from .models import (
+    Course, Lesson, Module, ModuleProgress, Progress, Test, TestAnswer, TestQuestion, TestResultSummary,
+    TestDraft, TestSubmission, User,
+)
+from .question_import import import_questions
+
+
+def make_course():
+    """Курс с модулем из двух уроков и тестом (три вопроса 'choice' по 1-3 балла)."""
+    course = Course.objects.create(title="Курс", published=True)
+    module = Module.objects.create(course=course, title="Модуль 1")
+    lessons = [Lesson.objects.create(module=module, title=f"Урок {i + 1}") for i in range(2)]
+    test = Test.objects.create(module=module, title="Тест", passing_score=60)
+    questions = [
+        TestQuestion.objects.create(
+            test=test, text=f"Вопрос {i + 1}", question_type='choice',
+            option_a="Да", option_b="Нет", correct_answer="Да", max_score=i + 1,
+        )
+        for i in range(3)
+    ]
+    return course, module, lessons, test, questions
+
+
+def complete(student, lesson):
+    """Отмечает урок пройденным так же, как complete_lesson: update() без сигналов + record_completion."""
+    progress = Progress.objects.create(student=student, lesson=lesson)
+    Progress.objects.filter(pk=progress.pk).update(passed=True)
+    ModuleProgress.record_completion(student, lesson)
+
+
+# --- Сводки прогресса по модулям (ModuleProgress) ---
+
+class ModuleProgressTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.course, self.module, self.lessons, self.test, _ = make_course()
+        self.student = User.objects.create_user('student', password='pw')
+
+    def summary(self, module=None):
+        return ModuleProgress.objects.get(student=self.student, module=module or self.module)
+
+    def test_counts_completed_lessons(self):
+        self.assertFalse(ModuleProgress.is_module_complete(self.student, self.module))
+        complete(self.student, self.lessons[0])
+        self.assertEqual((self.summary().completed_lessons, self.summary().total_lessons), (1, 2))
+        complete(self.student, self.lessons[1])
+        self.assertTrue(ModuleProgress.is_module_complete(self.student, self.module))
+
+    def test_new_lesson_reopens_module(self):
+        for lesson in self.lessons:
+            complete(self.student, lesson)
+        Lesson.objects.create(module=self.module, title="Урок 3")
+        self.assertEqual(self.summary().total_lessons, 3)
+        self.assertFalse(ModuleProgress.is_module_complete(self.student, self.module))
+
+    def test_deleting_passed_lesson(self):
+        complete(self.student, self.lessons[0])
+        self.lessons[0].delete()
+        self.assertEqual((self.summary().completed_lessons, self.summary().total_lessons), (0, 1))
+
+    def test_moving_lesson_to_another_module(self):
+        other = Module.objects.create(course=self.course, title="Модуль 2")
+        for lesson in self.lessons:
+            complete(self.student, lesson)
+        lesson = self.lessons[1]
+        lesson.module = other
+        lesson.save()
+        self.assertEqual((self.summary().completed_lessons, self.summary().total_lessons), (1, 1))
+        self.assertEqual((self.summary(other).completed_lessons, self.summary(other).total_lessons), (1, 1))
+
+    def test_rebuild_matches_incremental_counters(self):
+        complete(self.student, self.lessons[0])
+        expected = list(ModuleProgress.objects.values_list('student_id', 'module_id', 'completed_lessons', 'total_lessons'))
+        ModuleProgress.objects.all().delete()
+        ModuleProgress.rebuild()
+        self.assertEqual(
+            list(ModuleProgress.objects.values_list('student_id', 'module_id', 'completed_lessons', 'total_lessons')),
+            expected,
+        )
+
+    def test_progress_edits_outside_complete_lesson(self):
+        # Как в админке: отметка через save(), снятие отметки, удаление queryset'ом
+        progress = Progress.objects.create(student=self.student, lesson=self.lessons[0], passed=True)
+        Progress.objects.create(student=self.student, lesson=self.lessons[1], passed=True)
+        self.assertTrue(ModuleProgress.is_module_complete(self.student, self.module))
+        progress.passed = False
+        progress.save()
+        self.assertEqual((self.summary().completed_lessons, self.summary().total_lessons), (1, 2))
+        Progress.objects.filter(student=self.student).delete()
+        self.assertEqual((self.summary().completed_lessons, self.summary().total_lessons), (0, 2))
+
+    def test_unchanged_save_skips_refresh(self):
+        complete(self.student, self.lessons[0])
+        progress = Progress.objects.get(student=self.student, lesson=self.lessons[0])
+        with self.assertNumQueries(2):  # SELECT прежнего состояния + UPDATE
+            progress.save()
+
+    def test_migration_backfills_from_progress(self):
+        Progress.objects.create(student=self.student, lesson=self.lessons[0], passed=True)
+        ModuleProgress.objects.all().delete()
+        migration = importlib.import_module('core.migrations.0012_moduleprogress')
+        migration.fill_module_progress(apps, None)
+        self.assertEqual((self.summary().completed_lessons, self.summary().total_lessons), (1, 2))
+
+
+# --- Оценивание в памяти по ключу ответов (answer_keys.py) ---
+
+class GradingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, _, _, self.test, self.questions = make_course()
+        self.student = User.objects.create_user('student', password='pw')
+
+    def baseline_score(self, submission):
+        """Итог так, как его считала прежняя auto_grade(): ответ за ответом по вопросам из базы."""
+        total = 0
+        for answer in submission.answers.select_related('question'):
+            question = answer.question
+            if question.question_type == 'choice':
+                if (answer.answer_text or '').strip().lower() == (question.correct_answer or '').strip().lower():
+                    total += question.max_score
+        max_score = sum(question.max_score for question in self.test.questions.all())
+        score = total / max_score * 100 if max_score else 0
+        return score, score >= self.test.passing_score
+
+    def answers(self, *texts):
+        return {str(question.pk): text for question, text in zip(self.questions, texts)}
+
+    def test_submit_matches_baseline(self):
+        for texts in (('Да', 'Да', 'Да'), (' да ', 'Нет', 'Да'), ('Нет', 'Да', ''), ('', '', '')):
+            submission = TestSubmission.submit(self.test, self.student, self.answers(*texts))
+            self.assertEqual(submission.status, TestSubmission.STATUS_GRADED)
+            self.assertEqual((submission.score, submission.passed), self.baseline_score(submission))
+
+    def test_background_grading_matches_submit(self):
+        answers = self.answers('Да', 'Нет', 'Да')
+        graded = TestSubmission.submit(self.test, self.student, answers)
+        queued = TestSubmission.enqueue(self.test, self.student, answers)
+        grade_submission({'submission_id': str(queued.pk)})
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.score, queued.passed), (graded.status, graded.score, graded.passed))
+        self.assertEqual(
+            sorted(TestAnswer.objects.filter(submission=queued).values_list('score', flat=True)),
+            sorted(TestAnswer.objects.filter(submission=graded).values_list('score', flat=True)),
+        )
+
+    def test_gradebook_summary_refreshed_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            TestSubmission.submit(self.test, self.student, self.answers('Да', 'Да', 'Да'))
+            self.assertFalse(TestResultSummary.objects.exists())
+        for callback in callbacks:
+            callback()
+        summary = TestResultSummary.objects.get(student=self.student, test=self.test)
+        self.assertEqual((summary.attempts, summary.best_score, summary.passed), (1, 100, True))
+
+    def test_open_ended_goes_to_review(self):
+        TestQuestion.objects.create(test=self.test, text="Эссе", question_type='open_ended', max_score=4)
+        submission = TestSubmission.submit(self.test, self.student, self.answers('Да', 'Да', 'Да'))
+        self.assertEqual(submission.status, TestSubmission.STATUS_PENDING)
+
+    def test_answer_key_follows_question_changes(self):
+        TestSubmission.submit(self.test, self.student, {})
+        question = self.questions[0]
+        question.correct_answer = 'Нет'
+        question.save()
+        submission = TestSubmission.submit(self.test, self.student, self.answers('Нет', 'Да', 'Да'))
+        self.assertEqual((submission.score, submission.passed), self.baseline_score(submission))
+        self.assertEqual(submission.score, 100)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+    def test_default_cache_must_be_shared(self):
+        with override_settings(CACHES={'default': self.LOCMEM, 'sessions': self.LOCMEM}):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['core.E001', 'core.E001'])
+        with override_settings(CACHES={'default': self.LOCMEM},
+                               SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.assertEqual(len(check_shared_cache(None)), 1)
+        self.assertEqual(check_shared_cache(None), [])
+
+
+# --- Файлы без проверки доступа (eduplatform/urls.py) ---
+
+class DebugMediaUrlTests(SimpleTestCase):
+    def test_only_public_media_served(self):
+        with override_settings(DEBUG=True):
+            urls = importlib.reload(importlib.import_module('eduplatform.urls'))
+        try:
+            self.assertEqual(resolve('/media/course_covers/a.jpg', urls).kwargs['path'], 'a.jpg')
+            for path in ('/media/lesson_pdfs/a.pdf', '/media/resources/a.zip', '/media/../db.sqlite3'):
+                with self.assertRaises(Resolver404):
+                    resolve(path, urls)
+        finally:
+            importlib.reload(urls)
+            clear_url_caches()
+
+
+# --- Маршрутизация на реплику (db_router.py) ---
+
+@mock.patch('core.db_router.replica_configured', return_value=True)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(self, request, write=False):
+        """Куда пойдёт чтение внутри view с @use_replica, пропущенной через PrimaryPinMiddleware."""
+        @use_replica
+        def view(request):
+            if write:
+                self.router.db_for_write(User)
+            request.read_db = self.router.db_for_read(User)
+            return mock.Mock(set_cookie=mock.Mock())
+
+        response = PrimaryPinMiddleware(view)(request)
+        return request.read_db, response
+
+    def test_reads_outside_use_replica_go_to_primary(self, _):
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_get_reads_from_replica(self, _):
+        db, response = self.route(self.factory.get('/'))
+        self.assertEqual(db, REPLICA)
+        response.set_cookie.assert_not_called()
+
+    def test_post_reads_from_primary_and_pins(self, _):
+        db, response = self.route(self.factory.post('/'))
+        self.assertIsNone(db)
+        self.assertEqual(response.set_cookie.call_args.args[0], PIN_COOKIE)
+
+    def test_reads_after_write_go_to_primary(self, _):
+        db, _response = self.route(self.factory.get('/'), write=True)
+        self.assertIsNone(db)
+
+    def test_pinned_browser_reads_from_primary(self, _):
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        db, _response = self.route(request)
+        self.assertIsNone(db)
+
+    def test_writes_always_go_to_primary(self, _):
+        self.assertEqual(self.router.db_for_write(User), 'default')
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'core'))
+
+
+# --- Условные GET фрагментов урока и теста (etags.py) ---
+
+class ConditionalPartialTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, self.module, self.lessons, self.test, _ = make_course()
+        self.student = User.objects.create_user('student', password='pw')
+        self.client.force_login(self.student)
+
+    def test_unchanged_lesson_returns_304(self):
+        url = reverse('core:new_lesson_detail', args=[self.lessons[0].pk])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(Progress.objects.filter(student=self.student, lesson=self.lessons[0]).exists())
+        self.assertEqual(self.client.get(url)['ETag'], first['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_304_still_creates_progress(self):
+        url = reverse('core:new_lesson_detail', args=[self.lessons[0].pk])
+        etag = self.client.get(url)['ETag']
+        Progress.objects.filter(student=self.student).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertTrue(Progress.objects.filter(student=self.student, lesson=self.lessons[0]).exists())
+
+    def test_lesson_change_invalidates_etag(self):
+        url = reverse('core:new_lesson_detail', args=[self.lessons[0].pk])
+        etag = self.client.get(url)['ETag']
+        self.lessons[0].title = "Новое название"
+        self.lessons[0].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unlocking_test_invalidates_etag(self):
+        url = reverse('core:new_test_detail', args=[self.module.pk])
+        locked = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=locked['ETag']).status_code, 304)
+        for lesson in self.lessons:
+            complete(self.student, lesson)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=locked['ETag']).status_code, 200)
+
+    def test_prefetch_has_no_side_effects(self):
+        lesson_url = reverse('core:new_lesson_detail', args=[self.lessons[0].pk])
+        prefetched = self.client.get(lesson_url, HTTP_SEC_PURPOSE='prefetch')
+        self.assertEqual(prefetched.status_code, 200)
+        self.assertFalse(Progress.objects.filter(student=self.student).exists())
+        # Настоящее открытие из кэша браузера: 304, но строка прогресса создаётся
+        self.assertEqual(self.client.get(lesson_url, HTTP_IF_NONE_MATCH=prefetched['ETag']).status_code, 304)
+        self.assertTrue(Progress.objects.filter(student=self.student, lesson=self.lessons[0]).exists())
+
+        for lesson in self.lessons[1:]:
+            complete(self.student, lesson)
+        Progress.objects.filter(student=self.student).update(passed=True)
+        ModuleProgress.rebuild()
+        self.test.questions_per_attempt = 2
+        self.test.save()
+        test_url = reverse('core:new_test_detail', args=[self.module.pk])
+        response = self.client.get(test_url, HTTP_SEC_PURPOSE='prefetch')
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(TestDraft.objects.exists())
+        self.assertEqual(self.client.get(test_url).status_code, 200)
+        self.assertTrue(TestDraft.objects.filter(student=self.student, test=self.test).exists())
+
+    def test_test_detail_reuses_etag_lookups(self):
+        for lesson in self.lessons:
+            complete(self.student, lesson)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('core:new_test_detail', args=[self.module.pk]))
+        self.assertContains(response, self.test.title)
+        tables = [query['sql'].split(' WHERE ')[0] for query in queries.captured_queries]
+        self.assertEqual(sum(sql.endswith('FROM "core_module"') for sql in tables), 1)
+        self.assertEqual(sum(sql.endswith('FROM "core_moduleprogress"') for sql in tables), 1)
+
+
+# --- Импорт вопросов (question_import.py) ---
+
+class QuestionImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, _, _, self.test, _ = make_course()
+
+    def imported(self):
+        return list(
+            TestQuestion.objects.filter(test=self.test).order_by('created_at')[3:]
+            .values_list('text', 'question_type', 'correct_answer', 'max_score')
+        )
+
+    def run_import(self, text, fmt, **kwargs):
+        return import_questions(self.test, io.BytesIO(text.encode('utf-8')), fmt, **kwargs)
+
+    def test_csv(self):
+        result = self.run_import(
+            "text;question_type;option_a;option_b;correct_answer;max_score\n"
+            "Столица?;choice;Москва;Париж;a;2\n"
+            "Опишите;open_ended;;;;3\n",
+            'csv',
+        )
+        self.assertEqual((result['created'], result['error_count']), (2, 0))
+        self.assertEqual(self.imported(), [('Столица?', 'choice', 'Москва', 2), ('Опишите', 'open_ended', None, 3)])
+
+    def test_json_and_json_lines(self):
+        row = {"text": "Вопрос", "option_a": "Да", "option_b": "Нет", "correct_answer": "b"}
+        self.assertEqual(self.run_import(json.dumps([row]), 'json')['created'], 1)
+        self.assertEqual(self.run_import(json.dumps(row) + '\n' + json.dumps(row), 'json')['created'], 2)
+        self.assertEqual(len(self.imported()), 3)
+
+    def test_gift(self):
+        result = self.run_import(
+            "::Q1:: Столица России? {=Москва ~Париж}\n\nЗемля круглая {T}\n\nОпишите {}\n", 'gift'
+        )
+        self.assertEqual(result['created'], 3)
+        self.assertEqual(
+            [(text, question_type) for text, question_type, _, _ in self.imported()],
+            [('Столица России?', 'choice'), ('Земля круглая', 'choice'), ('Опишите', 'open_ended')],
+        )
+
+    def test_invalid_rows_roll_back_unless_skipped(self):
+        text = "text,option_a,option_b,correct_answer\nВерно?,Да,Нет,Да\nБез ответа,Да,Нет,Может\n"
+        result = self.run_import(text, 'csv')
+        self.assertEqual((result['created'], result['error_count'], result['errors'][0][0]), (0, 1, 3))
+        self.assertEqual(self.imported(), [])
+        self.assertEqual(self.run_import(text, 'csv', skip_invalid=True)['created'], 1)
+
+    def test_broken_file_imports_nothing(self):
+        result = self.run_import('[{"text": "a", "option_a": "1", "option_b": "2", "correct_answer": "a"}, {', 'json')
+        self.assertIsNotNone(result['file_error'])
+        self.assertEqual(self.imported(), [])
+
+    def test_import_updates_answer_key(self):
+        TestSubmission.submit(self.test, User.objects.create_user('student', password='pw'), {})
+        # Ключ ответов сбрасывается после коммита импорта
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import("text,option_a,option_b,correct_answer,max_score\nНовый,Да,Нет,a,4\n", 'csv')
+        question = TestQuestion.objects.get(test=self.test, text="Новый")
+        submission = TestSubmission.submit(self.test, User.objects.get(username='student'), {str(question.pk): 'Да'})
+        self.assertEqual(submission.score, 40)
+
+
+# --- Регистрация и кэш пользователя (backends.py) ---
+
+class CachedUserBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_register_logs_in(self):
+        response = self.client.post(reverse('core:register'), {
+            'username': 'newstudent', 'email': 'new@example.com',
+            'password1': 'Sl0zhnyi-parol', 'password2': 'Sl0zhnyi-parol',
+        })
+        self.assertRedirects(response, reverse('core:profile'))
+        user = User.objects.get(username='newstudent')
+        self.assertEqual(int(self.client.session['_auth_user_id']), user.pk)
+
+    def test_get_user_served_from_cache(self):
+        user = User.objects.create_user('student', password='pw')
+        backend = CachedModelBackend()
+        with mock.patch('core.backends.user_cache_enabled', return_value=True):
+            backend.get_user(user.pk)
+            with self.assertNumQueries(0):
+                cached = backend.get_user(user.pk)
+        self.assertEqual((cached.pk, cached.username), (user.pk, 'student'))
+        self.assertEqual(cached.get_session_auth_hash(), user.get_session_auth_hash())
@@ -21,18 +21,29 @@ urlpatterns = [
     
     # --- СТРАНИЦА КУРСА (ОСНОВНОЙ "ХАБ") ---
     path('course/', views.course, name='course'),
+    path('search/', views.search, name='search'),
     
     # ⬇️ ⬇️ ⬇️ ВОТ ЭТО НУЖНО ДОБАВИТЬ ⬇️ ⬇️ ⬇️
     path('htmx/lesson/<uuid:lesson_id>/', views.new_lesson_detail, name='new_lesson_detail'),
     # ⬆️ ⬆️ ⬆️ ----------------------------- ⬆️ ⬆️ ⬆️
     path('htmx/test/<uuid:module_id>/', views.new_test_detail, name='new_test_detail'),
     path('htmx/test/<uuid:test_id>/submit/', views.new_test_submit, name='new_test_submit'),
+    path('htmx/test/<uuid:test_id>/draft/', views.test_draft_save, name='test_draft_save'),
+    path('htmx/submission/<uuid:submission_id>/status/', views.submission_status, name='submission_status'),
     path('lessons/<uuid:lesson_id>/complete/', views.complete_lesson, name='complete_lesson'),
+    # Защищённые файлы уроков и материалов (Range, X-Accel-Redirect/X-Sendfile — см. media.py)
+    path('media/lesson/<uuid:lesson_id>/<slug:kind>/', views.lesson_media, name='lesson_media'),
+    path('media/resource/<uuid:resource_id>/', views.resource_media, name='resource_media'),
     path(
         'teacher/submission/<uuid:submission_id>/grade/', 
         views.teacher_grade_submission, 
         name='teacher_grade_submission'
     ),
+    # Работы на проверке и проверка "по вопросу"
+    path('teacher/grading/', views.teacher_grading_inbox, name='teacher_grading_inbox'),
+    path('teacher/grading/question/<uuid:question_id>/', views.teacher_grade_question, name='teacher_grade_question'),
+    path('teacher/gradebook/<uuid:course_id>/', views.teacher_gradebook, name='teacher_gradebook'),
+    path('teacher/export/<slug:kind>/', views.teacher_export, name='teacher_export'),
     # --- УПРАВЛЕНИЕ УЧИТЕЛЕМ (без изменений) ---
     path('teacher/lessons/new/', views.teacher_lesson_create, name='teacher_lesson_create'),
     path('teacher/lessons/<uuid:lesson_id>/edit/', views.teacher_lesson_update, name='teacher_lesson_update'),
@@ -41,6 +52,7 @@ urlpatterns = [
     path('teacher/module/<uuid:module_id>/test/create/', views.teacher_test_create, name='teacher_test_create'),
     path('teacher/test/<uuid:test_id>/edit/', views.teacher_test_update, name='teacher_test_update'),
     path('teacher/test/<uuid:test_id>/delete/', views.teacher_test_delete, name='teacher_test_delete'),
+    path('teacher/test/<uuid:test_id>/import/', views.teacher_question_import, name='teacher_question_import'),
     
     path('teacher/question/<uuid:question_id>/edit/', views.teacher_question_update, name='teacher_question_update'),
     path('teacher/question/<uuid:question_id>/delete/', views.teacher_question_delete, name='teacher_question_delete'),
@@ -1,22 +1,45 @@
 # eduplatform/core/views.py
 
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required, user_passes_test 
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout, login
 # 1. ИМПОРТИРУЕМ ВСЕ НУЖНЫЕ ФОРМЫ
 from .forms import (
     ProfileForm, CustomUserCreationForm, LessonForm, 
-    TestForm, QuestionForm
+    TestForm, QuestionForm, QuestionImportForm
 )
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 # 2. ИМПОРТИРУЕМ TestQuestion
 from .models import (
     Course, Module, Lesson, Resource, Test, TestSubmission, 
-    TestAnswer, Progress, User, TestQuestion
+    TestAnswer, Progress, User, TestQuestion, ModuleProgress, UserSearchTerm, TestResultSummary
 )
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponseRedirect
-from django.db.models import Q, Sum  # <-- Убедись, что Sum импортирован
+from django.http import (
+    Http404, HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, StreamingHttpResponse,
+)
+from django.db.models import Q, Count, Exists, OuterRef, Prefetch
 from django.urls import reverse
+from urllib.parse import urlencode
+from datetime import datetime
+import uuid
+from .content_versions import get_course_version, COURSE_OUTLINE_TIMEOUT
+from .search import search_documents, snippet
+from .media import can_view_lesson, serve_file
+from .images import derivative_file, variants_field
+from .grading import grade_in_background
+from .db_router import use_replica
+from .etags import conditional_partial, lesson_etag, test_etag
+from .permissions import can_edit, can_edit_module
+from .navigation import acourse_sequence, is_prefetch, link_header, next_steps, prefetch_urls, step_url
+from .answer_keys import get_question_ids
+from .drafts import adraft_answers, save_draft_answer
+from .sampling import attempt_questions, drawn_questions
+from .question_import import import_questions
+from .signals import deferred_module_progress_refresh, deferred_summary_refresh
+from .exports import EXPORTS, FORMATS, CONTENT_TYPES, export_filename, parse_filters, stream_export
+from django.contrib.auth.views import redirect_to_login
+from asgiref.sync import sync_to_async
 
 # ===================================================================
 #  ИСПРАВЛЕНИЕ: Перемещаем декоратор сюда, в начало файла
@@ -32,6 +55,7 @@ def teacher_required(function):
     return wrap
 # ===================================================================
 
+@use_replica
 def index(request):
     course = Course.objects.first()
     
@@ -75,6 +99,7 @@ def register(request):
 
 # --- 4. VIEW СТРАНИЦЫ КУРСА ---
 @login_required # <-- Добавим проверку, что пользователь вошел
+@use_replica
 def course(request):
     
     # 1. Получаем первый курс (для простоты)
@@ -82,134 +107,313 @@ def course(request):
     
     if not course:
         # Если курсов нет, можно показать ошибку, но пока просто отдадим пустой шаблон
-        return render(request, 'core/course.html', {'error': 'Курс не найден'})
+        return render(request, 'core/course.html', {
+            'error': 'Курс не найден',
+            'outline_cache_timeout': COURSE_OUTLINE_TIMEOUT,
+        })
 
-    # 2. Получаем все модули этого курса, и сразу "захватываем" связанные с ними уроки
-    modules = Module.objects.filter(course=course).prefetch_related('lessons').order_by('created_at')
+    # 2. Получаем все модули этого курса, и сразу "захватываем" связанные с ними уроки и тесты.
+    # Queryset ленивый: запросы выполнятся только при промахе кэша навигации в шаблоне.
+    modules = Module.objects.filter(course=course).prefetch_related('lessons', 'tests').order_by('created_at')
 
-    # 3. Передаем курс и модули (с уроками внутри) в наш шаблон
+    # 3. Передаем курс, модули (с уроками внутри) и версию содержимого для ключа кэша
     context = {
         'course': course,
-        'modules': modules
+        'modules': modules,
+        'content_version': get_course_version(course.id),
+        'outline_cache_timeout': COURSE_OUTLINE_TIMEOUT,
+        'search_query': request.GET.get('q', '').strip(),
     }
     
     return render(request, 'core/course.html', context)
 
 
+SEARCH_RESULTS_LIMIT = 20
+
+@login_required
+def search(request):
+    """Полнотекстовый поиск по урокам и вопросам тестов (результаты в области контента курса)."""
+    query = request.GET.get('q', '').strip()
+
+    # Без HTMX — открываем страницу курса, она сама подгрузит результаты
+    if not request.headers.get('HX-Request'):
+        return redirect(reverse('core:course') + '?' + urlencode({'q': query}))
+
+    results = []
+    if query:
+        results = [
+            {'document': document, 'snippet': snippet(document, query)}
+            for document in search_documents(query, limit=SEARCH_RESULTS_LIMIT)
+        ]
+    return render(request, 'core/partials/_search_results.html', {
+        'results': results,
+        'search_query': query,
+    })
+
+
 # --- 6. VIEW ДЛЯ КНОПКИ "ПРОЙТИ УРОК" (БЕЗ ИЗМЕНЕНИЙ) ---
+# HTMX-фрагменты урока и теста — async-views: под ASGI (uvicorn, см. asgi.py) запросы к базе
+# идут через async ORM без отдельного пула потоков на каждый view. Под WSGI Django
+# выполняет их сам через async_to_sync, поведение то же.
 @login_required
-def complete_lesson(request, lesson_id):
-    if request.method == 'POST':
-        lesson = get_object_or_404(Lesson, id=lesson_id)
-        progress, created = Progress.objects.get_or_create(
-            student=request.user, 
-            lesson=lesson
+async def complete_lesson(request, lesson_id):
+    if request.method != 'POST':
+        return HttpResponse("Что-то пошло не так (нужен POST)", status=400)
+
+    user = await request.auser()
+    # Материалы урока нужны шаблону — в async-коде их нельзя догрузить лениво.
+    # Исходный HTML не нужен: шаблон выводит content_html/assignment_html
+    lesson = await aget_object_or_404(
+        Lesson.objects.select_related('module').defer('content', 'assignment', 'module__description')
+        .prefetch_related('resources'), id=lesson_id
+    )
+    progress, created = await Progress.objects.aget_or_create(
+        student=user, 
+        lesson=lesson
+    )
+    
+    if not progress.passed:
+        progress.passed = True
+        progress.completed_at = timezone.now() # Убедись, что 'timezone' импортирован
+        # Условный UPDATE: счётчик модуля растёт только у того запроса,
+        # который действительно перевёл урок в "пройдено" (защита от двойного клика)
+        marked = await Progress.objects.filter(pk=progress.pk, passed=False).aupdate(
+            passed=True, completed_at=progress.completed_at
         )
-        
-        if not progress.passed:
-            progress.passed = True
-            progress.completed_at = timezone.now() # Убедись, что 'timezone' импортирован
-            progress.save()
+        if marked:
+            await ModuleProgress.arecord_completion(user, lesson)
     
-    return render(request, 'core/partials/_lesson_content.html', {
-        'lesson': lesson,
-        'progress': progress
-    })
+    return await _render_lesson_partial(request, lesson, progress)
 
 
 @login_required
-def new_lesson_detail(request, lesson_id):
-    lesson = get_object_or_404(
-        Lesson.objects.prefetch_related('resources'),
+@use_replica
+@conditional_partial(lesson_etag)
+async def new_lesson_detail(request, lesson_id):
+    lesson = await aget_object_or_404(
+        Lesson.objects.select_related('module').defer('content', 'assignment', 'module__description')
+        .prefetch_related('resources'),
         id=lesson_id
     )
 
-    progress, created = Progress.objects.get_or_create(
-        student=request.user,
-        lesson=lesson
-    )
+    # Строку прогресса уже создал lesson_etag (etags.py) — до расчёта ETag
+    progress = getattr(request, 'lesson_progress', None)
+    if progress is None:
+        progress, created = await Progress.objects.aget_or_create(
+            student=await request.auser(),
+            lesson=lesson
+        )
 
-    return render(request, 'core/partials/_lesson_content.html', {
+    return await _render_lesson_partial(request, lesson, progress)
+
+
+async def _render_lesson_partial(request, lesson, progress):
+    # Следующий урок / тест модуля: кнопки во фрагменте и prefetch-подсказки (navigation.py)
+    navigation = next_steps(await acourse_sequence(lesson.module.course_id), lesson.pk)
+    prefetch = prefetch_urls(navigation)
+    response = render(request, 'core/partials/_lesson_content.html', {
         'lesson': lesson,
-        'progress': progress
+        'progress': progress,
+        'next_lesson_url': step_url(navigation['next_lesson']) if navigation['next_lesson'] else '',
+        'module_test_url': step_url(navigation['module_test']) if navigation['module_test'] else '',
+        'prefetch_urls': prefetch,
     })
+    if prefetch:
+        response['Link'] = link_header(prefetch)
+    return response
+
+
+# Поля урока, которые отдаются через lesson_media (ключ — часть URL)
+LESSON_MEDIA_FIELDS = {
+    'video': 'video_file',
+    'pdf': 'pdf_file',
+    'image': 'image_file',
+}
+
+def lesson_media(request, lesson_id, kind):
+    """Файл урока с проверкой доступа и поддержкой Range (перемотка видео). См. media.py."""
+    field = LESSON_MEDIA_FIELDS.get(kind)
+    if field is None:
+        raise Http404("Неизвестный тип файла.")
+    variant = request.GET.get('variant')
+    only_fields = ['id', 'is_free_preview', field] + ([variants_field(field)] if variant else [])
+    lesson = get_object_or_404(Lesson.objects.only(*only_fields), id=lesson_id)
+    if not can_view_lesson(request.user, lesson):
+        return redirect_to_login(request.get_full_path())
+
+    field_file = getattr(lesson, field)
+    if variant:
+        # Производная изображения для srcset (images.py), например ?variant=640w.webp
+        field_file = derivative_file(field_file, variant)
+        if field_file is None:
+            raise Http404("Такого размера нет.")
+    return serve_file(request, field_file)
+
+
+def resource_media(request, resource_id):
+    """Файл дополнительного материала — доступ как к уроку, к которому он прикреплён."""
+    resource = get_object_or_404(
+        Resource.objects.select_related('lesson').only('id', 'file', 'lesson__id', 'lesson__is_free_preview'),
+        id=resource_id
+    )
+    allowed = can_view_lesson(request.user, resource.lesson) if resource.lesson else request.user.is_authenticated
+    if not allowed:
+        return redirect_to_login(request.get_full_path())
+    return serve_file(request, resource.file, as_attachment=True)
 
 
 @login_required
-def new_test_detail(request, module_id):
-    module = get_object_or_404(Module, id=module_id)
+@conditional_partial(test_etag)
+async def new_test_detail(request, module_id):
+    # Модуль и доступ к тесту уже получил test_etag (etags.py)
+    module = getattr(request, 'test_module', None) or await aget_object_or_404(Module, id=module_id)
+    user = await request.auser()
     
     # 1. Пытаемся найти тест
     try:
-        test = Test.objects.prefetch_related('questions').get(module=module)
+        test = await Test.objects.aget(module=module)
     except Test.DoesNotExist:
         # Если теста нет, отдаем шаблон-заглушку
         return render(request, 'core/partials/_content_locked.html', {
             'message': 'Тест для этого модуля еще не создан.'
         })
 
-    # 2. Проверяем, пройдены ли все уроки в этом модуле
-    lessons = Lesson.objects.filter(module=module)
-    all_lessons_passed = all(
-        Progress.objects.filter(student=request.user, lesson=lesson, passed=True).exists() 
-        for lesson in lessons
-    )
-    
-    if not all_lessons_passed:
+    # 2. Проверяем, пройдены ли все уроки в этом модуле (один запрос к сводке ModuleProgress)
+    unlocked = getattr(request, 'test_unlocked', None)
+    if unlocked is None:
+        unlocked = await ModuleProgress.ais_module_complete(user, module)
+    if not unlocked:
         # Если уроки не пройдены, отдаем шаблон-заглушку
         return render(request, 'core/partials/_content_locked.html', {
             'message': 'Пройдите все уроки в этом модуле, прежде чем начать тест.'
         })
 
-    # 3. Если все проверки пройдены, отдаем partial-шаблон с тестом
+    # 3. Вопросы попытки: все или случайная выборка из банка (sampling.py) —
+    #    тогда из базы загружаются только выпавшие вопросы, в порядке выборки.
+    #    Prefetch (navigation.py) выборку не вытягивает: её сохраняет только настоящее открытие
+    if is_prefetch(request) and test.samples_questions:
+        question_ids = await sync_to_async(drawn_questions)(test, user)
+        if not question_ids:
+            response = HttpResponse(status=204)
+            patch_cache_control(response, no_store=True)
+            return response
+    else:
+        question_ids = await sync_to_async(attempt_questions)(test, user)
+    if question_ids is None:
+        questions = [question async for question in test.questions.all()]
+    else:
+        by_id = {str(question.pk): question async for question in TestQuestion.objects.filter(pk__in=question_ids)}
+        questions = [by_id[question_id] for question_id in question_ids if question_id in by_id]
+
+    # 4. Подставляем ответы из черновика автосохранения (drafts.py)
+    answers = await adraft_answers(user, test.pk)
+    for question in questions:
+        question.draft_answer = answers.get(str(question.pk), '')
+
+    # 5. Если все проверки пройдены, отдаем partial-шаблон с тестом
     return render(request, 'core/partials/_test_content.html', {
         'test': test,
-        'module': module
+        'module': module,
+        'questions': questions,
     })
 
 
 # --- ИЗМЕНЕННАЯ VIEW ДЛЯ ОТПРАВКИ ТЕСТА ---
 @login_required
-def new_test_submit(request, test_id):
+async def new_test_submit(request, test_id):
     
     # Мы принимаем только POST-запросы
     if request.method != 'POST':
         return HttpResponse("Что-то пошло не так (нужен POST)", status=400)
 
-    test = get_object_or_404(Test.objects.prefetch_related('questions'), id=test_id)
-    student = request.user
+    test = await aget_object_or_404(Test, id=test_id)
+    user = await request.auser()
 
-    # 1. Создаем "Попытку прохождения" (Submission)
-    submission = TestSubmission.objects.create(test=test, student=student)
+    # 1. Собираем ответы студента из формы: answer_<id вопроса> -> текст
+    answers = {
+        key[len('answer_'):]: value
+        for key, value in request.POST.items()
+        if key.startswith('answer_')
+    }
 
-    # 2. Собираем все вопросы этого теста
-    all_questions = test.questions.all()
+    # 2. Создаем попытку. В фоновом режиме только сохраняем ответы и ставим задачу воркеру
+    #    (см. grading.py), иначе оцениваем 'choice' в памяти и пишем всё одним bulk_create
+    #    Обе записи — транзакции (попытка + ответы [+ задача]), а transaction.atomic в async-коде
+    #    не работает, поэтому они выполняются одним переходом в поток через sync_to_async
+    if grade_in_background():
+        submission = await sync_to_async(TestSubmission.enqueue)(test, user, answers)
+    else:
+        submission = await sync_to_async(TestSubmission.submit)(test, user, answers)
+
+    # 3. Отдаем HTMX-фрагмент с результатами
+    # (шаблон _test_result_content.html сам решит, что показать: балл, "На проверке" или опрос статуса)
+    return render(request, 'core/partials/_test_result_content.html', {
+        'submission': submission,
+        'test': test,
+        **_status_poll_context(0),
+    })
+
+
+@login_required
+def test_draft_save(request, test_id):
+    """
+    Автосохранение ответа на вопрос теста в черновик (drafts.py): обычно один UPDATE.
+    Ответ 204 — HTMX ничего не заменяет на странице.
+    """
+    if request.method != 'POST':
+        return HttpResponse("Что-то пошло не так (нужен POST)", status=400)
+    try:
+        # Id вопросов теста — маленькая запись кэша, без распаковки всего ключа ответов
+        question_ids = get_question_ids(test_id)
+    except Test.DoesNotExist:
+        raise Http404("Тест не найден.")
+
+    saved = 0
+    for name, value in request.POST.items():
+        question_id = name[len('answer_'):]
+        if name.startswith('answer_') and question_id in question_ids:
+            save_draft_answer(request.user, test_id, question_id, value)
+            saved += 1
+    if not saved:
+        return HttpResponseBadRequest("Нет ответа для сохранения.")
+    return HttpResponse(status=204)
 
-    # 3. Пробегаемся по вопросам и сохраняем ответы студента
-    for question in all_questions:
-        answer_text = request.POST.get(f'answer_{question.id}', '')
-        
-        TestAnswer.objects.create(
-            submission=submission,
-            question=question,
-            answer_text=answer_text
-        )
 
-    # 4. ВАЖНО: Вызываем твой метод из models.py, который проверит 'choice'
-    #
-    submission.auto_grade() 
+def _status_poll_context(poll):
+    # Опрашиваем сначала раз в секунду, потом реже (до 5 с), чтобы не нагружать сервер
+    return {'next_poll': poll + 1, 'poll_delay': min(1 + poll // 5, 5)}
 
-    # 5. Отдаем HTMX-фрагмент с результатами
-    # (шаблон _test_result_content.html сам решит, что показать: балл или "На проверке")
+
+@login_required
+def submission_status(request, submission_id):
+    """Статус фоновой проверки попытки — опрашивается из _test_result_content.html."""
+    try:
+        poll = max(0, int(request.GET.get('poll', 0)))
+    except ValueError:
+        poll = 0
+
+    # Пока попытка в очереди — один лёгкий запрос без загрузки теста
+    submission = get_object_or_404(
+        TestSubmission.objects.only('id', 'status', 'student_id'),
+        id=submission_id, student=request.user
+    )
+    if submission.status == TestSubmission.STATUS_QUEUED:
+        return render(request, 'core/partials/_test_result_content.html', {
+            'submission': submission,
+            **_status_poll_context(poll),
+        })
+
+    submission = TestSubmission.objects.select_related('test').get(pk=submission.pk)
     return render(request, 'core/partials/_test_result_content.html', {
         'submission': submission,
-        'test': test
+        'test': submission.test,
     })
 
 
 # --- (ОСТАЛЬНОЙ КОД БЕЗ ИЗМЕНЕНИЙ) ---
 
 @login_required
+@use_replica
 def profile(request):
     
     profile_form = ProfileForm(instance=request.user)
@@ -230,25 +434,15 @@ def profile(request):
 
     if request.user.role == 'teacher':
         teacher_modules = request.user.taught_modules.all().prefetch_related(
-            'lessons', 'tests'
+            Prefetch('lessons', queryset=Lesson.objects.select_related('author')), 'tests'
         )
         context['teacher_modules'] = teacher_modules
         
-        student_ids = Progress.objects.filter(
-            lesson__module__in=teacher_modules
-        ).values_list('student_id', flat=True).distinct()
-        
-        students_queryset = User.objects.filter(
-            id__in=student_ids, role='student'
-        )
-
-        query = request.GET.get('q', '')
-        if query:
-            students_queryset = students_queryset.filter(
-                Q(username__icontains=query) | Q(email__icontains=query)
-            )
-        
-        context['students_list'] = students_queryset.order_by('username')
+        # Первая страница учеников; следующие страницы и поиск подгружает HTMX (teacher_student_list)
+        query = request.GET.get('q', '').strip()
+        students, next_after = _teacher_students_page(request.user, query)
+        context['students_list'] = students
+        context['next_after'] = next_after
         context['search_query'] = query
 
     return render(request, 'core/profile.html', context)
@@ -259,7 +453,7 @@ def teacher_lesson_create(request):
     module_id = request.GET.get('module_id')
     initial_data = {}
     if module_id:
-        if Module.objects.filter(id=module_id, teachers=request.user).exists():
+        if can_edit_module(request.user, module_id):
              initial_data['module'] = module_id
 
     if request.method == 'POST':
@@ -282,7 +476,7 @@ def teacher_lesson_create(request):
 def teacher_lesson_update(request, lesson_id):
     lesson = get_object_or_404(Lesson, id=lesson_id)
     
-    if request.user not in lesson.module.teachers.all():
+    if not can_edit(request.user, lesson):
          return HttpResponseForbidden("Вы не можете редактировать уроки в этом модуле.")
          
     if request.method == 'POST':
@@ -303,7 +497,7 @@ def teacher_lesson_update(request, lesson_id):
 def teacher_lesson_delete(request, lesson_id):
     lesson = get_object_or_404(Lesson, id=lesson_id)
     
-    if request.user not in lesson.module.teachers.all():
+    if not can_edit(request.user, lesson):
          return HttpResponseForbidden("Вы не можете удалить этот урок.")
          
     if request.method == 'POST':
@@ -319,7 +513,7 @@ def teacher_lesson_delete(request, lesson_id):
 def teacher_test_create(request, module_id):
     module = get_object_or_404(Module, id=module_id)
     
-    if request.user not in module.teachers.all():
+    if not can_edit(request.user, module):
         return HttpResponseForbidden("Вы не можете добавлять тесты в этот модуль.")
         
     if request.method == 'POST':
@@ -342,7 +536,7 @@ def teacher_test_create(request, module_id):
 def teacher_test_update(request, test_id):
     test = get_object_or_404(Test.objects.prefetch_related('questions'), id=test_id)
     
-    if request.user not in test.module.teachers.all():
+    if not can_edit(request.user, test):
         return HttpResponseForbidden("Вы не можете редактировать этот тест.")
         
     if 'submit_test_form' in request.POST:
@@ -374,11 +568,13 @@ def teacher_test_update(request, test_id):
 @teacher_required
 def teacher_test_delete(request, test_id):
     test = get_object_or_404(Test, id=test_id)
-    if request.user not in test.module.teachers.all():
+    if not can_edit(request.user, test):
          return HttpResponseForbidden("Вы не можете удалить этот тест.")
          
     if request.method == 'POST':
-        test.delete()
+        # Попытки удаляются каскадом — сводки журнала пересчитываем один раз, а не на каждую
+        with deferred_summary_refresh():
+            test.delete()
         return redirect('core:profile')
     
     return render(request, 'core/teacher/confirm_delete.html', {
@@ -388,10 +584,10 @@ def teacher_test_delete(request, test_id):
 @login_required
 @teacher_required
 def teacher_question_update(request, question_id):
-    question = get_object_or_404(TestQuestion.objects.select_related('test__module'), id=question_id)
+    question = get_object_or_404(TestQuestion.objects.select_related('test'), id=question_id)
     test = question.test
     
-    if request.user not in test.module.teachers.all():
+    if not can_edit(request.user, test):
          return HttpResponseForbidden("Вы не можете редактировать этот вопрос.")
          
     if request.method == 'POST':
@@ -408,13 +604,39 @@ def teacher_question_update(request, question_id):
         'question': question  # <-- ДОБАВЬТЕ ЭТУ СТРОКУ
     })
 
+@login_required
+@teacher_required
+def teacher_question_import(request, test_id):
+    """Массовый импорт вопросов из CSV/JSON/GIFT (question_import.py) с отчётом об ошибках по строкам."""
+    test = get_object_or_404(Test.objects.select_related('module'), id=test_id)
+
+    if not can_edit(request.user, test):
+        return HttpResponseForbidden("Вы не можете редактировать этот тест.")
+
+    result = None
+    if request.method == 'POST':
+        form = QuestionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            result = import_questions(
+                test, form.cleaned_data['file'], form.cleaned_data['format'],
+                skip_invalid=form.cleaned_data['skip_invalid'],
+            )
+    else:
+        form = QuestionImportForm()
+
+    return render(request, 'core/teacher/question_import.html', {
+        'test': test,
+        'form': form,
+        'result': result,
+    })
+
 @login_required
 @teacher_required
 def teacher_question_delete(request, question_id):
     question = get_object_or_404(TestQuestion.objects.select_related('test'), id=question_id)
     test_id = question.test.id
     
-    if request.user not in question.test.module.teachers.all():
+    if not can_edit(request.user, question):
          return HttpResponseForbidden("Вы не можете удалить этот вопрос.")
          
     if request.method == 'POST':
@@ -425,10 +647,52 @@ def teacher_question_delete(request, question_id):
         'object_name': f'вопрос "{question.text[:50]}..."'
     })
 
+STUDENTS_PAGE_SIZE = 50
+
+
+def _teacher_students_page(teacher, query='', after=''):
+    """
+    Одна страница учеников учителя (есть прогресс хотя бы в одном его модуле).
+    Keyset-пагинация по username: `after` — последний логин предыдущей страницы.
+    Поиск — по префиксу логина, email, имени или фамилии через индекс UserSearchTerm.
+    Возвращает (ученики, логин для следующей страницы или None).
+    """
+    students = User.objects.filter(role='student').filter(
+        Exists(Progress.objects.filter(
+            student=OuterRef('pk'),
+            lesson__module_id__in=teacher.taught_modules.values('pk')
+        ))
+    )
+    if query:
+        students = students.filter(pk__in=UserSearchTerm.matching_user_ids(query))
+    if after:
+        students = students.filter(username__gt=after)
+
+    page = list(
+        students.order_by('username')
+        .only('id', 'username', 'email', 'first_name', 'last_name')[:STUDENTS_PAGE_SIZE + 1]
+    )
+    next_after = page[STUDENTS_PAGE_SIZE - 1].username if len(page) > STUDENTS_PAGE_SIZE else None
+    return page[:STUDENTS_PAGE_SIZE], next_after
+
+
 @login_required
 @teacher_required
 def teacher_student_list(request):
-    return redirect('core:profile')
+    query = request.GET.get('q', '').strip()
+
+    # Без HTMX — обычная страница профиля на вкладке учеников
+    if not request.headers.get('HX-Request'):
+        return redirect(reverse('core:profile') + '?' + urlencode({'tab': 'my-students', 'q': query}))
+
+    after = request.GET.get('after', '')
+    students, next_after = _teacher_students_page(request.user, query, after)
+    return render(request, 'core/partials/_student_list.html', {
+        'students_list': students,
+        'next_after': next_after,
+        'search_query': query,
+        'is_next_page': bool(after),
+    })
 
 @login_required
 @teacher_required
@@ -461,14 +725,21 @@ def teacher_remove_student(request, student_id):
     if request.method == 'POST':
         teacher_modules = request.user.taught_modules.all()
         
-        Progress.objects.filter(
-            student=student, 
-            lesson__module__in=teacher_modules
-        ).delete()
+        with deferred_module_progress_refresh():
+            Progress.objects.filter(
+                student=student, 
+                lesson__module__in=teacher_modules
+            ).delete()
         
-        TestSubmission.objects.filter(
-            student=student, 
-            test__module__in=teacher_modules
+        with deferred_summary_refresh():
+            TestSubmission.objects.filter(
+                student=student, 
+                test__module__in=teacher_modules
+            ).delete()
+
+        ModuleProgress.objects.filter(
+            student=student,
+            module__in=teacher_modules
         ).delete()
         
         return redirect(reverse('core:profile') + '#my-students')
@@ -486,32 +757,40 @@ def custom_logout(request):
 @login_required
 @teacher_required
 def teacher_grade_submission(request, submission_id):
-    # 1. Получаем попытку и связанные с ней ответы и вопросы
+    # 1. Получаем попытку (ответы и вопросы нужны только для формы на GET)
     submission = get_object_or_404(
-        TestSubmission.objects.prefetch_related(
-            'answers', 'answers__question'
-        ), 
+        TestSubmission.objects.select_related('test'),
         id=submission_id
     )
     
     # 2. Убедимся, что учитель имеет право проверять этот тест
-    if request.user not in submission.test.module.teachers.all():
+    if not can_edit(request.user, submission):
          return HttpResponseForbidden("Вы не можете проверять эту работу.")
 
     if request.method == 'POST':
         # 3. Обрабатываем POST-запрос (сохраняем оценки)
+
+        # Воркер ещё не дошёл до этой попытки — сначала оцениваем 'choice' сами
+        # (фоновая задача потом увидит, что попытка уже не в очереди, и ничего не сделает)
+        if submission.status == TestSubmission.STATUS_QUEUED:
+            submission.auto_grade()
         
+        # Типы вопросов и макс. баллы берем из ключа ответов (кэш), а не из базы
+        answer_key = submission.get_answer_key()
+        graded_answers = []
+
         # Проходимся по всем ответам в этой попытке
-        for answer in submission.answers.all():
+        for answer in submission.answers.only('id', 'submission_id', 'question_id', 'score'):
+            question_id = str(answer.question_id)
             # Нас интересуют только "open_ended", т.к. 'choice' уже оценены
-            if answer.question.question_type == 'open_ended':
+            if answer_key['types'].get(question_id) == 'open_ended':
                 
                 # Получаем балл из формы
                 score_str = request.POST.get(f'score_{answer.id}')
                 
                 try:
                     score = int(score_str)
-                    max_score = answer.question.max_score
+                    max_score = answer_key['scores'][question_id]
                     
                     # Ставим балл, но не больше максимального
                     answer.score = max(0, min(score, max_score)) 
@@ -519,7 +798,11 @@ def teacher_grade_submission(request, submission_id):
                 except (ValueError, TypeError):
                     answer.score = 0 # Если пришло что-то не то, ставим 0
                 
-                answer.save() # Сохраняем балл за этот ответ
+                answer.graded = True
+                graded_answers.append(answer)
+
+        # Сохраняем баллы за все ответы одним запросом
+        TestAnswer.objects.bulk_update(graded_answers, ['score', 'graded'])
         
         # 4. ВАЖНО: Вызываем твой метод из models.py
         # Он посчитает ИТОГОВЫЙ % (сложив авто-баллы и ручные) 
@@ -527,12 +810,259 @@ def teacher_grade_submission(request, submission_id):
         submission.update_final_score()
         
         # 5. Возвращаем учителя на страницу ученика
-        return redirect('core:teacher_student_detail', student_id=submission.student.id)
+        return redirect('core:teacher_student_detail', student_id=submission.student_id)
 
     # 6. Обрабатываем GET-запрос (показываем форму)
     context = {
         'submission': submission,
-        'answers': submission.answers.all().order_by('question__created_at')
+        'answers': submission.answers.select_related('question').order_by('question__created_at')
     }
     # Используем новый шаблон, который создали
-    return render(request, 'core/teacher/grade_submission.html', context)
\ No newline at end of file
+    return render(request, 'core/teacher/grade_submission.html', context)
+
+GRADING_PAGE_SIZE = 50
+
+
+def _grading_cursor(submitted_at, pk):
+    return f"{submitted_at.isoformat()}|{pk}"
+
+
+def _after_cursor(value, submitted_at_field='submitted_at', id_field='id'):
+    """
+    Условие keyset-пагинации "после (submitted_at, id)" из строки курсора.
+    Битый курсор — с начала списка (пустой Q).
+    """
+    try:
+        submitted_at, pk = value.split('|', 1)
+        submitted_at = datetime.fromisoformat(submitted_at)
+        pk = uuid.UUID(pk)
+    except ValueError:
+        return Q()
+    return Q(**{f'{submitted_at_field}__gt': submitted_at}) | Q(
+        **{submitted_at_field: submitted_at, f'{id_field}__gt': pk}
+    )
+
+
+@login_required
+@teacher_required
+def teacher_grading_inbox(request):
+    """
+    Все работы на проверке (status='pending') по модулям учителя, старые сверху.
+    Keyset-пагинация по (submitted_at, id) — идёт по индексу core_sub_status_date_idx,
+    без OFFSET и COUNT по всей таблице попыток.
+    """
+    teacher_modules = request.user.taught_modules.values('pk')
+    after = request.GET.get('after', '')
+
+    submissions = TestSubmission.objects.filter(
+        status=TestSubmission.STATUS_PENDING,
+        test__module_id__in=teacher_modules,
+    )
+    if after:
+        submissions = submissions.filter(_after_cursor(after))
+    page = list(
+        submissions.select_related('student', 'test')
+        .only('id', 'submitted_at', 'student__username', 'test__title')
+        .order_by('submitted_at', 'id')[:GRADING_PAGE_SIZE + 1]
+    )
+    next_after = None
+    if len(page) > GRADING_PAGE_SIZE:
+        last = page[GRADING_PAGE_SIZE - 1]
+        next_after = _grading_cursor(last.submitted_at, last.id)
+
+    # Открытые вопросы, по которым есть непроверенные ответы — для проверки "по вопросу"
+    questions = (
+        TestAnswer.objects.filter(
+            graded=False,
+            submission__status=TestSubmission.STATUS_PENDING,
+            question__question_type='open_ended',
+            question__test__module_id__in=teacher_modules,
+        )
+        .values('question_id', 'question__text', 'question__test__title')
+        .annotate(ungraded_count=Count('id'))
+        .order_by('question__test__title', 'question__text')
+    )
+
+    return render(request, 'core/teacher/grading_inbox.html', {
+        'submissions': page[:GRADING_PAGE_SIZE],
+        'next_after': next_after,
+        'is_next_page': bool(after),
+        'questions': questions,
+    })
+
+
+@login_required
+@teacher_required
+def teacher_grade_question(request, question_id):
+    """
+    Проверка "по вопросу": один открытый вопрос и ответы на него из многих попыток.
+    Баллы пишутся одним bulk_update, итоги попыток пересчитываются одним UPDATE
+    (TestSubmission.finalize_graded). Пустое поле — ответ пропущен, остаётся в очереди.
+    """
+    question = get_object_or_404(
+        TestQuestion.objects.select_related('test'),
+        id=question_id, question_type='open_ended'
+    )
+    if not can_edit(request.user, question):
+        return HttpResponseForbidden("Вы не можете проверять этот тест.")
+
+    ungraded = TestAnswer.objects.filter(
+        question=question,
+        graded=False,
+        submission__status=TestSubmission.STATUS_PENDING,
+    )
+
+    if request.method == 'POST':
+        scores = {}
+        for name, value in request.POST.items():
+            if not name.startswith('score_') or not value.strip():
+                continue
+            try:
+                # Балл не больше максимального за вопрос
+                scores[uuid.UUID(name[len('score_'):])] = max(0, min(int(value), question.max_score))
+            except ValueError:
+                continue
+
+        answers = list(ungraded.filter(id__in=scores).only('id', 'submission_id', 'score', 'graded'))
+        for answer in answers:
+            answer.score = scores[answer.id]
+            answer.graded = True
+        TestAnswer.objects.bulk_update(answers, ['score', 'graded'])
+        TestSubmission.finalize_graded(question.test, {answer.submission_id for answer in answers})
+
+        # Проверенные ответы уходят из списка, поэтому остаёмся на той же позиции;
+        # если что-то пропущено — переходим к ответам после этой страницы
+        after = request.POST.get('after', '')
+        if len(answers) < int(request.POST.get('page_count') or 0):
+            after = request.POST.get('next_after', '')
+        url = reverse('core:teacher_grade_question', args=[question.id])
+        if after:
+            url += '?' + urlencode({'after': after})
+        return redirect(url)
+
+    after = request.GET.get('after', '')
+    if after:
+        ungraded = ungraded.filter(_after_cursor(after, 'submission__submitted_at', 'id'))
+    page = list(
+        ungraded.select_related('submission__student')
+        .only('id', 'answer_text', 'submission__submitted_at', 'submission__student__username')
+        .order_by('submission__submitted_at', 'id')[:GRADING_PAGE_SIZE + 1]
+    )
+    answers = page[:GRADING_PAGE_SIZE]
+    next_after = None
+    if answers:
+        last = answers[-1]
+        next_after = _grading_cursor(last.submission.submitted_at, last.id)
+
+    return render(request, 'core/teacher/grade_question.html', {
+        'question': question,
+        'answers': answers,
+        'next_after': next_after,
+        'has_more': len(page) > GRADING_PAGE_SIZE,
+        'is_next_page': bool(after),
+    })
+
+
+GRADEBOOK_PAGE_SIZE = 100
+
+
+@login_required
+@teacher_required
+def teacher_gradebook(request, course_id):
+    """
+    Журнал оценок курса: ученики × (пройдено уроков по модулю, лучший/последний балл по тесту).
+    Данные берутся из сводок ModuleProgress и TestResultSummary, поэтому число запросов
+    не зависит от числа учеников: курс, модули, тесты, страница учеников и две выборки сводок.
+    Keyset-пагинация по username, как в списке учеников.
+    """
+    course = get_object_or_404(Course.objects.only('id', 'title'), id=course_id)
+    # Только модули курса, которые ведёт учитель
+    modules = list(
+        Module.objects.filter(course=course, teachers=request.user)
+        .annotate(total_lessons=Count('lessons'))
+        .only('id', 'title')
+        .order_by('created_at')
+    )
+    if not modules:
+        return HttpResponseForbidden("Вы не ведёте ни одного модуля этого курса.")
+    module_ids = [module.pk for module in modules]
+    tests = list(Test.objects.filter(module_id__in=module_ids).only('id', 'title', 'module_id').order_by('created_at'))
+    test_ids = [test.pk for test in tests]
+
+    after = request.GET.get('after', '')
+    students = User.objects.filter(role='student').filter(
+        Exists(ModuleProgress.objects.filter(student=OuterRef('pk'), module_id__in=module_ids))
+        | Exists(TestResultSummary.objects.filter(student=OuterRef('pk'), course=course, test_id__in=test_ids))
+    )
+    if after:
+        students = students.filter(username__gt=after)
+    page = list(students.order_by('username').only('id', 'username')[:GRADEBOOK_PAGE_SIZE + 1])
+    next_after = page[GRADEBOOK_PAGE_SIZE - 1].username if len(page) > GRADEBOOK_PAGE_SIZE else None
+    page = page[:GRADEBOOK_PAGE_SIZE]
+    student_ids = [student.pk for student in page]
+
+    completed = {
+        (student_id, module_id): count
+        for student_id, module_id, count in ModuleProgress.objects.filter(
+            student_id__in=student_ids, module_id__in=module_ids
+        ).values_list('student_id', 'module_id', 'completed_lessons')
+    }
+    results = {
+        (result.student_id, result.test_id): result
+        for result in TestResultSummary.objects.filter(
+            course=course, student_id__in=student_ids, test_id__in=test_ids
+        ).only('student_id', 'test_id', 'attempts', 'pending_attempts', 'best_score', 'latest_score', 'passed')
+    }
+
+    # Колонки: по каждому модулю — уроки, затем его тесты
+    columns = []
+    for module in modules:
+        columns.append({'module': module})
+        columns.extend({'test': test} for test in tests if test.module_id == module.pk)
+
+    rows = []
+    for student in page:
+        cells = []
+        for column in columns:
+            if 'module' in column:
+                module = column['module']
+                cells.append({
+                    'kind': 'lessons',
+                    'completed': completed.get((student.pk, module.pk), 0),
+                    'total': module.total_lessons,
+                })
+            else:
+                cells.append({'kind': 'test', 'result': results.get((student.pk, column['test'].pk))})
+        rows.append({'student': student, 'cells': cells})
+
+    return render(request, 'core/teacher/gradebook.html', {
+        'course': course,
+        'columns': columns,
+        'rows': rows,
+        'next_after': next_after,
+        'is_next_page': bool(after),
+        'export_kinds': [(kind, spec['title']) for kind, spec in EXPORTS.items()],
+    })
+
+
+@login_required
+@teacher_required
+def teacher_export(request, kind):
+    """
+    Потоковая выгрузка (exports.py): ?format=csv|xlsx&course=&module=&test=&date_from=&date_to=.
+    Только данные модулей, которые ведёт учитель.
+    """
+    if kind not in EXPORTS:
+        raise Http404("Неизвестная выгрузка.")
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest("Неизвестный формат.")
+    try:
+        filters = parse_filters(request.GET)
+    except ValueError:
+        return HttpResponseBadRequest("Неверный фильтр.")
+
+    content = stream_export(kind, fmt, modules=request.user.taught_modules.values('pk'), **filters)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(kind, fmt)}"'
+    return response
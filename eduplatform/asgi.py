@@ -7,10 +7,31 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+# Запуск под uvicorn (HTMX-фрагменты урока и теста — async-views, см. core/views.py):
+#
+#   pip install "uvicorn[standard]"        # uvloop + httptools
+#   python manage.py collectstatic --noinput
+#   uvicorn eduplatform.asgi:application --host 127.0.0.1 --port 8000 \
+#       --workers 4 --loop uvloop --http httptools --proxy-headers --no-access-log
+#
+# Или gunicorn как менеджер процессов с воркерами uvicorn:
+#   gunicorn eduplatform.asgi:application -k uvicorn.workers.UvicornWorker -w 4 -b 127.0.0.1:8000
+#
+# Воркеров — примерно по числу ядер. Статику и медиа отдаёт nginx (MEDIA_SENDFILE=nginx,
+# см. settings.py), перед uvicorn — тот же proxy_pass, что и для gunicorn.
+# Sync-views работают и здесь: Django выполняет их в пуле потоков (asgiref).
+# Документация Django не рекомендует постоянные соединения (DB_CONN_MAX_AGE) под ASGI,
+# поэтому здесь, до загрузки настроек, DB_CONN_MAX_AGE по умолчанию 0 (в settings.py — 60
+# для WSGI/gunicorn и manage.py). Для PostgreSQL используйте пул (DB_POOL=1, psycopg 3) или pgbouncer.
+#
+# Сравнить с gunicorn (sync-воркеры, WSGI) на этой машине:
+#   python manage.py benchmark_servers --workers 4 --concurrency 32 --duration 20
+
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eduplatform.settings')
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
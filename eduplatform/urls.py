@@ -10,8 +10,13 @@ urlpatterns = [
     path('summernote/', include('django_summernote.urls')), # <-- 1. ДОБАВЬТЕ ЭТУ СТРОКУ
 ]
 
-# 2. ЭТО ДЛЯ МЕДИА-ФАЙЛОВ (АВАТАРЫ)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# 2. ЭТО ДЛЯ МЕДИА-ФАЙЛОВ В РЕЖИМЕ РАЗРАБОТКИ — только публичные папки
+# (аватары, обложки курсов, фото преподавателей, картинки из редактора summernote).
+# Видео, PDF, изображения уроков и материалы отдаются с проверкой доступа (core/media.py),
+# по прямому /media/... они недоступны.
+PUBLIC_MEDIA_DIRS = ('avatars', 'course_covers', 'teacher_cards', 'django-summernote')
+for folder in PUBLIC_MEDIA_DIRS:
+    urlpatterns += static(f'{settings.MEDIA_URL}{folder}/', document_root=settings.MEDIA_ROOT / folder)
 
 # 3. ЭТО ДЛЯ СТАТИКИ (CSS, JS, IMAGES) В РЕЖИМЕ РАЗРАБОТКИ
 if settings.DEBUG: